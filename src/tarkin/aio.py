@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+"""Asyncio interface and executor helpers for loading BMOF files"""
+
+from __future__ import annotations
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import aclosing, contextmanager
+from itertools import islice
+from multiprocessing import get_all_start_methods, get_context
+from pathlib import Path
+from typing import AsyncGenerator, Final, Iterable, Iterator, Literal, Optional
+from .bmof import Bmof, BMOF
+from .wmi_object import WmiObject
+
+
+type Source = str | os.PathLike[str]
+
+type ExecutorKind = Literal["thread", "process"]
+
+DEFAULT_LIMIT: Final = os.cpu_count() or 4
+"""Default number of BMOF files being loaded concurrently"""
+
+DEFAULT_WORKERS: Final = os.cpu_count() or 4
+"""Default number of workers processing BMOF files"""
+
+CHUNK_SIZE: Final = 16
+"""Number of files passed to a worker at once"""
+
+
+def parse_data(data: bytes) -> Bmof:
+    """Decompress and parse a BMOF data buffer inside a executor"""
+    bmof: Bmof = BMOF.parse(data)
+
+    return bmof
+
+
+def create_executor(kind: ExecutorKind, workers: Optional[int] = None) -> Executor:
+    """Create a thread or process executor used for parsing BMOF data"""
+    if kind == "thread":
+        return ThreadPoolExecutor(workers, thread_name_prefix="tarkin")
+
+    if kind == "process":
+        # Forking a process running a event loop with helper threads may deadlock
+        method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(workers, mp_context=get_context(method))
+
+    raise ValueError(f"Unknown executor kind {kind}")
+
+
+@contextmanager
+def owned_executor(executor: Optional[Executor], kind: ExecutorKind,
+                   workers: Optional[int] = None) -> Iterator[Executor]:
+    """
+    Provide the given executor, or create a executor of the given kind.
+
+    A created executor uses the given number of workers and is shut down afterwards,
+    cancelling the files not yet processed.
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    if workers < 1:
+        raise ValueError("Number of workers must be at least 1")
+
+    if executor is not None:
+        yield executor
+        return
+
+    executor = create_executor(kind, workers)
+    try:
+        yield executor
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def expand_paths(paths: Iterable[Path], pattern: str = "*") -> Iterator[tuple[Path, bool]]:
+    """
+    Expand directories into the files matching the glob pattern, searched recursively.
+
+    Each file is returned together with a flag telling whether it was given explicitly.
+    """
+    for path in paths:
+        if path.is_dir():
+            for child in sorted(path.rglob(pattern)):
+                if child.is_file():
+                    yield child, False
+        else:
+            yield path, True
+
+
+async def load(source: Source, executor: Optional[Executor] = None) -> Bmof:
+    """
+    Load a BMOF file.
+
+    The file is read without blocking the event loop and parsed inside the given executor,
+    using the default executor of the event loop when no executor is given.
+    """
+    data = await asyncio.to_thread(Path(source).read_bytes)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, parse_data, data)
+
+
+async def load_many(sources: Iterable[Source], executor: Optional[Executor] = None,
+                    kind: ExecutorKind = "thread", limit: Optional[int] = None,
+                    return_exceptions: bool = False, workers: Optional[int] = None
+                    ) -> AsyncGenerator[tuple[Path, Bmof | Exception], None]:
+    """
+    Load multiple BMOF files concurrently, yielding the results as they complete.
+
+    At most limit files are being loaded at once, with further sources being taken from the
+    iterable only when a previous file was loaded. When no executor is given, a executor of
+    the given kind with the given number of workers is created and shut down when the
+    generator is closed. Errors are either raised or yielded instead of the result when
+    return_exceptions is set.
+
+    Closing the generator early (e.g. using contextlib.aclosing()) or cancelling the task
+    consuming it cancels all pending loads. Parsing that already started inside a worker
+    cannot be interrupted, but is waited for without blocking the event loop when the
+    executor was created by the generator.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-branches
+    if limit is None:
+        limit = DEFAULT_LIMIT
+    if limit < 1:
+        raise ValueError("Concurrency limit must be at least 1")
+    if workers is not None and workers < 1:
+        raise ValueError("Number of workers must be at least 1")
+
+    owned = executor is None
+    if executor is None:
+        executor = create_executor(kind, workers)
+
+    remaining = iter(sources)
+    pending: dict[asyncio.Task[Bmof], Path] = {}
+    try:
+        while True:
+            for source in islice(remaining, limit - len(pending)):
+                path = Path(source)
+                pending[asyncio.create_task(load(path, executor))] = path
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    yield path, task.result()
+                elif return_exceptions and isinstance(error, Exception):
+                    yield path, error
+                else:
+                    raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if owned:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+async def iter_objects(sources: Iterable[Source], executor: Optional[Executor] = None,
+                       kind: ExecutorKind = "thread", limit: Optional[int] = None,
+                       workers: Optional[int] = None
+                       ) -> AsyncGenerator[tuple[Path, WmiObject], None]:
+    """
+    Load multiple BMOF files concurrently, yielding the contained objects.
+
+    The objects of each file are yielded in order once the file was loaded, while the files
+    themselves are yielded as they complete. See load_many() for the meaning of the arguments.
+    """
+    async with aclosing(load_many(sources, executor, kind, limit, workers=workers)) as results:
+        async for path, result in results:
+            assert isinstance(result, Bmof)
+            for obj in result.root.objects:
+                yield path, obj
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+
+"""Thread-parallel parsing of multiple BMOF files"""
+
+from __future__ import annotations
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Final, Iterable, Iterator, Optional
+from .bmof import Bmof, BMOF
+
+
+DEFAULT_WORKERS: Final = os.cpu_count() or 4
+"""Default number of threads used for parsing"""
+
+
+def parse_file(path: Path) -> Bmof | Exception:
+    """Parse a BMOF file, returning the error instead of raising it"""
+    try:
+        bmof: Bmof = BMOF.parse_file(path)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return error
+
+    return bmof
+
+
+def parse_files(paths: Iterable[Path], workers: Optional[int] = None
+                ) -> Iterator[tuple[Path, Bmof | Exception]]:
+    """
+    Parse multiple BMOF files using a thread pool, yielding the results in order.
+
+    At most twice the number of workers files are parsed ahead of the consumer. The threads
+    only run in parallel on interpreters without the global interpreter lock (see
+    tarkin.ds.GIL_DISABLED). Errors are yielded instead of the result of the affected file.
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    if workers < 1:
+        raise ValueError("Number of workers must be at least 1")
+
+    remaining = iter(paths)
+    pending: deque[tuple[Path, Future[Bmof | Exception]]] = deque()
+    with ThreadPoolExecutor(workers, thread_name_prefix="tarkin") as executor:
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    path = next(remaining, None)
+                    if path is None:
+                        break
+
+                    pending.append((path, executor.submit(parse_file, path)))
+
+                if not pending:
+                    break
+
+                path, future = pending.popleft()
+                yield path, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -4,12 +4,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Final, Optional as TOptional
-from construct import Struct, Int32ul, Const, this, Container, Adapter, Rebuild, len_, \
-    Terminated, FixedSized, Optional
-from .ds import CompressedDS
-from .flavor import BMOF_FLAVORS, QualifierFlavor
-from .root import BMOF_ROOT, Root
+from typing import Any, Final, Optional as TOptional, Sequence
+from construct import Struct, Int32ul, Const, Container, Adapter, Terminated, Optional
+from .compact import State, StringTable, reduce
+from .ds import PrefixedDS
+from .flavor import BMOF_FLAVORS, Flavors, QualifierFlavor
+from .root import BMOF_ROOT, Root, sizeof_root
 
 
 @dataclass(frozen=True, slots=True)
@@ -28,6 +28,30 @@ class Bmof:
             flavors=container["data"]["flavors"]
         )
 
+    def pack(self, table: StringTable) -> State:
+        """Convert BMOF for compact pickling"""
+        flavors = None
+        if self.flavors is not None:
+            flavors = tuple((f.offset, int(f.flavors)) for f in self.flavors)
+
+        return self.root.pack(table), flavors
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> Bmof:
+        """Restore BMOF converted using pack()"""
+        flavors = None
+        if state[1] is not None:
+            flavors = [QualifierFlavor(offset=o, flavors=Flavors(f)) for o, f in state[1]]
+
+        return cls(
+            root=Root.unpack(strings, state[0]),
+            flavors=flavors
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle BMOF using a compact representation"""
+        return reduce(self)
+
 
 class BmofAdapter(Adapter):
     # pylint: disable=abstract-method
@@ -38,31 +62,57 @@ class BmofAdapter(Adapter):
 
     def _encode(self, obj: Bmof, context: Container, path: str) -> Container:
         """Encode Bmof class to container"""
+        flavors = obj.flavors
+        if flavors is not None:
+            # Qualifiers are likely to be encoded at different offsets
+            offsets: dict[int, int] = {}
+            sizeof_root(obj.root.objects, offsets)
+            flavors = [
+                QualifierFlavor(offset=offsets[f.offset], flavors=f.flavors)
+                for f in flavors if f.offset in offsets
+            ]
+
         return Container(
             data=Container(
                 root=obj.root,
-                flavors=obj.flavors
+                flavors=flavors
             )
         )
 
 
+BMOF_MAGIC: Final = b"FOMB"
+"""Magic constant at the start of BMOF data buffers"""
+
+
+BMOF_HEADER: Final = Struct(
+    "magic" / Const(BMOF_MAGIC),
+    "version" / Const(1, Int32ul),
+    "compressed_length" / Int32ul,
+    "final_length" / Int32ul
+)
+"""
+The fixed header of a BMOF data buffer.
+
+See BMOF for a description of the header fields.
+"""
+
+BMOF_HEADER_SIZE: Final = BMOF_HEADER.sizeof()
+"""Size of the fixed header of a BMOF data buffer"""
+
+
+BMOF_DATA: Final = Struct(
+    "root" / BMOF_ROOT,
+    "flavors" / Optional(BMOF_FLAVORS),
+    Terminated
+)
+"""The decompressed BMOF data, see BMOF"""
+
+
 BMOF: Final = BmofAdapter(
     Struct(
-        "magic" / Const(b"FOMB"),
+        "magic" / Const(BMOF_MAGIC),
         "version" / Const(1, Int32ul),
-        "compressed_length" / Rebuild(Int32ul, len_(this.data)),
-        "final_length" / Int32ul,
-        "data" / FixedSized(
-            this.compressed_length,
-            CompressedDS(
-                Struct(
-                    "root" / BMOF_ROOT,
-                    "flavors" / Optional(BMOF_FLAVORS),
-                    Terminated
-                ),
-                this.final_length
-            )
-        ),
+        "data" / PrefixedDS(BMOF_DATA),
         Terminated
     )
 )
@@ -77,4 +127,13 @@ The BMOF data buffer starts with a fixed header containing the following fields:
 
 The BMOF data following the this header is compressed using the DoubleSpace compression algorithm
 and contains the BMOF root structure and an optional flavors section.
+
+When building, the offsets inside the flavors section are updated to match the offsets of
+the encoded qualifiers. Flavors of qualifiers not contained inside the BMOF are discarded.
+The layout is computed in a single pass with the sizes of embedded objects being cached.
+Strings are not shared between heaps since overlapping heap references are rejected when
+parsing, so equal strings are encoded once per occurrence.
+
+All state used while parsing or building is kept inside the context of the individual call,
+so BMOF can be used concurrently from multiple threads.
 """
@@ -0,0 +1,429 @@
+#!/usr/bin/python3
+
+"""Marshaling of WMI data blocks and method buffers"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from struct import Struct
+from typing import Final, Mapping, Optional
+from .wmi_object import WmiObject, WmiMethod
+from .wmi_property import WmiProperty
+from .wmi_type import WmiType, WmiDataType
+
+
+FORMATS: Final = {
+    WmiDataType.BOOLEAN: "?",
+    WmiDataType.UINT8: "B",
+    WmiDataType.SINT8: "b",
+    WmiDataType.UINT16: "H",
+    WmiDataType.SINT16: "h",
+    WmiDataType.UINT32: "I",
+    WmiDataType.SINT32: "i",
+    WmiDataType.UINT64: "Q",
+    WmiDataType.SINT64: "q",
+    WmiDataType.REAL32: "f",
+    WmiDataType.REAL64: "d",
+    WmiDataType.CHAR16: "H"
+}
+"""Struct format characters of fixed-size WMI data types"""
+
+STRING_TYPES: Final = frozenset({
+    WmiDataType.STRING,
+    WmiDataType.DATETIME,
+    WmiDataType.REFERENCE
+})
+"""WMI data types encoded as strings"""
+
+STRING_LENGTH: Final = Struct("<H")
+"""Length prefix of a string in bytes"""
+
+MAX_ALIGNMENT: Final = 8
+"""Largest alignment of a WMI data type in bytes"""
+
+STANDARD_PROPERTIES: Final = frozenset({
+    "InstanceName",
+    "Active"
+})
+"""Properties required by WMI-ACPI classes which are not contained in the data block"""
+
+
+type Values = dict[str, object]
+
+type Layout = tuple[tuple[CodecField, ...], tuple[str, ...]]
+
+
+@dataclass(frozen=True, slots=True)
+class CodecField:
+    """
+    Field of a WMI buffer.
+
+    Arrays either have a fixed number of elements specified by count, a number of elements
+    specified by the value of another field named by size_is, or extend until the end of
+    the buffer when being the last field.
+    """
+
+    name: str
+
+    data_type: WmiType
+
+    count: Optional[int] = None
+
+    size_is: Optional[str] = None
+
+    @classmethod
+    def from_property(cls, prop: WmiProperty) -> CodecField:
+        """Create a field from a WMI property using its "max" and "WmiSizeIs" qualifiers"""
+        if prop.name is None:
+            raise RuntimeError("Field has no name")
+
+        count = None
+        size_is = None
+        for qualifier in prop.qualifiers or []:
+            match (qualifier.name or "").lower():
+                case "max":
+                    count = int(str(qualifier.value))
+                case "wmisizeis":
+                    size_is = str(qualifier.value)
+
+        return cls(
+            name=prop.name,
+            data_type=prop.data_type,
+            count=count if prop.data_type.is_array else None,
+            size_is=size_is if prop.data_type.is_array else None
+        )
+
+    @property
+    def alignment(self) -> int:
+        """Retrieve the alignment of the field in bytes"""
+        if self.data_type.basic_type in STRING_TYPES:
+            return STRING_LENGTH.size
+
+        return Struct(FORMATS[self.data_type.basic_type]).size
+
+    @property
+    def is_fixed(self) -> bool:
+        """Check if the field has a fixed size"""
+        if self.data_type.basic_type in STRING_TYPES:
+            return False
+
+        return not self.data_type.is_array or self.count is not None
+
+
+def data_id(prop: WmiProperty, names: tuple[str, ...] = ("wmidataid",)) -> Optional[int]:
+    """Retrieve the value of the first qualifier of a WMI property with one of the given names"""
+    values = {(q.name or "").lower(): q.value for q in prop.qualifiers or []}
+    for name in names:
+        value = values.get(name)
+        if value is not None:
+            return int(str(value))
+
+    return None
+
+
+def _padding(offset: int, alignment: int) -> int:
+    """Calculate the padding necessary to align an offset"""
+    return -offset % alignment
+
+
+class _FixedRun:
+    """
+    Run of consecutive fixed-size fields.
+
+    The fields are decoded and encoded using a single precompiled struct, with a separate
+    struct being compiled for each possible misalignment of the start of the run.
+    """
+    __slots__ = ("fields", "_structs")
+
+    def __init__(self, fields: list[CodecField]) -> None:
+        self.fields = fields
+        self._structs: dict[int, Struct] = {}
+
+    def struct(self, offset: int) -> Struct:
+        """Retrieve the struct used when the run starts at the given offset"""
+        key = offset % MAX_ALIGNMENT
+        struct = self._structs.get(key)
+        if struct is None:
+            fmt = "<"
+            position = key
+            for field in self.fields:
+                padding = _padding(position, field.alignment)
+                count = field.count if field.data_type.is_array else 1
+                fmt += "x" * padding + FORMATS[field.data_type.basic_type] * (count or 0)
+                position += padding + field.alignment * (count or 0)
+
+            # Concurrent callers may compile the same struct, keep the first one
+            struct = self._structs.setdefault(key, Struct(fmt))
+
+        return struct
+
+    def decode(self, buffer: bytes, offset: int, values: Values) -> int:
+        """Decode the fields starting at the given offset and return the end offset"""
+        struct = self.struct(offset)
+        items = struct.unpack_from(buffer, offset)
+        index = 0
+
+        for field in self.fields:
+            char16 = field.data_type.basic_type == WmiDataType.CHAR16
+            if field.data_type.is_array:
+                count = field.count or 0
+                array = items[index:index + count]
+                values[field.name] = [chr(c) for c in array] if char16 else list(array)
+                index += count
+            else:
+                values[field.name] = chr(items[index]) if char16 else items[index]
+                index += 1
+
+        return offset + struct.size
+
+    def encode(self, values: Mapping[str, object], buffer: bytearray) -> None:
+        """Append the encoded fields to a buffer"""
+        items: list[object] = []
+        for field in self.fields:
+            value = values[field.name]
+            if field.data_type.is_array:
+                assert isinstance(value, (list, tuple))
+                if len(value) != field.count:
+                    raise ValueError(f"Field {field.name} requires {field.count} elements")
+                array = list(value)
+            else:
+                array = [value]
+
+            if field.data_type.basic_type == WmiDataType.CHAR16:
+                array = [ord(str(c)) for c in array]
+
+            items.extend(array)
+
+        buffer += self.struct(len(buffer)).pack(*items)
+
+
+class _VariableField:
+    """Field of a variable size like strings or dynamically sized arrays"""
+    __slots__ = ("field", "_item")
+
+    def __init__(self, field: CodecField) -> None:
+        self.field = field
+        self._item: Optional[Struct] = None
+        if field.data_type.basic_type not in STRING_TYPES:
+            self._item = Struct("<" + FORMATS[field.data_type.basic_type])
+
+    def _count(self, values: Mapping[str, object]) -> Optional[int]:
+        """Retrieve the number of array elements"""
+        if self.field.count is not None:
+            return self.field.count
+
+        if self.field.size_is is not None:
+            return int(str(values[self.field.size_is]))
+
+        return None
+
+    def _decode_item(self, buffer: bytes, offset: int) -> tuple[object, int]:
+        """Decode a single item and return it together with the end offset"""
+        offset += _padding(offset, self.field.alignment)
+        if self._item is None:
+            (length,) = STRING_LENGTH.unpack_from(buffer, offset)
+            offset += STRING_LENGTH.size
+            data = bytes(buffer[offset:offset + length])
+            if len(data) != length:
+                raise ValueError(f"String {self.field.name} exceeds the buffer")
+
+            return data.decode("utf_16_le").rstrip("\0"), offset + length
+
+        (value,) = self._item.unpack_from(buffer, offset)
+        if self.field.data_type.basic_type == WmiDataType.CHAR16:
+            value = chr(value)
+
+        return value, offset + self._item.size
+
+    def decode(self, buffer: bytes, offset: int, values: Values) -> int:
+        """Decode the field starting at the given offset and return the end offset"""
+        if not self.field.data_type.is_array:
+            values[self.field.name], offset = self._decode_item(buffer, offset)
+            return offset
+
+        count = self._count(values)
+        items: list[object] = []
+        while len(items) != count:
+            if count is None and offset + _padding(offset, self.field.alignment) >= len(buffer):
+                break
+
+            item, offset = self._decode_item(buffer, offset)
+            items.append(item)
+
+        values[self.field.name] = items
+
+        return offset
+
+    def _encode_item(self, value: object, buffer: bytearray) -> None:
+        """Append a single encoded item to a buffer"""
+        buffer += bytes(_padding(len(buffer), self.field.alignment))
+        if self._item is None:
+            data = str(value).encode("utf_16_le")
+            buffer += STRING_LENGTH.pack(len(data))
+            buffer += data
+        elif self.field.data_type.basic_type == WmiDataType.CHAR16:
+            buffer += self._item.pack(ord(str(value)))
+        else:
+            buffer += self._item.pack(value)
+
+    def encode(self, values: Mapping[str, object], buffer: bytearray) -> None:
+        """Append the encoded field to a buffer"""
+        value = values[self.field.name]
+        if not self.field.data_type.is_array:
+            self._encode_item(value, buffer)
+            return
+
+        assert isinstance(value, (list, tuple))
+        count = self._count(values)
+        if count is not None and count != len(value):
+            raise ValueError(f"Field {self.field.name} requires {count} elements")
+
+        for item in value:
+            self._encode_item(item, buffer)
+
+
+class WmiCodec:
+    """
+    Precompiled codec for WMI buffers.
+
+    Fields are naturally aligned, with booleans occupying a single byte. Strings are
+    encoded as UTF-16LE prefixed by their 16-bit little endian length in bytes and
+    aligned to two bytes. Buffers containing only fixed-size fields are decoded and
+    encoded using a single precompiled struct.
+
+    Keyword arguments:
+    fields -- fields of the buffer in the order they appear in the buffer
+    skipped -- names of the properties left out of the buffer due to lacking a position
+    """
+    __slots__ = ("fields", "skipped", "_segments")
+
+    def __init__(self, fields: tuple[CodecField, ...], skipped: tuple[str, ...] = ()) -> None:
+        self.fields = fields
+        self.skipped = skipped
+        self._segments: list[_FixedRun | _VariableField] = []
+
+        names: set[str] = set()
+        for index, field in enumerate(fields):
+            if field.data_type.basic_type == WmiDataType.OBJECT:
+                raise RuntimeError(f"Field {field.name} contains embedded objects")
+
+            if field.data_type.basic_type == WmiDataType.VOID:
+                raise RuntimeError(f"Field {field.name} has no data type")
+
+            if field.size_is is not None and field.size_is not in names:
+                raise RuntimeError(f"Size of field {field.name} is not known before the field")
+
+            if field.data_type.is_array and field.count is None and field.size_is is None:
+                if index != len(fields) - 1:
+                    raise RuntimeError(f"Size of field {field.name} is unknown")
+
+            names.add(field.name)
+            if not field.is_fixed:
+                self._segments.append(_VariableField(field))
+            elif self._segments and isinstance(self._segments[-1], _FixedRun):
+                self._segments[-1].fields.append(field)
+            else:
+                self._segments.append(_FixedRun([field]))
+
+    @property
+    def size(self) -> Optional[int]:
+        """Retrieve the size of the buffer if all fields have a fixed size"""
+        match self._segments:
+            case []:
+                return 0
+            case [_FixedRun() as run]:
+                return run.struct(0).size
+            case _:
+                return None
+
+    def decode(self, buffer: bytes) -> Values:
+        """Decode a buffer into a dictionary mapping the field names to their values"""
+        values: Values = {}
+        offset = 0
+        for segment in self._segments:
+            offset = segment.decode(buffer, offset, values)
+
+        return values
+
+    def encode(self, values: Mapping[str, object]) -> bytes:
+        """Encode a buffer from a mapping of field names to their values"""
+        buffer = bytearray()
+        for segment in self._segments:
+            segment.encode(values, buffer)
+
+        return bytes(buffer)
+
+
+@lru_cache(maxsize=1024)
+def compile_fields(fields: tuple[CodecField, ...], skipped: tuple[str, ...] = ()) -> WmiCodec:
+    """Compile a codec for the given fields, reusing codecs for identical fields"""
+    return WmiCodec(fields, skipped)
+
+
+def _ordered_fields(props: list[WmiProperty], strict: bool,
+                    names: tuple[str, ...] = ("wmidataid",)) -> Layout:
+    """
+    Create the fields from all properties having one of the given ordering qualifiers.
+
+    The names of the properties without an ordering qualifier are returned too, except
+    for STANDARD_PROPERTIES. When strict is set, such properties are rejected instead.
+    """
+    ordered: dict[int, WmiProperty] = {}
+    skipped: list[str] = []
+    for prop in props:
+        index = data_id(prop, names)
+        if index is None:
+            if prop.name not in STANDARD_PROPERTIES:
+                if strict:
+                    raise RuntimeError(f"Property {prop.name} has no position inside the buffer")
+
+                skipped.append(str(prop.name))
+
+            continue
+
+        if index in ordered:
+            raise RuntimeError(f"Properties {ordered[index].name} and {prop.name} "
+                               f"share the index {index}")
+
+        ordered[index] = prop
+
+    return tuple(CodecField.from_property(ordered[i]) for i in sorted(ordered)), tuple(skipped)
+
+
+def compile_object(obj: WmiObject, strict: bool = False) -> WmiCodec:
+    """
+    Compile a codec for the data block described by a WMI class.
+
+    Properties without a "WmiDataId" qualifier are not contained in the data block and
+    are listed in the skipped attribute of the codec, or rejected when strict is set.
+    """
+    return compile_fields(*_ordered_fields(list(obj.variables), strict))
+
+
+def compile_method(method: WmiMethod, strict: bool = False) -> tuple[WmiCodec, WmiCodec]:
+    """
+    Compile codecs for the input and output buffers of a WMI method.
+
+    Parameters are assigned to the input and output buffers based on their "in" and "out"
+    qualifiers and ordered by their "WmiDataId" qualifier, falling back to the "ID" qualifier
+    assigned by the MOF compiler. A non-void return value is placed after the output parameters.
+    Parameters without both qualifiers are handled like in compile_object().
+    """
+    inputs = []
+    outputs = []
+    for param in method.parameters or []:
+        directions = {(q.name or "").lower() for q in param.qualifiers or []}
+        if "in" in directions:
+            inputs.append(param)
+
+        if "out" in directions:
+            outputs.append(param)
+
+    names = ("wmidataid", "id")
+    output_fields, output_skipped = _ordered_fields(outputs, strict, names)
+    if method.return_type != WmiDataType.VOID:
+        output_fields += (CodecField(name="ReturnValue", data_type=method.return_type),)
+
+    inputs_codec = compile_fields(*_ordered_fields(inputs, strict, names))
+
+    return inputs_codec, compile_fields(output_fields, output_skipped)
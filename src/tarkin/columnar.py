@@ -0,0 +1,722 @@
+#!/usr/bin/python3
+
+"""Columnar representation of BMOF data"""
+
+from __future__ import annotations
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from enum import IntEnum, IntFlag, unique, STRICT
+from functools import partial
+from itertools import compress
+from pathlib import Path
+from struct import Struct
+from typing import Any, Final, Iterable, Optional, Sequence, cast
+from .bmof import Bmof
+from .compact import StringTable
+from .events import BmofHandler, EventParser, decompress_bmof, NULL_REFERENCE, OBJECT_HEADER, \
+    PROPERTY_HEADER, QUALIFIER_HEADER
+from .flavor import Flavors, QualifierFlavor
+from .root import Root
+from .wmi_data import WmiData
+from .wmi_method import WmiMethod
+from .wmi_object import WmiObject, WmiObjectType
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+from .wmi_type import WmiDataType, WmiType
+
+
+NO_ROW: Final = -1
+"""Row index used for missing parents and strings"""
+
+VALUE_BITS: Final = Struct("<Q")
+"""Raw representation of a value inside the value table"""
+
+REAL_BITS: Final = Struct("<d")
+"""Representation of floating point values before being stored as raw bits"""
+
+SIGN_BIT: Final = 1 << 63
+
+SYSTEM_PROPERTIES: Final = {
+    "__CLASS": "name",
+    "__SUPERCLASS": "superclass",
+    "__NAMESPACE": "namespace"
+}
+"""System properties copied into the object table"""
+
+
+@unique
+class Owner(IntEnum, boundary=STRICT):
+    """Tables containing the parent row of a row"""
+    OBJECT = 0
+    PROPERTY = 1
+    METHOD = 2
+    QUALIFIER = 3
+
+
+@unique
+class Presence(IntFlag, boundary=STRICT):
+    """Optional substructures present inside a row"""
+    QUALIFIERS = 1 << 0
+    PROPERTIES = 1 << 1
+    METHODS = 1 << 2
+    VALUE = 1 << 3
+    FLAVORS = 1 << 4
+
+
+@unique
+class ValueKind(IntEnum, boundary=STRICT):
+    """Interpretation of the raw bits of a value"""
+    BOOLEAN = 0
+    SIGNED = 1
+    UNSIGNED = 2
+    REAL = 3
+    STRING = 4
+    OBJECT = 5
+
+
+def column(typecode: str) -> Any:
+    """Create the default factory of a column"""
+    # pylint: disable=invalid-field-call
+    return field(default_factory=partial(array, typecode))
+
+
+@dataclass(slots=True)
+class ObjectTable:
+    """Columns of the objects, with embedded objects referring to their value row"""
+    # pylint: disable=too-many-instance-attributes
+
+    blob: array[int] = column("q")
+
+    parent: array[int] = column("q")
+
+    object_type: array[int] = column("B")
+
+    presence: array[int] = column("B")
+
+    offset: array[int] = column("q")
+
+    name: array[int] = column("q")
+
+    superclass: array[int] = column("q")
+
+    namespace: array[int] = column("q")
+
+    def __len__(self) -> int:
+        """Retrieve the number of rows"""
+        return len(self.object_type)
+
+
+@dataclass(slots=True)
+class PropertyTable:
+    """Columns of the properties of objects and the parameters of methods"""
+
+    owner: array[int] = column("q")
+
+    owner_kind: array[int] = column("B")
+
+    name: array[int] = column("q")
+
+    data_type: array[int] = column("L")
+
+    presence: array[int] = column("B")
+
+    offset: array[int] = column("q")
+
+    def __len__(self) -> int:
+        """Retrieve the number of rows"""
+        return len(self.data_type)
+
+
+@dataclass(slots=True)
+class MethodTable:
+    """Columns of the methods"""
+
+    owner: array[int] = column("q")
+
+    name: array[int] = column("q")
+
+    presence: array[int] = column("B")
+
+    offset: array[int] = column("q")
+
+    def __len__(self) -> int:
+        """Retrieve the number of rows"""
+        return len(self.presence)
+
+
+@dataclass(slots=True)
+class QualifierTable:
+    """Columns of the qualifiers of objects, properties and methods"""
+    # pylint: disable=too-many-instance-attributes
+
+    blob: array[int] = column("q")
+
+    owner: array[int] = column("q")
+
+    owner_kind: array[int] = column("B")
+
+    name: array[int] = column("q")
+
+    data_type: array[int] = column("L")
+
+    presence: array[int] = column("B")
+
+    flavors: array[int] = column("B")
+
+    offset: array[int] = column("q")
+
+    def __len__(self) -> int:
+        """Retrieve the number of rows"""
+        return len(self.data_type)
+
+
+@dataclass(slots=True)
+class ValueTable:
+    """Columns of the values and array items of properties and qualifiers"""
+
+    owner: array[int] = column("q")
+
+    owner_kind: array[int] = column("B")
+
+    kind: array[int] = column("B")
+
+    data: array[int] = column("Q")
+
+    def __len__(self) -> int:
+        """Retrieve the number of rows"""
+        return len(self.kind)
+
+
+def where(values: Sequence[int], value: int) -> array[int]:
+    """Retrieve the indexes of the rows whose column contains the given value"""
+    return array("q", compress(range(len(values)), map(value.__eq__, values)))
+
+
+def where_in(values: Sequence[int], selection: Iterable[int]) -> array[int]:
+    """Retrieve the indexes of the rows whose column contains one of the given values"""
+    selected = frozenset(selection)
+
+    return array("q", compress(range(len(values)), map(selected.__contains__, values)))
+
+
+def take(values: array[int], rows: Iterable[int]) -> array[int]:
+    """Retrieve the values of a column for the given rows"""
+    return array(values.typecode, map(values.__getitem__, rows))
+
+
+def group_by(values: array[int], rows: Optional[Iterable[int]] = None) -> dict[int, array[int]]:
+    """Group the given rows (default: all rows) by the values of a column"""
+    if rows is None:
+        rows = range(len(values))
+
+    groups: dict[int, array[int]] = {}
+    for row in rows:
+        value = values[row]
+        group = groups.get(value)
+        if group is None:
+            group = groups[value] = array("q")
+
+        group.append(row)
+
+    return groups
+
+
+def count_by(values: array[int], rows: Optional[Iterable[int]] = None) -> Counter[int]:
+    """Count the given rows (default: all rows) by the values of a column"""
+    if rows is None:
+        return Counter(values)
+
+    return Counter(map(values.__getitem__, rows))
+
+
+def encode_value(value: object) -> tuple[ValueKind, int]:
+    """Encode a value not being an object into its raw bits"""
+    match value:
+        case bool():
+            return ValueKind.BOOLEAN, int(value)
+        case int() if value < 0:
+            return ValueKind.SIGNED, value & (SIGN_BIT * 2 - 1)
+        case int():
+            return ValueKind.UNSIGNED, value
+        case float():
+            return ValueKind.REAL, VALUE_BITS.unpack(REAL_BITS.pack(value))[0]
+        case _:
+            raise TypeError(f"Unknown value type {type(value)}")
+
+
+class ColumnarModel:
+    """
+    Columnar representation of the contents of multiple BMOF files.
+
+    Each table stores its fields as array.array columns of integers, with each row referring
+    to the row of its parent using the owner columns. Strings like names and string values
+    are stored as indexes into a shared string pool, with NO_ROW being used for missing
+    strings. Values and array items are stored inside the value table as raw 64-bit
+    integers, whose interpretation is given by the kind column.
+
+    The columns support the buffer protocol and can therefore be wrapped by array libraries
+    without copying. Parameters of methods are stored inside the property table, with the
+    return type of a method being stored as a parameter named "ReturnValue".
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self) -> None:
+        self.strings = StringTable()
+        self.blobs: list[str] = []
+        self.objects = ObjectTable()
+        self.properties = PropertyTable()
+        self.methods = MethodTable()
+        self.qualifiers = QualifierTable()
+        self.values = ValueTable()
+        self._children: Optional[dict[tuple[int, int, int], list[int]]] = None
+
+    def intern(self, value: Optional[str]) -> int:
+        """Add a string to the string pool and return its index"""
+        index = self.strings.add(value)
+
+        return NO_ROW if index is None else index
+
+    def find(self, value: str) -> int:
+        """Retrieve the index of a string inside the string pool, or NO_ROW if missing"""
+        index = self.strings.find(value)
+
+        return NO_ROW if index is None else index
+
+    def string(self, index: int) -> Optional[str]:
+        """Retrieve a string from the string pool"""
+        if index == NO_ROW:
+            return None
+
+        return self.strings.strings[index]
+
+    def add_object(self, blob: int, parent: int, object_type: WmiObjectType, presence: Presence,
+                   offset: int) -> int:
+        """Add a object row and return its index"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self._children = None
+        objects = self.objects
+        objects.blob.append(blob)
+        objects.parent.append(parent)
+        objects.object_type.append(object_type)
+        objects.presence.append(presence)
+        objects.offset.append(offset)
+        objects.name.append(NO_ROW)
+        objects.superclass.append(NO_ROW)
+        objects.namespace.append(NO_ROW)
+
+        return len(objects) - 1
+
+    def add_property(self, owner_kind: Owner, owner: int, name: Optional[str],
+                     data_type: WmiType, presence: Presence, offset: int) -> int:
+        """Add a property row and return its index"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self._children = None
+        properties = self.properties
+        properties.owner.append(owner)
+        properties.owner_kind.append(owner_kind)
+        properties.name.append(self.intern(name))
+        properties.data_type.append(int(data_type))
+        properties.presence.append(presence)
+        properties.offset.append(offset)
+
+        return len(properties) - 1
+
+    def add_method(self, owner: int, name: Optional[str], presence: Presence,
+                   offset: int) -> int:
+        """Add a method row and return its index"""
+        self._children = None
+        methods = self.methods
+        methods.owner.append(owner)
+        methods.name.append(self.intern(name))
+        methods.presence.append(presence)
+        methods.offset.append(offset)
+
+        return len(methods) - 1
+
+    def add_qualifier(self, blob: int, owner_kind: Owner, owner: int, name: Optional[str],
+                      data_type: WmiType, presence: Presence, flavors: Flavors,
+                      offset: int) -> int:
+        """Add a qualifier row and return its index"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self._children = None
+        qualifiers = self.qualifiers
+        qualifiers.blob.append(blob)
+        qualifiers.owner.append(owner)
+        qualifiers.owner_kind.append(owner_kind)
+        qualifiers.name.append(self.intern(name))
+        qualifiers.data_type.append(int(data_type))
+        qualifiers.presence.append(presence)
+        qualifiers.flavors.append(flavors)
+        qualifiers.offset.append(offset)
+
+        return len(qualifiers) - 1
+
+    def add_value(self, owner_kind: Owner, owner: int, kind: ValueKind, data: int) -> int:
+        """Add a value row and return its index"""
+        self._children = None
+        values = self.values
+        values.owner.append(owner)
+        values.owner_kind.append(owner_kind)
+        values.kind.append(kind)
+        values.data.append(data)
+
+        return len(values) - 1
+
+    def add_scalar(self, owner_kind: Owner, owner: int, value: object) -> int:
+        """Add a value row for a value not being an object"""
+        if isinstance(value, str):
+            return self.add_value(owner_kind, owner, ValueKind.STRING, self.intern(value))
+
+        return self.add_value(owner_kind, owner, *encode_value(value))
+
+    def system_property(self, obj: int, name: Optional[str], value: object) -> None:
+        """Copy the value of a system property into the object table"""
+        column_name = SYSTEM_PROPERTIES.get(name or "")
+        if column_name is not None and isinstance(value, str):
+            getattr(self.objects, column_name)[obj] = self.intern(value)
+
+    def add_data(self, data: bytes, source: str = "") -> int:
+        """Add the contents of a BMOF data buffer and return the blob index"""
+        self.blobs.append(source)
+        blob = len(self.blobs) - 1
+        buffer = decompress_bmof(data)
+        first = len(self.qualifiers)
+        parser = EventParser(buffer, [ColumnarHandler(self, buffer, blob)])
+        parser.parse()
+
+        # Handlers receive missing flavor entries as empty flavors, so mark the present ones
+        qualifiers = self.qualifiers
+        for row in range(first, len(qualifiers)):
+            if qualifiers.offset[row] in parser.flavors:
+                qualifiers.presence[row] |= Presence.FLAVORS
+
+        return blob
+
+    def add_file(self, path: Path) -> int:
+        """Add the contents of a BMOF file and return the blob index"""
+        return self.add_data(path.read_bytes(), str(path))
+
+    def add_bmof(self, bmof: Bmof, source: str = "") -> int:
+        """Add the contents of a BMOF data class and return the blob index"""
+        self.blobs.append(source)
+        blob = len(self.blobs) - 1
+        flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+        for obj in bmof.root.objects:
+            self._add_wmi_object(obj, blob, NO_ROW, flavors)
+
+        return blob
+
+    def _add_wmi_object(self, obj: WmiObject, blob: int, parent: int,
+                        flavors: dict[int, Flavors]) -> int:
+        """Add a WMI object together with its substructures"""
+        presence = Presence(0)
+        if obj.qualifiers is not None:
+            presence |= Presence.QUALIFIERS
+        if obj.properties is not None:
+            presence |= Presence.PROPERTIES
+        if obj.methods is not None:
+            presence |= Presence.METHODS
+
+        row = self.add_object(blob, parent, obj.object_type, presence, NO_ROW)
+        self._add_wmi_qualifiers(obj.qualifiers, Owner.OBJECT, row, blob, flavors)
+        for prop in obj.properties or []:
+            self._add_wmi_property(prop, Owner.OBJECT, row, blob, flavors)
+            self.system_property(row, prop.name, prop.value)
+
+        for method in obj.methods or []:
+            presence = Presence(0) if method.qualifiers is None else Presence.QUALIFIERS
+            method_row = self.add_method(row, method.name, presence, NO_ROW)
+            for param in method.parameters or []:
+                self._add_wmi_property(param, Owner.METHOD, method_row, blob, flavors)
+
+            if method.return_type != WmiDataType.VOID:
+                self.add_property(Owner.METHOD, method_row, "ReturnValue", method.return_type,
+                                  Presence(0), NO_ROW)
+
+            self._add_wmi_qualifiers(method.qualifiers, Owner.METHOD, method_row, blob, flavors)
+
+        return row
+
+    def _add_wmi_property(self, prop: WmiProperty, owner_kind: Owner, owner: int, blob: int,
+                          flavors: dict[int, Flavors]) -> None:
+        """Add a WMI property together with its value and qualifiers"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        presence = Presence(0)
+        if prop.qualifiers is not None:
+            presence |= Presence.QUALIFIERS
+        if prop.value is not None:
+            presence |= Presence.VALUE
+
+        row = self.add_property(owner_kind, owner, prop.name, prop.data_type, presence, NO_ROW)
+        self._add_wmi_value(prop.value, prop.data_type, Owner.PROPERTY, row, blob, flavors)
+        self._add_wmi_qualifiers(prop.qualifiers, Owner.PROPERTY, row, blob, flavors)
+
+    def _add_wmi_qualifiers(self, qualifiers: Optional[list[WmiQualifier]], owner_kind: Owner,
+                            owner: int, blob: int, flavors: dict[int, Flavors]) -> None:
+        """Add WMI qualifiers together with their values"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        for qualifier in qualifiers or []:
+            presence = Presence(0) if qualifier.value is None else Presence.VALUE
+            if qualifier.offset in flavors:
+                presence |= Presence.FLAVORS
+
+            row = self.add_qualifier(blob, owner_kind, owner, qualifier.name, qualifier.data_type,
+                                     presence, flavors.get(qualifier.offset, Flavors(0)),
+                                     qualifier.offset)
+            self._add_wmi_value(qualifier.value, qualifier.data_type, Owner.QUALIFIER, row,
+                                blob, flavors)
+
+    def _add_wmi_value(self, value: object, data_type: WmiType, owner_kind: Owner, owner: int,
+                       blob: int, flavors: dict[int, Flavors]) -> None:
+        """Add the value rows of a WMI data item"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if value is None:
+            return
+
+        items = value if data_type.is_array and isinstance(value, list) else [value]
+        for item in items:
+            if isinstance(item, WmiObject):
+                row = self.add_value(owner_kind, owner, ValueKind.OBJECT, 0)
+                self.values.data[row] = self._add_wmi_object(item, blob, row, flavors)
+            else:
+                self.add_scalar(owner_kind, owner, item)
+
+    def children(self, table: Owner | None, owner_kind: Owner, owner: int) -> list[int]:
+        """
+        Retrieve the rows of a table belonging to the given owner.
+
+        The table is given using the owner kind of its rows, with None selecting the value
+        table. The index used for the lookup is created on demand.
+        """
+        if self._children is None:
+            children: dict[tuple[int, int, int], list[int]] = {}
+            for kind, owners, kinds in (
+                (Owner.PROPERTY, self.properties.owner, self.properties.owner_kind),
+                (Owner.QUALIFIER, self.qualifiers.owner, self.qualifiers.owner_kind),
+                (NO_ROW, self.values.owner, self.values.owner_kind)
+            ):
+                for row, key in enumerate(zip(owners, kinds)):
+                    children.setdefault((kind, key[1], key[0]), []).append(row)
+
+            for row, method_owner in enumerate(self.methods.owner):
+                children.setdefault((Owner.METHOD, Owner.OBJECT, method_owner), []).append(row)
+
+            self._children = children
+
+        return self._children.get((NO_ROW if table is None else table, owner_kind, owner), [])
+
+    def value(self, row: int) -> object:
+        """Retrieve a value from the value table"""
+        data = self.values.data[row]
+        match self.values.kind[row]:
+            case ValueKind.BOOLEAN:
+                return bool(data)
+            case ValueKind.SIGNED:
+                return data - SIGN_BIT * 2 if data & SIGN_BIT else data
+            case ValueKind.UNSIGNED:
+                return data
+            case ValueKind.REAL:
+                return REAL_BITS.unpack(VALUE_BITS.pack(data))[0]
+            case ValueKind.STRING:
+                return self.string(data)
+            case _:
+                return self.to_object(data)
+
+    def _wmi_value(self, owner_kind: Owner, owner: int, data_type: WmiType,
+                   presence: int) -> Optional[WmiData]:
+        """Retrieve the value of a property or qualifier"""
+        if not presence & Presence.VALUE:
+            return None
+
+        items = [self.value(row) for row in self.children(None, owner_kind, owner)]
+        if data_type.is_array:
+            return cast(WmiData, items)
+
+        return cast(WmiData, items[0])
+
+    def _wmi_qualifiers(self, owner_kind: Owner, owner: int,
+                        presence: int) -> Optional[list[WmiQualifier]]:
+        """Retrieve the qualifiers of a object, property or method"""
+        if not presence & Presence.QUALIFIERS:
+            return None
+
+        qualifiers = []
+        table = self.qualifiers
+        for row in self.children(Owner.QUALIFIER, owner_kind, owner):
+            data_type = WmiType.from_int(table.data_type[row])
+            qualifiers.append(WmiQualifier(
+                offset=table.offset[row],
+                data_type=data_type,
+                name=self.string(table.name[row]),
+                value=self._wmi_value(Owner.QUALIFIER, row, data_type, table.presence[row])
+            ))
+
+        return qualifiers
+
+    def _wmi_properties(self, owner_kind: Owner, owner: int) -> list[WmiProperty]:
+        """Retrieve the properties of a object or the parameters of a method"""
+        properties = []
+        table = self.properties
+        for row in self.children(Owner.PROPERTY, owner_kind, owner):
+            data_type = WmiType.from_int(table.data_type[row])
+            properties.append(WmiProperty(
+                data_type=data_type,
+                name=self.string(table.name[row]),
+                value=self._wmi_value(Owner.PROPERTY, row, data_type, table.presence[row]),
+                qualifiers=self._wmi_qualifiers(Owner.PROPERTY, row, table.presence[row])
+            ))
+
+        return properties
+
+    def to_object(self, row: int) -> WmiObject:
+        """Convert a object row into a WMI object"""
+        presence = self.objects.presence[row]
+        methods = None
+        if presence & Presence.METHODS:
+            methods = []
+            for method in self.children(Owner.METHOD, Owner.OBJECT, row):
+                methods.append(WmiMethod.from_properties(
+                    cast(str, self.string(self.methods.name[method])),
+                    self._wmi_properties(Owner.METHOD, method),
+                    cast(list[WmiQualifier], self._wmi_qualifiers(Owner.METHOD, method,
+                                                                  self.methods.presence[method]))
+                ))
+
+        return WmiObject(
+            object_type=WmiObjectType(self.objects.object_type[row]),
+            qualifiers=self._wmi_qualifiers(Owner.OBJECT, row, presence),
+            properties=self._wmi_properties(Owner.OBJECT, row)
+            if presence & Presence.PROPERTIES else None,
+            methods=methods
+        )
+
+    def to_bmof(self, blob: int) -> Bmof:
+        """Convert the contents of a single BMOF file into a BMOF data class"""
+        objects = self.objects
+        rows = where(objects.blob, blob)
+        top_level = [row for row in rows if objects.parent[row] == NO_ROW]
+
+        qualifiers = self.qualifiers
+        flavors = [
+            QualifierFlavor(offset=qualifiers.offset[row], flavors=Flavors(qualifiers.flavors[row]))
+            for row in where(qualifiers.blob, blob)
+            if qualifiers.presence[row] & Presence.FLAVORS
+        ]
+
+        return Bmof(
+            root=Root(objects=[self.to_object(row) for row in top_level]),
+            flavors=sorted(flavors, key=lambda f: f.offset) or None
+        )
+
+
+class ColumnarHandler(BmofHandler):
+    """
+    Handler appending the substructures of decompressed BMOF data to a columnar model.
+
+    Keyword arguments:
+    model -- columnar model receiving the rows
+    buffer -- decompressed BMOF data
+    blob -- index of the BMOF data inside the model
+    """
+    def __init__(self, model: ColumnarModel, buffer: bytes | bytearray, blob: int) -> None:
+        self.model = model
+        self.buffer = buffer
+        self.blob = blob
+        self._owners: list[tuple[Owner, int]] = []
+
+    def _presence(self, *references: tuple[int, Presence]) -> Presence:
+        """Determine the optional substructures present based on their heap references"""
+        presence = Presence(0)
+        for reference, flag in references:
+            if reference != NULL_REFERENCE:
+                presence |= flag
+
+        return presence
+
+    def start_object(self, offset: int, object_type: WmiObjectType) -> None:
+        _, qualifiers, properties, methods, _ = OBJECT_HEADER.unpack_from(self.buffer, offset)
+        presence = self._presence((qualifiers, Presence.QUALIFIERS),
+                                  (properties, Presence.PROPERTIES), (methods, Presence.METHODS))
+
+        parent = NO_ROW
+        if self._owners:
+            owner_kind, owner = self._owners[-1]
+            parent = self.model.add_value(owner_kind, owner, ValueKind.OBJECT,
+                                          len(self.model.objects))
+
+        row = self.model.add_object(self.blob, parent, object_type, presence, offset)
+        self._owners.append((Owner.OBJECT, row))
+
+    def end_object(self, offset: int, obj: Optional[WmiObject]) -> None:
+        self._owners.pop()
+
+    def _property(self, offset: int, name: Optional[str], data_type: WmiType,
+                  value: object) -> None:
+        """Add a property or parameter row"""
+        _, _, _, value_offset, qualifiers = PROPERTY_HEADER.unpack_from(self.buffer, offset)
+        presence = self._presence((value_offset, Presence.VALUE),
+                                  (qualifiers, Presence.QUALIFIERS))
+        owner_kind, owner = self._owners[-1]
+
+        row = self.model.add_property(owner_kind, owner, name, data_type, presence, offset)
+        if value is not None:
+            self.model.add_scalar(Owner.PROPERTY, row, value)
+            if owner_kind == Owner.OBJECT:
+                self.model.system_property(owner, name, value)
+
+        self._owners.append((Owner.PROPERTY, row))
+
+    def start_property(self, offset: int, name: Optional[str], data_type: WmiType,
+                       value: object) -> None:
+        self._property(offset, name, data_type, value)
+
+    def end_property(self, offset: int, name: Optional[str]) -> None:
+        self._owners.pop()
+
+    def start_method(self, offset: int, name: Optional[str]) -> None:
+        qualifiers = PROPERTY_HEADER.unpack_from(self.buffer, offset)[4]
+        presence = self._presence((qualifiers, Presence.QUALIFIERS))
+
+        row = self.model.add_method(self._owners[-1][1], name, presence, offset)
+        self._owners.append((Owner.METHOD, row))
+
+    def end_method(self, offset: int, name: Optional[str]) -> None:
+        self._owners.pop()
+
+    def start_parameter(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object) -> None:
+        self._property(offset, name, data_type, value)
+
+    def end_parameter(self, offset: int, name: Optional[str]) -> None:
+        self._owners.pop()
+
+    def start_qualifier(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object, flavors: Flavors) -> None:
+        value_offset = QUALIFIER_HEADER.unpack_from(self.buffer, offset)[3]
+        presence = self._presence((value_offset, Presence.VALUE))
+        owner_kind, owner = self._owners[-1]
+
+        row = self.model.add_qualifier(self.blob, owner_kind, owner, name, data_type, presence,
+                                       flavors, offset)
+        if value is not None:
+            self.model.add_scalar(Owner.QUALIFIER, row, value)
+
+        self._owners.append((Owner.QUALIFIER, row))
+
+    def end_qualifier(self, offset: int, name: Optional[str]) -> None:
+        self._owners.pop()
+
+    def start_array_item(self, offset: int, index: int, value: object) -> None:
+        # Embedded objects add their value row when they start
+        if value is not None:
+            owner_kind, owner = self._owners[-1]
+            self.model.add_scalar(owner_kind, owner, value)
+
+
+def load_columnar(paths: Iterable[Path]) -> ColumnarModel:
+    """Load multiple BMOF files into a columnar model"""
+    model = ColumnarModel()
+    for path in paths:
+        model.add_file(path)
+
+    return model
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+"""Compact pickling support for the BMOF data classes"""
+
+from __future__ import annotations
+from typing import Any, Optional, Protocol, Self, Sequence
+
+
+type State = tuple[Any, ...]
+
+
+class StringTable:
+    # pylint: disable=too-few-public-methods
+    """
+    Table of the unique strings inside a tree of data classes.
+
+    Each string is stored once and referenced by its index, so strings repeated
+    throughout the tree (e.g. qualifier names) are only pickled once.
+    """
+    __slots__ = ("strings", "_indexes")
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self._indexes: dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> Optional[int]:
+        """Add a string to the table and return its index"""
+        if value is None:
+            return None
+
+        index = self._indexes.get(value)
+        if index is None:
+            index = len(self.strings)
+            self._indexes[value] = index
+            self.strings.append(value)
+
+        return index
+
+    def find(self, value: str) -> Optional[int]:
+        """Retrieve the index of a string without adding it to the table"""
+        return self._indexes.get(value)
+
+
+def lookup(strings: Sequence[str], index: Optional[int]) -> Optional[str]:
+    """Retrieve a string from a string table by its index"""
+    if index is None:
+        return None
+
+    return strings[index]
+
+
+class Packable(Protocol):
+    """Data class supporting compact pickling"""
+
+    def pack(self, table: StringTable) -> State:
+        """Convert the data class into a tuple, adding all strings to the string table"""
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> Self:
+        """Create the data class from a tuple created by pack()"""
+
+
+def restore[T: Packable](cls: type[T], strings: tuple[str, ...], state: State) -> T:
+    """Restore a tree of data classes pickled using reduce()"""
+    return cls.unpack(strings, state)
+
+
+def reduce(obj: Packable) -> tuple[Any, ...]:
+    """
+    Implementation of __reduce__() used by the BMOF data classes.
+
+    The whole tree of data classes below obj is converted into nested tuples, with enums
+    being stored as integers and all strings being replaced by indexes into a single
+    string table. This avoids pickling the class and field names for every node.
+    """
+    table = StringTable()
+    state = obj.pack(table)
+
+    return restore, (type(obj), tuple(table.strings), state)
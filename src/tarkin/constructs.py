@@ -3,9 +3,123 @@
 """Common BMOF constructs"""
 
 from __future__ import annotations
-from typing import Callable
-from construct import Construct, Container, Int32ul, Prefixed, PrefixedArray, IfThenElse, \
-    Pointer, Pass
+from array import array
+from io import BytesIO
+from typing import Callable, Final, IO, Optional
+from construct import Construct, Subconstruct, Adapter, Container, Int32ul, Prefixed, \
+    PrefixedArray, IfThenElse, Pointer, Pass, ConstructError, StreamError, stream_tell, \
+    stream_seek, stream_size, stream_read, stream_write
+
+
+DECODE_BUDGET_FACTOR: Final = 64
+"""
+Maximum number of bytes decoded through heap references per byte of the data buffer.
+
+Nested heap references are charged once for every level they are nested in, so this factor
+limits the nesting depth of embedded objects while keeping the total decode work linear
+in the size of the data buffer.
+"""
+
+
+UNMARKED: Final = 0xFFFFFFFF
+"""Serial number of bytes not decoded by any heap reference"""
+
+
+STRING_TERMINATOR: Final = b"\0\0"
+"""Terminator of a null-terminated utf-16-le string"""
+
+
+type SizeCache = dict[int, tuple[object, int]]
+
+
+def size_cache(context: Container) -> SizeCache:
+    """
+    Retrieve the cache of encoded object sizes of the current building process.
+
+    Embedded objects are sized by every enclosing structure when building, so their
+    sizes are cached by identity to keep the layout linear in the size of the result.
+    The cached objects are kept alive by the cache so their identity stays unique.
+    """
+    params = context["_params"]
+    cache: Optional[SizeCache] = params.get("_size_cache")
+    if cache is None:
+        cache = {}
+        params["_size_cache"] = cache
+
+    return cache
+
+
+def decode_string(data: bytes | bytearray, offset: int) -> tuple[str, int]:
+    """
+    Decode a null-terminated utf-16-le string.
+
+    The terminator is located using a bulk search for the first null code unit aligned
+    with the start of the string, so the string is decoded using a single decode call.
+    Return the string together with the offset after the terminator.
+    """
+    end = data.find(STRING_TERMINATOR, offset)
+    while end >= 0 and (end - offset) % 2 != 0:
+        end = data.find(STRING_TERMINATOR, end + 1)
+
+    if end < 0:
+        raise StreamError(f"unterminated string at offset {offset}")
+
+    return data[offset:end].decode("utf_16_le"), end + len(STRING_TERMINATOR)
+
+
+type StringCache = dict[int, tuple[str, int]]
+
+
+class BmofString(Construct):
+    # pylint: disable=abstract-method
+    """
+    Null-terminated utf-16-le string.
+
+    Unlike CString("utf_16_le"), the terminator is not searched one code unit at a time
+    when parsing from a in-memory stream, see decode_string(). Decoded strings are
+    cached by their absolute offset inside the data buffer for the duration of the
+    parsing process. A cache shared between multiple parsing processes of the same
+    data buffer can be passed using the "_string_cache" context parameter. Likewise a
+    intern table shared between multiple data buffers can be passed using the
+    "_intern_table" context parameter, so equal strings are only stored once.
+    """
+    def _parse(self, stream: IO[bytes], context: Container, path: str) -> str:
+        params = context["_params"]
+        cache: Optional[StringCache] = params.get("_string_cache")
+        if cache is None:
+            cache = {}
+            params["_string_cache"] = cache
+
+        offset = stream_tell(stream, path)
+        entry = cache.get(offset)
+        if entry is None:
+            if isinstance(stream, BytesIO):
+                # BytesIO.getvalue() does not copy the data used to create the stream
+                position = BytesIO.tell(stream)
+                string, end = decode_string(stream.getvalue(), position)
+                entry = (string, offset + end - position)
+            else:
+                data = bytearray()
+                while (unit := stream_read(stream, 2, path)) != STRING_TERMINATOR:
+                    data += unit
+
+                entry = (data.decode("utf_16_le"), offset + len(data) + 2)
+
+            table: Optional[dict[str, str]] = params.get("_intern_table")
+            if table is not None:
+                entry = (table.setdefault(entry[0], entry[0]), entry[1])
+
+            cache[offset] = entry
+
+        stream_seek(stream, entry[1], 0, path)
+
+        return entry[0]
+
+    def _build(self, obj: str, stream: IO[bytes], context: Container, path: str) -> str:
+        data = obj.encode("utf_16_le") + STRING_TERMINATOR
+        stream_write(stream, data, len(data), path)
+
+        return obj
 
 
 class BmofArray(Prefixed):
@@ -33,6 +147,115 @@ class BmofArray(Prefixed):
         )
 
 
+class HeapReferenceError(ConstructError):
+    """Error raised when heap references are overlapping, cyclic or exceed the decode budget"""
+
+
+class HeapTracker:
+    """
+    Tracker for the byte ranges resolved by heap references.
+
+    Each heap reference is expected to resolve to a byte range which does not overlap
+    the byte ranges resolved by other heap references, except for byte ranges resolved
+    by nested heap references. A heap reference may also not point into the part of an
+    enclosing byte range which was already decoded. The total number of decoded bytes
+    is further limited by a budget proportional to the size of the data buffer, which
+    is charged for the decoded part of the enclosing byte ranges before entering a
+    nested heap reference.
+
+    Decoded byte ranges are marked inside a table holding a serial number per byte,
+    so checking and merging a byte range takes time linear in its size.
+
+    Keyword arguments:
+    size -- size of the data buffer in bytes
+    base -- offset of the start of the data buffer
+    """
+    __slots__ = ("budget", "base", "_marks", "_active", "_serial")
+
+    def __init__(self, size: int, base: int = 0) -> None:
+        self.budget = size * DECODE_BUDGET_FACTOR
+        self.base = base
+        self._marks = array("I", [UNMARKED]) * size
+        # Start, serial, position of the enclosing parse and end of the charged part
+        self._active: list[list[int]] = []
+        self._serial = 0
+
+    @classmethod
+    def from_context(cls, stream: IO[bytes], context: Container) -> HeapTracker:
+        """Retrieve the heap tracker of the current parsing process"""
+        params = context["_params"]
+        tracker: Optional[HeapTracker] = params.get("_heap_tracker")
+        if tracker is None:
+            # Substreams created by Prefixed and FixedSized refer to their parent stream
+            while getattr(stream, "parent_stream", None) is not None:
+                stream = getattr(stream, "parent_stream")
+
+            base = getattr(stream, "parent_stream_offset", 0)
+            tracker = cls(stream_size(stream) - base, base)
+            params["_heap_tracker"] = tracker
+
+        return tracker
+
+    def _charge(self, size: int, path: str) -> None:
+        """Charge the decode budget"""
+        self.budget -= size
+        if self.budget < 0:
+            raise HeapReferenceError("decode budget exhausted", path=path)
+
+    def enter(self, start: int, position: int, path: str) -> None:
+        """Start decoding the byte range starting at the given offset from the given position"""
+        for index, (active_start, _, _, _) in enumerate(self._active):
+            if active_start == start:
+                raise HeapReferenceError(f"cyclic heap reference to offset {start}", path=path)
+
+            # The enclosing byte range was decoded up to the position of its nested reference
+            limit = position if index + 1 == len(self._active) else self._active[index + 1][2]
+            if active_start < start < limit:
+                raise HeapReferenceError(f"heap reference to offset {start} overlaps enclosing "
+                                         f"offset {active_start}", path=path)
+
+        index = start - self.base
+        if 0 <= index < len(self._marks) and self._marks[index] != UNMARKED:
+            raise HeapReferenceError(f"heap reference to offset {start} overlaps a previous "
+                                     f"heap reference", path=path)
+
+        if self._active:
+            enclosing = self._active[-1]
+            if position > enclosing[3]:
+                self._charge(position - enclosing[3], path)
+                enclosing[3] = position
+
+        self._active.append([start, self._serial, position, start])
+
+    def leave(self, start: int, end: Optional[int], path: str) -> None:
+        """
+        Finish decoding the byte range started by the last call to enter().
+
+        The end is None when decoding the byte range failed, in which case the byte
+        range is discarded.
+        """
+        active_start, serial, _, charged = self._active.pop()
+        assert active_start == start
+        if end is None:
+            return
+
+        if end > charged:
+            self._charge(end - charged, path)
+
+        # Byte ranges decoded by nested heap references are merged into this byte range
+        first = max(start - self.base, 0)
+        last = min(end - self.base, len(self._marks))
+        if first >= last:
+            return
+
+        if min(self._marks[first:last]) < serial:
+            raise HeapReferenceError(f"heap reference to offset {start} overlaps a previous "
+                                     f"heap reference", path=path)
+
+        self._marks[first:last] = array("I", [self._serial]) * (last - first)
+        self._serial += 1
+
+
 class BmofHeapReference(IfThenElse):
     # pylint: disable=abstract-method
     """
@@ -50,6 +273,7 @@ class BmofHeapReference(IfThenElse):
     subcon -- subconstruct describing the substructure inside the heap
     """
     def __init__(self, offset: Callable[[Container], int], subcon: Construct) -> None:
+        self.offset = offset
         super().__init__(
             lambda context: offset(context) != 0xFFFFFFFF,  # subcon does exist
             Pointer(
@@ -58,3 +282,118 @@ class BmofHeapReference(IfThenElse):
             ),
             Pass
         )
+
+    def _parse(self, stream: IO[bytes], context: Container, path: str) -> object:
+        # pylint: disable=protected-access
+        offset = self.offset(context)
+        if offset == 0xFFFFFFFF:
+            return None
+
+        tracker = HeapTracker.from_context(stream, context)
+        fallback = stream_tell(stream, path)
+        tracker.enter(offset, fallback, path)
+        end: Optional[int] = None
+        try:
+            stream_seek(stream, offset, 0, path)
+            obj = self.thensubcon.subcon._parsereport(stream, context, path)
+            end = stream_tell(stream, path)
+        finally:
+            tracker.leave(offset, end, path)
+
+        stream_seek(stream, fallback, 0, path)
+
+        return obj
+
+
+class SpanRecorder:
+    """
+    Recorder for the byte ranges of the parsed nodes.
+
+    Each node is recorded together with the byte range of its structure and the byte
+    range of its value, if any. Nodes are keyed by their identity and kept alive by
+    the recorder, since the parsed nodes are frozen and are compared by value.
+    """
+    __slots__ = ("nodes", "values", "_frames")
+
+    def __init__(self) -> None:
+        self.nodes: dict[int, tuple[object, int, int]] = {}
+        self.values: dict[int, tuple[int, int]] = {}
+        self._frames: list[Optional[tuple[int, int]]] = []
+
+    def enter(self) -> None:
+        """Start parsing a node"""
+        self._frames.append(None)
+
+    def value(self, start: int, end: int) -> None:
+        """Record the byte range of the value of the node being parsed"""
+        self._frames[-1] = (start, end)
+
+    def leave(self, obj: object, start: int, end: int) -> None:
+        """Finish parsing the node started by the last call to enter()"""
+        value = self._frames.pop()
+        self.nodes[id(obj)] = (obj, start, end)
+        if value is not None:
+            self.values[id(obj)] = value
+
+    def cancel(self) -> None:
+        """Abort parsing the node started by the last call to enter()"""
+        self._frames.pop()
+
+    def alias(self, obj: object, original: object) -> None:
+        """Record a node derived from another node using the byte ranges of the other node"""
+        entry = self.nodes.get(id(original))
+        if entry is None:
+            return
+
+        self.nodes[id(obj)] = (obj, entry[1], entry[2])
+        value = self.values.get(id(original))
+        if value is not None:
+            self.values[id(obj)] = value
+
+
+class SpanAdapter(Adapter):
+    # pylint: disable=abstract-method
+    """
+    Adapter recording the byte range of the decoded node.
+
+    When a SpanRecorder is passed using the "_span_recorder" parameter, the start and
+    end offsets of the decoded node are recorded inside it. Otherwise the node is
+    parsed unchanged. Building is not affected.
+    """
+    def _parse(self, stream: IO[bytes], context: Container, path: str) -> object:
+        recorder: Optional[SpanRecorder] = context["_params"].get("_span_recorder")
+        if recorder is None:
+            return super()._parse(stream, context, path)
+
+        start = stream_tell(stream, path)
+        recorder.enter()
+        try:
+            obj = super()._parse(stream, context, path)
+        except BaseException:
+            recorder.cancel()
+            raise
+
+        recorder.leave(obj, start, stream_tell(stream, path))
+
+        return obj
+
+
+class ValueSpan(Subconstruct):
+    # pylint: disable=abstract-method
+    """
+    Wrapper recording the byte range of the value of the node being decoded.
+
+    The byte range is recorded inside the SpanRecorder passed using the "_span_recorder"
+    parameter, if any, and is attached to the enclosing node decoded by a SpanAdapter.
+    """
+    def _parse(self, stream: IO[bytes], context: Container, path: str) -> object:
+        # pylint: disable=protected-access
+        recorder: Optional[SpanRecorder] = context["_params"].get("_span_recorder")
+        if recorder is None:
+            return self.subcon._parsereport(stream, context, path)
+
+        start = stream_tell(stream, path)
+        obj = self.subcon._parsereport(stream, context, path)
+        recorder.value(start, stream_tell(stream, path))
+
+        return obj
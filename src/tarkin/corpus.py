@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+
+"""Aggregate statistics across a corpus of BMOF files"""
+
+from __future__ import annotations
+import csv
+import json
+from collections import Counter
+from concurrent.futures import Executor
+from dataclasses import dataclass, field, fields
+from hashlib import sha256
+from itertools import repeat
+from pathlib import Path
+from threading import local
+from typing import Any, Final, Iterable, Iterator, Optional, TextIO
+from .aio import CHUNK_SIZE, ExecutorKind, expand_paths, owned_executor
+from .bmof import BMOF_MAGIC
+from .session import ParserSession
+from .wmi_object import WmiObject, WmiObjectType
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+from .wmi_type import WmiType
+
+
+HISTOGRAMS: Final = (
+    "classes",
+    "instances",
+    "namespaces",
+    "qualifiers",
+    "data_types",
+    "methods"
+)
+"""Histograms of CorpusStats, in the order in which they are written"""
+
+_SESSIONS: Final = local()
+"""Parser sessions of the threads aggregating BMOF files"""
+
+
+def _type_name(data_type: WmiType) -> str:
+    """Format the name of a WMI type"""
+    name = data_type.basic_type.name.lower()
+
+    return f"{name}[]" if data_type.is_array else name
+
+
+def _value(value: object) -> str:
+    """Format a qualifier value"""
+    if isinstance(value, str):
+        return value
+
+    return json.dumps(value)
+
+
+@dataclass(slots=True)
+class CorpusStats:
+    """
+    Mergeable histograms over the objects inside a corpus of BMOF files.
+
+    Each file is identified by the SHA-256 digest of its content, so files already
+    contained in the aggregation are skipped when extending it with new files.
+    Qualifier values are keyed by the qualifier name, with non-string values being
+    formatted as JSON. The method histogram counts the classes by number of methods.
+
+    Keyword arguments:
+    files -- number of aggregated files
+    errors -- number of files which could not be parsed
+    digests -- digests of the aggregated files
+    classes -- number of class definitions by class name
+    instances -- number of instances by class name
+    namespaces -- number of top-level objects by namespace
+    qualifiers -- number of qualifiers by name
+    qualifier_values -- number of qualifiers by name and value
+    data_types -- number of properties and parameters by WMI type
+    methods -- number of classes by number of methods
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    files: int = 0
+
+    errors: int = 0
+
+    digests: set[str] = field(default_factory=set)
+
+    classes: Counter[str] = field(default_factory=Counter)
+
+    instances: Counter[str] = field(default_factory=Counter)
+
+    namespaces: Counter[str] = field(default_factory=Counter)
+
+    qualifiers: Counter[str] = field(default_factory=Counter)
+
+    qualifier_values: dict[str, Counter[str]] = field(default_factory=dict)
+
+    data_types: Counter[str] = field(default_factory=Counter)
+
+    methods: Counter[str] = field(default_factory=Counter)
+
+    def _qualifiers(self, qualifiers: Optional[list[WmiQualifier]]) -> None:
+        """Count qualifiers together with their values"""
+        for qualifier in qualifiers or []:
+            name = qualifier.name or ""
+            self.qualifiers[name] += 1
+            values = self.qualifier_values.get(name)
+            if values is None:
+                values = Counter()
+                self.qualifier_values[name] = values
+
+            values[_value(qualifier.value)] += 1
+
+    def _property(self, prop: WmiProperty) -> None:
+        """Count the type and qualifiers of a property or parameter"""
+        self.data_types[_type_name(prop.data_type)] += 1
+        self._qualifiers(prop.qualifiers)
+
+    def add_object(self, obj: WmiObject) -> None:
+        """Add a top-level object"""
+        name = obj.name or ""
+        if obj.object_type == WmiObjectType.CLASS:
+            self.classes[name] += 1
+            self.methods[str(len(obj.methods or []))] += 1
+        else:
+            self.instances[name] += 1
+
+        if obj.namespace is not None:
+            self.namespaces[obj.namespace] += 1
+
+        self._qualifiers(obj.qualifiers)
+        for prop in obj.variables:
+            self._property(prop)
+
+        for method in obj.methods or []:
+            self._qualifiers(method.qualifiers)
+            for param in method.parameters or []:
+                self._property(param)
+
+    def merge(self, other: CorpusStats) -> None:
+        """
+        Add the statistics of another aggregation, skipping it if already contained.
+
+        Aggregations sharing only some of their files with this aggregation are rejected,
+        since the statistics of the shared files cannot be separated from the others.
+        """
+        if other.digests and other.digests <= self.digests:
+            return
+
+        if not other.digests.isdisjoint(self.digests):
+            raise ValueError("Aggregations partially overlap")
+
+        self.files += other.files
+        self.errors += other.errors
+        self.digests |= other.digests
+        for name in HISTOGRAMS:
+            getattr(self, name).update(getattr(other, name))
+
+        for name, values in other.qualifier_values.items():
+            self.qualifier_values.setdefault(name, Counter()).update(values)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the statistics into a dictionary suitable for JSON"""
+        result: dict[str, Any] = {}
+        for entry in fields(self):
+            value = getattr(self, entry.name)
+            if isinstance(value, set):
+                value = sorted(value)
+            elif isinstance(value, Counter):
+                value = dict(value.most_common())
+            elif isinstance(value, dict):
+                value = {k: dict(v.most_common()) for k, v in sorted(value.items())}
+
+            result[entry.name] = value
+
+        return result
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CorpusStats:
+        """Restore statistics converted using to_dict()"""
+        return cls(
+            files=data["files"],
+            errors=data["errors"],
+            digests=set(data["digests"]),
+            qualifier_values={k: Counter(v) for k, v in data["qualifier_values"].items()},
+            **{name: Counter(data[name]) for name in HISTOGRAMS}
+        )
+
+    def write_json(self, out: TextIO) -> None:
+        """Write the statistics as JSON"""
+        json.dump(self.to_dict(), out, ensure_ascii=False, indent=4)
+        out.write("\n")
+
+    @classmethod
+    def read_json(cls, source: TextIO) -> CorpusStats:
+        """Read statistics written using write_json()"""
+        return cls.from_dict(json.load(source))
+
+    def write_csv(self, out: TextIO) -> None:
+        """Write the histograms as CSV, with one row per histogram entry"""
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(("histogram", "key", "value", "count"))
+        writer.writerow(("files", "", "", self.files))
+        writer.writerow(("errors", "", "", self.errors))
+        for name in HISTOGRAMS:
+            for key, count in getattr(self, name).most_common():
+                writer.writerow((name, key, "", count))
+
+        for key, values in sorted(self.qualifier_values.items()):
+            for value, count in values.most_common():
+                writer.writerow(("qualifier_values", key, value, count))
+
+
+def file_stats(entry: tuple[Path, bool], skip: frozenset[str] = frozenset()) -> CorpusStats:
+    """
+    Calculate the statistics of a file returned by expand_paths().
+
+    Files whose digest is contained in skip result in empty statistics. Files found
+    inside directories are skipped unless they start with the BMOF magic constant.
+    Errors are counted instead of being raised.
+    """
+    path, explicit = entry
+    stats = CorpusStats()
+    try:
+        data = path.read_bytes()
+    except OSError:
+        stats.errors += 1
+        return stats
+
+    digest = sha256(data).hexdigest()
+    if digest in skip or (not explicit and not data.startswith(BMOF_MAGIC)):
+        return stats
+
+    session: Optional[ParserSession] = getattr(_SESSIONS, "session", None)
+    if session is None:
+        session = ParserSession()
+        _SESSIONS.session = session
+
+    stats.files += 1
+    stats.digests.add(digest)
+    try:
+        bmof = session.parse(data)
+    except Exception:  # pylint: disable=broad-exception-caught
+        stats.errors += 1
+        return stats
+
+    for obj in bmof.root.objects:
+        stats.add_object(obj)
+
+    return stats
+
+
+def iter_corpus_stats(paths: Iterable[Path], include: str = "*",
+                      executor: Optional[Executor] = None, kind: ExecutorKind = "process",
+                      workers: Optional[int] = None,
+                      skip: frozenset[str] = frozenset()) -> Iterator[tuple[Path, CorpusStats]]:
+    """
+    Calculate the statistics of multiple files in parallel, yielding them in order.
+
+    Directories are searched recursively for files matching the glob pattern include.
+    When no executor is given, a executor of the given kind is created and shut down
+    afterwards. Files whose digest is contained in skip are not parsed.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    with owned_executor(executor, kind, workers) as pool:
+        entries = list(expand_paths(paths, include))
+        results = pool.map(file_stats, entries, repeat(skip), chunksize=CHUNK_SIZE)
+        for (path, _), stats in zip(entries, results):
+            yield path, stats
+
+
+def corpus_stats(paths: Iterable[Path], include: str = "*", executor: Optional[Executor] = None,
+                 kind: ExecutorKind = "process", workers: Optional[int] = None,
+                 previous: Optional[CorpusStats] = None) -> CorpusStats:
+    """
+    Aggregate the statistics of multiple files in parallel.
+
+    The partial statistics of each file are calculated by the workers and merged
+    afterwards. When previous statistics are given, they are extended with the files
+    not already contained in them.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    stats = CorpusStats() if previous is None else previous
+    for _, partial in iter_corpus_stats(paths, include, executor, kind, workers,
+                                        frozenset(stats.digests)):
+        stats.merge(partial)
+
+    return stats
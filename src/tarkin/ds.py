@@ -3,8 +3,71 @@
 """Doublespace decompression"""
 
 from __future__ import annotations
-from doublespace import decompress
-from construct import Container, Tunnel, Construct, Path, evaluate
+import sys
+from errno import EINVAL
+from importlib import import_module
+from io import BytesIO
+from typing import Callable, Final, IO, Iterable, Iterator, Optional
+from construct import Container, Tunnel, Construct, Subconstruct, Path, Int32ul, evaluate, \
+    stream_read, stream_write
+
+
+DS_MAGIC: Final = b"DS\x00\x01"
+
+DS_BLOCK_SIZE: Final = 512
+
+DS_MAX_OFFSET: Final = 4414
+
+DS_MARKER: Final = 4415
+
+DS_MAX_TOKEN_BITS: Final = 32
+
+DS_MAX_CHAIN: Final = 64
+
+_is_gil_enabled: Final[Callable[[], bool]] = getattr(sys, "_is_gil_enabled", lambda: True)
+"""Check whether the global interpreter lock is enabled, always true on older interpreters"""
+
+GIL_DISABLED: Final = not _is_gil_enabled()
+"""Whether the interpreter is running without the global interpreter lock"""
+
+
+EXTENSION_MODULE: Final = "doublespace"
+"""Name of the extension module providing a faster decompression function"""
+
+
+def supports_free_threading(name: str) -> bool:
+    """Import a module, checking whether the global interpreter lock stays disabled"""
+    if _is_gil_enabled():
+        return False
+
+    try:
+        import_module(name)
+    except ImportError:
+        return False
+
+    # Importing extension modules not declaring free-threading support using Py_mod_gil
+    # enables the GIL for the rest of the process, which the interpreter warns about.
+    return not _is_gil_enabled()
+
+
+def _load_extension() -> Optional[Callable[[bytes | memoryview, bytearray | memoryview], None]]:
+    """Load the decompression function of the doublespace extension module if usable"""
+    if GIL_DISABLED and not supports_free_threading(EXTENSION_MODULE):
+        return None
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from doublespace import decompress
+    except ImportError:
+        return None
+
+    function: Callable[[bytes | memoryview, bytearray | memoryview], None] = decompress
+
+    return function
+
+
+DS_EXTENSION: Final = _load_extension()
+"""Decompression function of the doublespace extension module, None when not usable"""
 
 
 class CompressedDS(Tunnel):
@@ -23,10 +86,351 @@ class CompressedDS(Tunnel):
         length: int = evaluate(self.length, context)
         buffer = bytearray(length)
 
-        decompress(data, buffer)
+        decompress_into(data, buffer)
 
         return buffer
 
     def _encode(self, data: bytes, context: Container, path: str):
         """Doublespace compression"""
-        raise NotImplementedError("Doublespace compression not implemented")
+        return compress(data)
+
+
+class PrefixedDS(Subconstruct):
+    # pylint: disable=abstract-method
+    """
+    Doublespace-compressed container prefixed by its length.
+
+    The compressed data is prefixed by a header containing the following fields:
+     - A 32-bit little endian length field specifying the length of the compressed data in bytes
+     - A 32-bit little endian length field specifying the length of the decompressed data in bytes
+
+    Unlike CompressedDS, both length fields are written after the compressed data is known
+    when building.
+    """
+    def _parse(self, stream: IO[bytes], context: Container, path: str) -> object:
+        # pylint: disable=protected-access
+        compressed_length: int = Int32ul._parsereport(stream, context, path)
+        final_length: int = Int32ul._parsereport(stream, context, path)
+        buffer = bytearray(final_length)
+
+        decompress_into(stream_read(stream, compressed_length, path), buffer)
+
+        return self.subcon.parse(buffer, **context)
+
+    def _build(self, obj: object, stream: IO[bytes], context: Container, path: str) -> object:
+        # pylint: disable=protected-access
+        substream = BytesIO()
+        buildret = self.subcon._build(obj, substream, context, path)
+        data = substream.getvalue()
+        compressed = compress(data)
+
+        Int32ul._build(len(compressed), stream, context, path)
+        Int32ul._build(len(data), stream, context, path)
+        stream_write(stream, compressed, len(compressed), path)
+
+        return buildret
+
+
+class DsDecompressor:
+    """
+    Incremental doublespace decompressor.
+
+    Compressed data is fed in chunks of arbitrary size using decompress(), which returns
+    the data decompressed so far. Consumed input is released immediately, and only the last
+    DS_MAX_OFFSET bytes of output are retained for resolving back references.
+
+    The compressed data consists of a 4-byte magic constant ("DS\\x00\\x01") followed by a
+    bitstream which is read starting with the least significant bit of each byte.
+    The bitstream contains the following tokens:
+     - 0 1 + 7 bits: literal byte between 0x00 and 0x7F
+     - 1 0 + 7 bits: literal byte between 0x80 and 0xFF
+     - 0 0 + 6 bits: match with an offset between 1 and 63
+     - 1 1 0 + 8 bits: match with an offset between 64 and 319
+     - 1 1 1 + 12 bits: match with an offset between 320 and 4414, with the offset 4415
+       being used as a marker after every block of DS_BLOCK_SIZE bytes and at the end of data
+    The offset of a match is followed by its length, encoded as n zero bits, a one bit and
+    n bits which are added to 2^n + 1.
+
+    Keyword arguments:
+    length -- length of the decompressed data in bytes
+    """
+    __slots__ = ("length", "produced", "_input", "_position", "_window")
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.produced = 0
+        self._input = b""
+        self._position = -1
+        self._window = bytearray()
+
+    @property
+    def eof(self) -> bool:
+        """Check if all data was decompressed"""
+        return self.produced == self.length
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress a chunk of compressed data"""
+        if self._position < 0:
+            self._input += data
+        else:
+            self._input = self._input[self._position >> 3:] + data
+            self._position &= 0x7
+
+        return self._run(DS_MAX_TOKEN_BITS)
+
+    def flush(self) -> bytes:
+        """Decompress the remaining data after all compressed data was fed"""
+        data = self._run(1)
+        if not self.eof:
+            raise RuntimeError("Decompression did not consume all data")
+
+        return data
+
+    def _run(self, reserve: int) -> bytes:
+        # pylint: disable=too-many-branches,too-many-locals,too-many-statements
+        if self._position < 0:
+            if len(self._input) < len(DS_MAGIC):
+                return b""
+
+            if self._input[:len(DS_MAGIC)] != DS_MAGIC:
+                raise OSError(EINVAL, "Invalid doublespace magic")
+
+            self._position = len(DS_MAGIC) * 8
+
+        data = self._input
+        limit = len(data) * 8 - reserve
+        position = self._position
+        window = self._window
+        start = len(window)
+        remaining = self.length - self.produced
+
+        while remaining > 0 and position <= limit:
+            index = position >> 3
+            bits = int.from_bytes(data[index:index + 5], "little") >> (position & 7)
+
+            match bits & 0x3:
+                case 0x2:
+                    window.append((bits >> 2) & 0x7F)
+                    remaining -= 1
+                    position += 9
+                    continue
+                case 0x1:
+                    window.append(((bits >> 2) & 0x7F) | 0x80)
+                    remaining -= 1
+                    position += 9
+                    continue
+                case 0x0:
+                    offset = (bits >> 2) & 0x3F
+                    used = 8
+                case _:
+                    if not bits & 0x4:
+                        offset = ((bits >> 3) & 0xFF) + 64
+                        used = 11
+                    else:
+                        offset = ((bits >> 3) & 0xFFF) + 320
+                        used = 15
+                        if offset == DS_MARKER:
+                            position += used
+                            continue
+
+            bits >>= used
+            zeros = (bits & -bits).bit_length() - 1
+            if zeros < 0 or zeros > 8:
+                raise OSError(EINVAL, "Invalid doublespace match length")
+
+            length = (1 << zeros) + ((bits >> (zeros + 1)) & ((1 << zeros) - 1)) + 1
+            position += used + 2 * zeros + 1
+
+            begin = len(window) - offset
+            if offset == 0 or begin < 0 or length > remaining:
+                raise OSError(EINVAL, "Invalid doublespace match")
+
+            if offset >= length:
+                window += window[begin:begin + length]
+            else:
+                window += (window[begin:] * (length // offset + 1))[:length]
+
+            remaining -= length
+
+        if position > len(data) * 8:
+            raise OSError(EINVAL, "Truncated doublespace data")
+
+        self._position = position
+        self.produced = self.length - remaining
+        output = bytes(window[start:])
+        del window[:-DS_MAX_OFFSET]
+
+        return output
+
+
+class _MatchFinder:
+    """Hash chains over three-byte sequences used for finding matches"""
+    __slots__ = ("data", "heads", "chains", "inserted")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.heads: dict[bytes, int] = {}
+        self.chains = [-1] * len(data)
+        self.inserted = 0
+
+    def insert(self, end: int) -> None:
+        """Insert all positions before the given position into the hash chains"""
+        data = self.data
+        for index in range(self.inserted, min(end, len(data) - 2)):
+            key = data[index:index + 3]
+            self.chains[index] = self.heads.get(key, -1)
+            self.heads[key] = index
+
+        self.inserted = max(self.inserted, end)
+
+    def find(self, position: int, end: int) -> tuple[int, int]:
+        """Find the longest match for the given position not extending beyond the end"""
+        data = self.data
+        best_length = 0
+        best_offset = 0
+
+        if position + 3 <= end:
+            self.insert(position)
+            candidate = self.heads.get(data[position:position + 3], -1)
+            for _ in range(DS_MAX_CHAIN):
+                if candidate < 0 or position - candidate > DS_MAX_OFFSET:
+                    break
+
+                length = 3
+                while position + length < end and \
+                        data[candidate + length] == data[position + length]:
+                    length += 1
+
+                if length > best_length:
+                    best_length = length
+                    best_offset = position - candidate
+                    if position + length == end:
+                        break
+
+                candidate = self.chains[candidate]
+
+        if best_length == 0 and 0 < position < end - 1 and \
+                data[position - 1:position + 1] == data[position:position + 2]:
+            return 2, 1
+
+        return best_length, best_offset
+
+
+class _BitWriter:
+    """Writer for bitstreams starting with the least significant bit of each byte"""
+    __slots__ = ("output", "bits", "count")
+
+    def __init__(self, output: bytearray) -> None:
+        self.output = output
+        self.bits = 0
+        self.count = 0
+
+    def write(self, value: int, width: int) -> None:
+        """Write the given number of bits"""
+        self.bits |= value << self.count
+        self.count += width
+        while self.count >= 8:
+            self.output.append(self.bits & 0xFF)
+            self.bits >>= 8
+            self.count -= 8
+
+    def literal(self, value: int) -> None:
+        """Write a literal byte"""
+        if value < 0x80:
+            self.write((value << 2) | 0x2, 9)
+        else:
+            self.write(((value & 0x7F) << 2) | 0x1, 9)
+
+    def match(self, offset: int, length: int) -> None:
+        """Write a match"""
+        if offset < 64:
+            self.write(offset << 2, 8)
+        elif offset < 320:
+            self.write(((offset - 64) << 3) | 0x3, 11)
+        else:
+            self.write(((offset - 320) << 3) | 0x7, 15)
+
+        zeros = (length - 1).bit_length() - 1
+        extra = length - 1 - (1 << zeros)
+        self.write((1 << zeros) | (extra << (zeros + 1)), 2 * zeros + 1)
+
+    def marker(self) -> None:
+        """Write a block marker"""
+        self.write(((DS_MARKER - 320) << 3) | 0x7, 15)
+
+    def flush(self) -> None:
+        """Write the remaining bits padded to a full byte"""
+        if self.count > 0:
+            self.output.append(self.bits & 0xFF)
+            self.bits = 0
+            self.count = 0
+
+
+def compress(data: bytes) -> bytes:
+    """
+    Doublespace compression.
+
+    Matches are searched using hash chains over three-byte sequences with one step
+    of lazy evaluation, and never cross the boundary of a block since the decompressor
+    expects a marker after every block.
+    """
+    output = bytearray(DS_MAGIC)
+    writer = _BitWriter(output)
+    finder = _MatchFinder(data)
+
+    # Empty data still needs a single marker
+    for block in range(0, max(len(data), 1), DS_BLOCK_SIZE):
+        end = min(block + DS_BLOCK_SIZE, len(data))
+        position = block
+        length, offset = finder.find(position, end)
+
+        while position < end:
+            if length >= 2:
+                next_length, next_offset = finder.find(position + 1, end)
+                if next_length <= length + 1:
+                    writer.match(offset, length)
+                    position += length
+                    length, offset = finder.find(position, end)
+                    continue
+            else:
+                next_length, next_offset = finder.find(position + 1, end)
+
+            writer.literal(data[position])
+            position += 1
+            length, offset = next_length, next_offset
+
+        writer.marker()
+
+    writer.flush()
+
+    return bytes(output)
+
+
+def decompress_into(data: bytes | memoryview, buffer: bytearray | memoryview) -> None:
+    """
+    Decompress doublespace-compressed data into a buffer having the decompressed length.
+
+    The doublespace extension module is used when available, otherwise the data is
+    decompressed using DsDecompressor. Both release no shared state, so this function
+    can be called concurrently from multiple threads.
+    """
+    if DS_EXTENSION is not None:
+        DS_EXTENSION(data, buffer)
+        return
+
+    decompressor = DsDecompressor(len(buffer))
+    buffer[:] = decompressor.decompress(bytes(data)) + decompressor.flush()
+
+
+def decompress_chunks(chunks: Iterable[bytes], length: int) -> Iterator[bytes]:
+    """Incrementally decompress doublespace-compressed data split into multiple chunks"""
+    decompressor = DsDecompressor(length)
+
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+
+    data = decompressor.flush()
+    if data:
+        yield data
@@ -0,0 +1,416 @@
+#!/usr/bin/python3
+
+"""Event-based BMOF parser"""
+
+from __future__ import annotations
+from pathlib import Path
+from struct import Struct
+from typing import Final, Iterable, Optional
+from construct import BytesIOWithOffsets, StreamError, MappingError, ExplicitError
+from .bmof import BMOF_HEADER, BMOF_HEADER_SIZE
+from .constructs import HeapTracker, decode_string
+from .ds import decompress_into
+from .flavor import Flavors
+from .root import BMOF_ROOT_HEADER
+from .stream import BMOF_TRAILER
+from .wmi_object import BMOF_WMI_OBJECT, WmiObject, WmiObjectType
+from .wmi_type import WmiType, WmiDataType
+
+
+NULL_REFERENCE: Final = 0xFFFFFFFF
+
+TRACKER_PATH: Final = "(events)"
+"""Path reported by errors of the heap tracker"""
+
+OBJECT_HEADER: Final = Struct("<IIIII")
+"""Header of a BMOF object (length, qualifiers, properties, methods, object type)"""
+
+PROPERTY_HEADER: Final = Struct("<IIIII")
+"""Header of a BMOF property (length, data type, name, value, qualifiers)"""
+
+QUALIFIER_HEADER: Final = Struct("<IIII")
+"""Header of a BMOF qualifier (length, data type, name, value)"""
+
+ARRAY_HEADER: Final = Struct("<II")
+"""Header of a BMOF array (length, count)"""
+
+DATA_ARRAY_HEADER: Final = Struct("<IIII")
+"""Header of a WMI data array (length, unknown, count, length of the items)"""
+
+SCALARS: Final = {
+    WmiDataType.BOOLEAN: Struct("<H"),
+    WmiDataType.UINT8: Struct("<B"),
+    WmiDataType.SINT8: Struct("<b"),
+    WmiDataType.UINT16: Struct("<H"),
+    WmiDataType.SINT16: Struct("<h"),
+    WmiDataType.UINT32: Struct("<I"),
+    WmiDataType.SINT32: Struct("<i"),
+    WmiDataType.UINT64: Struct("<Q"),
+    WmiDataType.SINT64: Struct("<q"),
+    WmiDataType.REAL32: Struct("<f"),
+    WmiDataType.REAL64: Struct("<d")
+}
+"""Structs used for decoding fixed-size WMI data items"""
+
+
+class BmofHandler:
+    """
+    Base class for consumers of BMOF parsing events.
+
+    All methods do nothing by default, so consumers only need to override the
+    methods for the events they are interested in. Each event receives the offset
+    of the associated substructure inside the decompressed BMOF data.
+
+    Values of properties, parameters and qualifiers are only provided for
+    non-array data items not containing objects. Array items are reported using
+    separate events, while embedded objects are reported using nested object events.
+
+    Consumers setting wants_objects receive the decoded WMI object when an object ends.
+    """
+    wants_objects: bool = False
+
+    def start_object(self, offset: int, object_type: WmiObjectType) -> None:
+        """Called when an object starts"""
+
+    def end_object(self, offset: int, obj: Optional[WmiObject]) -> None:
+        """Called when an object ends"""
+
+    def start_property(self, offset: int, name: Optional[str], data_type: WmiType,
+                       value: object) -> None:
+        """Called when a property starts"""
+
+    def end_property(self, offset: int, name: Optional[str]) -> None:
+        """Called when a property ends"""
+
+    def start_method(self, offset: int, name: Optional[str]) -> None:
+        """Called when a method starts"""
+
+    def end_method(self, offset: int, name: Optional[str]) -> None:
+        """Called when a method ends"""
+
+    def start_parameter(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object) -> None:
+        """
+        Called when a method parameter starts.
+
+        Parameters are reported once for each parameter object containing them, so parameters
+        being both input and output parameters are reported twice. The return value is
+        reported as a parameter named "ReturnValue".
+        """
+
+    def end_parameter(self, offset: int, name: Optional[str]) -> None:
+        """Called when a method parameter ends"""
+
+    def start_qualifier(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object, flavors: Flavors) -> None:
+        """Called when a qualifier starts"""
+
+    def end_qualifier(self, offset: int, name: Optional[str]) -> None:
+        """Called when a qualifier ends"""
+
+    def start_array_item(self, offset: int, index: int, value: object) -> None:
+        """Called when a item of a data array starts"""
+
+    def end_array_item(self, offset: int, index: int) -> None:
+        """Called when a item of a data array ends"""
+
+
+class EventParser:
+    # pylint: disable=too-few-public-methods
+    """
+    Single-pass parser emitting events for the substructures of decompressed BMOF data.
+
+    The parser does not create any WMI objects, unless a handler wants to receive them.
+    Multiple handlers receive the events in the order they were passed. Heap references
+    are checked using a HeapTracker, so the same data is rejected as when using BMOF.
+
+    Keyword arguments:
+    buffer -- decompressed BMOF data
+    handlers -- handlers receiving the events
+    """
+    def __init__(self, buffer: bytes | bytearray, handlers: Iterable[BmofHandler]) -> None:
+        self.buffer = buffer
+        self.handlers = list(handlers)
+        self.wants_objects = any(h.wants_objects for h in self.handlers)
+        self.flavors: dict[int, Flavors] = {}
+        self._tracker = HeapTracker(len(buffer))
+
+    def _unpack(self, struct: Struct, offset: int) -> tuple[int, ...]:
+        """Unpack a struct at the given offset"""
+        if offset < 0 or offset + struct.size > len(self.buffer):
+            raise StreamError(f"stream read less than specified amount, expected {struct.size} "
+                              f"at offset {offset}")
+
+        return struct.unpack_from(self.buffer, offset)
+
+    def _enter(self, heap: int, reference: int) -> Optional[int]:
+        """Resolve a heap reference and start tracking the referenced byte range"""
+        if reference == NULL_REFERENCE:
+            return None
+
+        position = heap + reference
+        self._tracker.enter(position, heap, TRACKER_PATH)
+
+        return position
+
+    def _leave(self, position: Optional[int], end: int) -> None:
+        """Finish tracking a byte range started by _enter()"""
+        if position is not None:
+            self._tracker.leave(position, end, TRACKER_PATH)
+
+    def _leave_array(self, position: Optional[int]) -> None:
+        """Finish tracking a BMOF array or WMI data array started by _enter()"""
+        if position is not None:
+            (length,) = self._unpack(SCALARS[WmiDataType.UINT32], position)
+            self._leave(position, position + length)
+
+    def _name(self, heap: int, reference: int) -> Optional[str]:
+        """Decode the name referenced by a heap reference"""
+        position = self._enter(heap, reference)
+        if position is None:
+            return None
+
+        name, end = decode_string(self.buffer, position)
+        self._leave(position, end)
+
+        return name
+
+    def _leave_data(self, position: Optional[int], data_type: WmiType) -> None:
+        """Finish tracking a data item started by _enter()"""
+        if position is None:
+            return
+
+        if data_type.is_array or data_type.basic_type == WmiDataType.OBJECT:
+            self._leave_array(position)
+        else:
+            self._leave(position, position + self._scalar(position, data_type.basic_type)[1])
+
+    def _scalar(self, offset: int, basic_type: WmiDataType) -> tuple[object, int]:
+        """Decode a single data item not containing objects and return it with its size"""
+        if basic_type == WmiDataType.STRING:
+            string, end = decode_string(self.buffer, offset)
+            return string, end - offset
+
+        struct = SCALARS.get(basic_type)
+        if struct is None:
+            raise ExplicitError(f"Error field was activated for data type {basic_type!r}")
+
+        (value,) = self._unpack(struct, offset)
+        if basic_type == WmiDataType.BOOLEAN:
+            if value not in (0x0, 0xFFFF):
+                raise MappingError(f"no decoding mapping for {value!r}")
+
+            return value == 0xFFFF, struct.size
+
+        return value, struct.size
+
+    def _data(self, offset: Optional[int], data_type: WmiType) -> object:
+        """Decode a data item, returning None for arrays and objects"""
+        if offset is None or data_type.is_array or data_type.basic_type == WmiDataType.OBJECT:
+            return None
+
+        return self._scalar(offset, data_type.basic_type)[0]
+
+    def _data_items(self, offset: Optional[int], data_type: WmiType) -> None:
+        """Emit the events for array items and embedded objects of a data item"""
+        if offset is None:
+            return
+
+        if not data_type.is_array:
+            if data_type.basic_type == WmiDataType.OBJECT:
+                self._object(offset)
+            return
+
+        _, _, count, _ = self._unpack(DATA_ARRAY_HEADER, offset)
+        position = offset + DATA_ARRAY_HEADER.size
+        for index in range(count):
+            if data_type.basic_type == WmiDataType.OBJECT:
+                value = None
+                (size,) = self._unpack(SCALARS[WmiDataType.UINT32], position)
+            else:
+                value, size = self._scalar(position, data_type.basic_type)
+
+            for handler in self.handlers:
+                handler.start_array_item(position, index, value)
+
+            if data_type.basic_type == WmiDataType.OBJECT:
+                self._object(position)
+
+            for handler in self.handlers:
+                handler.end_array_item(position, index)
+
+            position += size
+
+    def _qualifiers(self, heap: int, reference: int) -> None:
+        """Emit the events for a BMOF array of qualifiers"""
+        # pylint: disable=too-many-locals
+        offset = self._enter(heap, reference)
+        if offset is None:
+            return
+
+        _, count = self._unpack(ARRAY_HEADER, offset)
+        position = offset + ARRAY_HEADER.size
+        for _ in range(count):
+            length, data_type, name_offset, value_offset = self._unpack(QUALIFIER_HEADER, position)
+            qualifier_heap = position + QUALIFIER_HEADER.size
+            name = self._name(qualifier_heap, name_offset)
+            wmi_type = WmiType.from_int(data_type)
+            value_position = self._enter(qualifier_heap, value_offset)
+            value = self._data(value_position, wmi_type)
+            flavors = self.flavors.get(position, Flavors(0))
+
+            for handler in self.handlers:
+                handler.start_qualifier(position, name, wmi_type, value, flavors)
+
+            self._data_items(value_position, wmi_type)
+            self._leave_data(value_position, wmi_type)
+
+            for handler in self.handlers:
+                handler.end_qualifier(position, name)
+
+            position += length
+
+        self._leave_array(offset)
+
+    def _properties(self, heap: int, reference: int, parameter: bool = False) -> None:
+        """Emit the events for a BMOF array of properties"""
+        # pylint: disable=too-many-locals
+        offset = self._enter(heap, reference)
+        if offset is None:
+            return
+
+        _, count = self._unpack(ARRAY_HEADER, offset)
+        position = offset + ARRAY_HEADER.size
+        for _ in range(count):
+            length, data_type, name_offset, value_offset, qualifiers_offset = \
+                self._unpack(PROPERTY_HEADER, position)
+            property_heap = position + PROPERTY_HEADER.size
+            name = self._name(property_heap, name_offset)
+            wmi_type = WmiType.from_int(data_type)
+            value_position = self._enter(property_heap, value_offset)
+            value = self._data(value_position, wmi_type)
+
+            if parameter and name == "__CLASS":
+                self._leave_data(value_position, wmi_type)
+                self._qualifiers(property_heap, qualifiers_offset)
+                position += length
+                continue
+
+            for handler in self.handlers:
+                if parameter:
+                    handler.start_parameter(position, name, wmi_type, value)
+                else:
+                    handler.start_property(position, name, wmi_type, value)
+
+            self._data_items(value_position, wmi_type)
+            self._leave_data(value_position, wmi_type)
+            self._qualifiers(property_heap, qualifiers_offset)
+
+            for handler in self.handlers:
+                if parameter:
+                    handler.end_parameter(position, name)
+                else:
+                    handler.end_property(position, name)
+
+            position += length
+
+        self._leave_array(offset)
+
+    def _methods(self, heap: int, reference: int) -> None:
+        """Emit the events for a BMOF array of methods"""
+        # pylint: disable=too-many-locals
+        offset = self._enter(heap, reference)
+        if offset is None:
+            return
+
+        _, count = self._unpack(ARRAY_HEADER, offset)
+        position = offset + ARRAY_HEADER.size
+        for _ in range(count):
+            length, data_type, name_offset, value_offset, qualifiers_offset = \
+                self._unpack(PROPERTY_HEADER, position)
+            method_heap = position + PROPERTY_HEADER.size
+            name = self._name(method_heap, name_offset)
+            wmi_type = WmiType.from_int(data_type)
+            value_position = self._enter(method_heap, value_offset)
+
+            for handler in self.handlers:
+                handler.start_method(position, name)
+
+            if wmi_type != WmiDataType.VOID and value_position is not None:
+                _, _, objects, _ = self._unpack(DATA_ARRAY_HEADER, value_position)
+                parameters = value_position + DATA_ARRAY_HEADER.size
+                for _ in range(objects):
+                    size, _, properties_offset, _, _ = self._unpack(OBJECT_HEADER, parameters)
+                    self._properties(parameters + OBJECT_HEADER.size, properties_offset,
+                                     parameter=True)
+                    parameters += size
+
+            self._leave_data(value_position, wmi_type)
+            self._qualifiers(method_heap, qualifiers_offset)
+
+            for handler in self.handlers:
+                handler.end_method(position, name)
+
+            position += length
+
+        self._leave_array(offset)
+
+    def _object(self, offset: int) -> None:
+        """Emit the events for a BMOF object"""
+        length, qualifiers_offset, properties_offset, methods_offset, object_type = \
+            self._unpack(OBJECT_HEADER, offset)
+        heap = offset + OBJECT_HEADER.size
+        wmi_object_type = WmiObjectType(object_type)
+        for handler in self.handlers:
+            handler.start_object(offset, wmi_object_type)
+
+        self._qualifiers(heap, qualifiers_offset)
+        self._properties(heap, properties_offset)
+        self._methods(heap, methods_offset)
+
+        obj = None
+        if self.wants_objects:
+            stream = BytesIOWithOffsets(bytes(self.buffer[offset:offset + length]), None, offset)
+            obj = BMOF_WMI_OBJECT.parse_stream(stream)
+
+        for handler in self.handlers:
+            handler.end_object(offset, obj if handler.wants_objects else None)
+
+    def parse(self) -> None:
+        """Parse the BMOF data, emitting events to all handlers"""
+        root = BMOF_ROOT_HEADER.parse(bytes(self.buffer[:BMOF_ROOT_HEADER.sizeof()]))
+        flavors = BMOF_TRAILER.parse(bytes(self.buffer[root.length:]))
+        self.flavors = {f.offset: f.flavors for f in flavors or []}
+        self._tracker = HeapTracker(len(self.buffer))
+
+        position = BMOF_ROOT_HEADER.sizeof()
+        for _ in range(root.count):
+            (length,) = self._unpack(SCALARS[WmiDataType.UINT32], position)
+            self._object(position)
+            position += length
+
+
+def decompress_bmof(data: bytes) -> bytearray:
+    """Decompress a BMOF data buffer"""
+    header = BMOF_HEADER.parse(data)
+    buffer = bytearray(header.final_length)
+    start = BMOF_HEADER_SIZE
+    compressed = data[start:start + header.compressed_length]
+
+    if len(compressed) != header.compressed_length:
+        raise StreamError(f"stream read less than specified amount, expected "
+                          f"{header.compressed_length}, found {len(compressed)}")
+
+    decompress_into(compressed, buffer)
+
+    return buffer
+
+
+def parse_events(data: bytes, handlers: Iterable[BmofHandler]) -> None:
+    """Parse a BMOF data buffer, emitting events to the given handlers"""
+    EventParser(decompress_bmof(data), handlers).parse()
+
+
+def parse_events_file(path: Path, handlers: Iterable[BmofHandler]) -> None:
+    """Parse a BMOF file, emitting events to the given handlers"""
+    parse_events(path.read_bytes(), handlers)
@@ -6,7 +6,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import IntFlag, unique, STRICT
-from typing import Final
+from typing import Any, Final
 from construct import Struct, Const, Int32ul, PrefixedArray, Container, NoneOf, Adapter
 
 
@@ -35,6 +35,18 @@ class QualifierFlavor():
             flavors=Flavors(container["flavors"])
         )
 
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle qualifier flavor using integers"""
+        return QualifierFlavor.from_ints, (self.offset, int(self.flavors))
+
+    @classmethod
+    def from_ints(cls, offset: int, flavors: int) -> QualifierFlavor:
+        """Create qualifier flavor from integers"""
+        return cls(
+            offset=offset,
+            flavors=Flavors(flavors)
+        )
+
 
 class FlavorsAdpater(Adapter):
     # pylint: disable=abstract-method
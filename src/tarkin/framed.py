@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+"""Parsing of concatenated BMOF data buffers"""
+
+from __future__ import annotations
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import BinaryIO, Callable, Final, Iterator, Optional
+from construct import StreamError
+from .bmof import BMOF_HEADER, BMOF_HEADER_SIZE
+
+
+READ_AHEAD: Final = 2
+"""Number of BMOF data buffers read ahead of the one being parsed"""
+
+
+def read_exactly(stream: BinaryIO, size: int) -> bytes:
+    """Read the given number of bytes, retrying short reads from pipes"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        remaining -= len(chunk)
+
+    return b"".join(chunks)
+
+
+def read_blob(stream: BinaryIO) -> Optional[bytes]:
+    """
+    Read a single BMOF data buffer from a stream of concatenated buffers.
+
+    The end of the buffer is determined using the compressed_length field of its header.
+    Return None at the end of the stream. Truncated or malformed headers raise a
+    construct error since the start of the next buffer cannot be found afterwards.
+    """
+    header = read_exactly(stream, BMOF_HEADER_SIZE)
+    if not header:
+        return None
+
+    if len(header) != BMOF_HEADER_SIZE:
+        raise StreamError(f"stream read less than specified amount, expected {BMOF_HEADER_SIZE}, "
+                          f"found {len(header)}")
+
+    compressed_length: int = BMOF_HEADER.parse(header).compressed_length
+    compressed = read_exactly(stream, compressed_length)
+    if len(compressed) != compressed_length:
+        raise StreamError(f"stream read less than specified amount, expected "
+                          f"{compressed_length}, found {len(compressed)}")
+
+    return header + compressed
+
+
+def iter_blobs(stream: BinaryIO) -> Iterator[bytes]:
+    """Iterate over the BMOF data buffers inside a stream of concatenated buffers"""
+    while True:
+        blob = read_blob(stream)
+        if blob is None:
+            return
+
+        yield blob
+
+
+def parse_framed[T](stream: BinaryIO, parse: Callable[[bytes], T]) -> Iterator[T | Exception]:
+    """
+    Parse a stream of concatenated BMOF data buffers, yielding the result of each buffer.
+
+    Each buffer is passed to the given parse function, for example tarkin.aio.parse_data.
+    A reader thread reads the following buffers while the current one is being parsed,
+    so results are yielded as soon as a buffer is complete. Errors while parsing a buffer
+    are yielded instead of its result. Errors while reading a buffer end the stream after
+    yielding the error, since the remaining data cannot be split into buffers anymore.
+    """
+    blobs: Queue[bytes | Exception | None] = Queue(READ_AHEAD)
+    stopped = Event()
+
+    def put(item: bytes | Exception | None) -> None:
+        """Pass a item to the consumer unless it stopped"""
+        while not stopped.is_set():
+            try:
+                blobs.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def read() -> None:
+        """Read the buffers inside the reader thread"""
+        try:
+            for blob in iter_blobs(stream):
+                put(blob)
+                if stopped.is_set():
+                    return
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            put(error)
+        finally:
+            # The consumer waits for the end of the stream even if reading failed unexpectedly
+            put(None)
+
+    reader = Thread(target=read, name="tarkin-reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = blobs.get()
+            if item is None:
+                return
+
+            if isinstance(item, Exception):
+                yield item
+                return
+
+            try:
+                result = parse(item)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                yield error
+                continue
+
+            yield result
+    finally:
+        stopped.set()
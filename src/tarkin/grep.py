@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+
+"""Search for names inside BMOF files"""
+
+from __future__ import annotations
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from .aio import CHUNK_SIZE, ExecutorKind, expand_paths, owned_executor
+from .bmof import BMOF_MAGIC
+from .events import decompress_bmof
+from .root import BMOF_ROOT, Root
+from .wmi_object import WmiObject, WmiObjectType
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+
+
+@dataclass(frozen=True, slots=True)
+class GrepMatch:
+    """Name matching the search pattern"""
+
+    location: str
+
+    kind: str
+
+    name: str
+
+    def __str__(self) -> str:
+        """Format the match"""
+        if not self.location:
+            return f"{self.kind} {self.name}"
+
+        return f"{self.location}: {self.kind} {self.name}"
+
+
+@dataclass(frozen=True, slots=True)
+class GrepResult:
+    """Result of searching a single BMOF file"""
+
+    path: Path
+
+    matches: list[GrepMatch]
+
+    error: Optional[Exception] = None
+
+    prefiltered: bool = False
+
+
+class Matcher:
+    """
+    Substring matcher for names inside BMOF files.
+
+    The pattern is encoded as utf-16-le once, so decompressed BMOF data can be searched
+    for it before being parsed. When ignoring case, the data is searched after lowering
+    its ASCII characters, which is only possible for patterns consisting of ASCII characters.
+    Other patterns disable the prefilter.
+
+    Keyword arguments:
+    pattern -- substring to search for
+    ignore_case -- whether to ignore the case of ASCII characters
+    """
+    __slots__ = ("pattern", "ignore_case", "needle")
+
+    def __init__(self, pattern: str, ignore_case: bool = False) -> None:
+        self.ignore_case = ignore_case
+        self.pattern = pattern.lower() if ignore_case else pattern
+        self.needle: Optional[bytes] = self.pattern.encode("utf_16_le")
+        if ignore_case and not pattern.isascii():
+            self.needle = None
+
+    def prefilter(self, buffer: bytes | bytearray) -> bool:
+        """Check whether decompressed BMOF data might contain a matching name"""
+        if self.needle is None:
+            return True
+
+        if self.ignore_case:
+            return self.needle in buffer.lower()
+
+        return self.needle in buffer
+
+    def match(self, name: Optional[str]) -> bool:
+        """Check whether a name matches"""
+        if name is None:
+            return False
+
+        if self.ignore_case:
+            name = name.lower()
+
+        return self.pattern in name
+
+    def _qualifiers(self, qualifiers: Optional[list[WmiQualifier]], location: str,
+                    matches: list[GrepMatch]) -> None:
+        """Search the names of qualifiers"""
+        for qualifier in qualifiers or []:
+            if self.match(qualifier.name):
+                matches.append(GrepMatch(location=location, kind="qualifier",
+                                         name=qualifier.name or ""))
+
+    def _property(self, prop: WmiProperty, kind: str, location: str,
+                  matches: list[GrepMatch]) -> None:
+        """Search the name, qualifiers and embedded objects of a property"""
+        if self.match(prop.name):
+            matches.append(GrepMatch(location=location, kind=kind, name=prop.name or ""))
+
+        self._qualifiers(prop.qualifiers, f"{location}.{prop.name}", matches)
+
+        values = prop.value if isinstance(prop.value, list) else [prop.value]
+        for index, value in enumerate(values):
+            if isinstance(value, WmiObject):
+                suffix = f"[{index}]" if isinstance(prop.value, list) else ""
+                self._object(value, f"{location}.{prop.name}{suffix}", matches)
+
+    def _object(self, obj: WmiObject, location: str, matches: list[GrepMatch]) -> None:
+        """Search the names of an object and its members"""
+        kind = "instance of" if obj.object_type == WmiObjectType.INSTANCE else "class"
+        if self.match(obj.name):
+            matches.append(GrepMatch(location=location, kind=kind, name=obj.name or ""))
+
+        # Members of top-level objects are located using the object itself
+        location = location or f"{kind} {obj.name}"
+        if self.match(obj.superclass):
+            matches.append(GrepMatch(location=location, kind="superclass",
+                                     name=obj.superclass or ""))
+
+        self._qualifiers(obj.qualifiers, location, matches)
+        for prop in obj.variables:
+            self._property(prop, "property", location, matches)
+
+        for method in obj.methods or []:
+            if self.match(method.name):
+                matches.append(GrepMatch(location=location, kind="method", name=method.name))
+
+            method_location = f"{location}.{method.name}"
+            self._qualifiers(method.qualifiers, method_location, matches)
+            for param in method.parameters or []:
+                self._property(param, "parameter", method_location, matches)
+
+    def search(self, root: Root) -> list[GrepMatch]:
+        """Search the names of all objects"""
+        matches: list[GrepMatch] = []
+        for obj in root.objects:
+            self._object(obj, "", matches)
+
+        return matches
+
+
+def grep_file(path: Path, matcher: Matcher, strict: bool = True) -> GrepResult:
+    """
+    Search a BMOF file, returning the error instead of raising it.
+
+    Only files whose decompressed data passes the prefilter are parsed. Unless strict
+    is set, files not starting with the BMOF magic are skipped without an error.
+    """
+    try:
+        data = path.read_bytes()
+        if not strict and not data.startswith(BMOF_MAGIC):
+            return GrepResult(path=path, matches=[], prefiltered=True)
+
+        buffer = decompress_bmof(data)
+        if not matcher.prefilter(buffer):
+            return GrepResult(path=path, matches=[], prefiltered=True)
+
+        root: Root = BMOF_ROOT.parse(bytes(buffer))
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return GrepResult(path=path, matches=[], error=error)
+
+    return GrepResult(path=path, matches=matcher.search(root))
+
+
+def grep_entry(entry: tuple[Path, bool], matcher: Matcher) -> GrepResult:
+    """Search a file returned by expand_paths()"""
+    return grep_file(entry[0], matcher, entry[1])
+
+
+def grep(paths: Iterable[Path], pattern: str, ignore_case: bool = False, include: str = "*",
+         executor: Optional[Executor] = None, kind: ExecutorKind = "process",
+         workers: Optional[int] = None) -> Iterator[GrepResult]:
+    """
+    Search multiple BMOF files in parallel, yielding the results in order.
+
+    Directories are searched recursively for files matching the glob pattern include,
+    skipping files which are not BMOF files. When no executor is given, a executor of the
+    given kind is created and shut down afterwards. Process executors are used by default
+    since searching is CPU-bound.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    matcher = Matcher(pattern, ignore_case)
+    with owned_executor(executor, kind, workers) as pool:
+        yield from pool.map(grep_entry, expand_paths(paths, include), repeat(matcher),
+                            chunksize=CHUNK_SIZE)
@@ -0,0 +1,332 @@
+#!/usr/bin/python3
+
+"""WMI class inheritance resolver"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterable, Optional
+from .flavor import Flavors, QualifierFlavor
+from .wmi_object import WmiObject, WmiObjectType, WmiMethod
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+
+
+type ClassKey = tuple[str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedQualifier:
+    """WMI qualifier together with its flavors and the class defining it"""
+
+    qualifier: WmiQualifier
+
+    flavors: Flavors
+
+    origin: Optional[str]
+
+    @property
+    def name(self) -> Optional[str]:
+        """Retrieve the qualifier name"""
+        return self.qualifier.name
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedProperty:
+    """WMI property together with its effective qualifiers and the class defining it"""
+
+    prop: WmiProperty
+
+    qualifiers: list[ResolvedQualifier]
+
+    origin: Optional[str]
+
+    @property
+    def name(self) -> Optional[str]:
+        """Retrieve the property name"""
+        return self.prop.name
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedMethod:
+    """WMI method together with its effective qualifiers and the class defining it"""
+
+    method: WmiMethod
+
+    qualifiers: list[ResolvedQualifier]
+
+    origin: Optional[str]
+
+    @property
+    def name(self) -> str:
+        """Retrieve the method name"""
+        return self.method.name
+
+
+@dataclass(frozen=True, slots=True)
+class ResolvedObject:
+    """
+    Effective WMI class or instance.
+
+    Classes contain all properties and methods inherited from their superclasses together
+    with all qualifiers propagated to them, instances additionally contain the properties
+    of their class with the default values being replaced by the values of the instance.
+    The superclass of a resolved instance is its resolved class.
+    """
+
+    obj: WmiObject
+
+    superclass: Optional[ResolvedObject]
+
+    qualifiers: list[ResolvedQualifier]
+
+    properties: list[ResolvedProperty]
+
+    methods: list[ResolvedMethod]
+
+    @property
+    def name(self) -> Optional[str]:
+        """Retrieve the class name"""
+        return self.obj.name
+
+    def find_property(self, name: str) -> Optional[ResolvedProperty]:
+        """Retrieve a property by its case-insensitive name"""
+        return _find(self.properties, name)
+
+    def find_method(self, name: str) -> Optional[ResolvedMethod]:
+        """Retrieve a method by its case-insensitive name"""
+        return _find(self.methods, name)
+
+
+def _key(name: Optional[str]) -> str:
+    """Create a case-insensitive lookup key from a name"""
+    return "" if name is None else name.lower()
+
+
+def _find[T: (ResolvedProperty, ResolvedMethod)](items: list[T], name: str) -> Optional[T]:
+    """Find a item by its case-insensitive name"""
+    key = name.lower()
+    for item in items:
+        if _key(item.name) == key:
+            return item
+
+    return None
+
+
+def propagate(inherited: Iterable[ResolvedQualifier], local: Iterable[ResolvedQualifier],
+              flavor: Flavors, where: str) -> list[ResolvedQualifier]:
+    """
+    Merge the qualifiers propagated from a superclass or class with local qualifiers.
+
+    Only inherited qualifiers having the given flavor are propagated. Local qualifiers
+    override propagated qualifiers with the same name, unless the propagated qualifier
+    has the DISABLE_OVERRIDE flavor.
+    """
+    result: dict[str, ResolvedQualifier] = {}
+    for qualifier in inherited:
+        if qualifier.flavors & flavor:
+            result[_key(qualifier.name)] = qualifier
+
+    for qualifier in local:
+        key = _key(qualifier.name)
+        previous = result.get(key)
+        if previous is not None and previous.flavors & Flavors.DISABLE_OVERRIDE:
+            if previous.qualifier.value != qualifier.qualifier.value:
+                raise RuntimeError(f"Qualifier {qualifier.name} of {where} overrides a "
+                                   "qualifier which cannot be overridden")
+            continue
+
+        result[key] = qualifier
+
+    return list(result.values())
+
+
+class InheritanceResolver:
+    """
+    Resolver for the effective classes and instances inside BMOF data.
+
+    Resolved classes are memoised, so resolving all classes of a hierarchy only
+    resolves each class once, even when resolving from multiple threads. Classes
+    are identified by their case-insensitive namespace and name.
+
+    Keyword arguments:
+    objects -- WMI objects containing the classes and instances
+    flavors -- flavors section of the BMOF data containing the objects
+    """
+    def __init__(self, objects: Iterable[WmiObject],
+                 flavors: Optional[list[QualifierFlavor]] = None) -> None:
+        self.objects = list(objects)
+        self.flavors = {f.offset: f.flavors for f in flavors or []}
+        self._classes: dict[ClassKey, WmiObject] = {}
+        self._names: dict[str, ClassKey] = {}
+        self._resolved: dict[ClassKey, ResolvedObject] = {}
+        self._lock = Lock()
+
+        for obj in self.objects:
+            if obj.object_type == WmiObjectType.CLASS:
+                key = (_key(obj.namespace), _key(obj.name))
+                self._classes[key] = obj
+                self._names[key[1]] = key
+
+    def _qualifiers(self, qualifiers: Optional[list[WmiQualifier]],
+                    origin: Optional[str]) -> list[ResolvedQualifier]:
+        """Join qualifiers with their flavors"""
+        return [
+            ResolvedQualifier(
+                qualifier=q,
+                flavors=self.flavors.get(q.offset, Flavors(0)),
+                origin=origin
+            ) for q in qualifiers or []
+        ]
+
+    def _inherit(self, obj: WmiObject, base: Optional[ResolvedObject],
+                 flavor: Flavors) -> ResolvedObject:
+        """Resolve an object using its already resolved superclass or class"""
+        # pylint: disable=too-many-locals
+        origin = obj.name
+        where = origin or "<unnamed>"
+        instance = obj.object_type == WmiObjectType.INSTANCE
+
+        qualifiers = propagate(base.qualifiers if base else [],
+                               self._qualifiers(obj.qualifiers, origin), flavor, where)
+
+        base_properties = {_key(p.name): p for p in base.properties} if base else {}
+        properties: dict[str, ResolvedProperty] = {}
+        for key, prop in base_properties.items():
+            properties[key] = ResolvedProperty(
+                prop=prop.prop,
+                qualifiers=propagate(prop.qualifiers, [], flavor, where),
+                origin=prop.origin
+            )
+
+        for local in obj.variables:
+            key = _key(local.name)
+            inherited = base_properties.get(key)
+            properties[key] = ResolvedProperty(
+                prop=local,
+                qualifiers=propagate(
+                    inherited.qualifiers if inherited else [],
+                    self._qualifiers(local.qualifiers, origin),
+                    flavor, f"{where}.{local.name}"
+                ),
+                # Instances only provide values for properties of their class
+                origin=inherited.origin if inherited and instance else origin
+            )
+
+        # Instances do not inherit methods
+        base_methods = {_key(m.name): m for m in base.methods} if base and not instance else {}
+        methods: dict[str, ResolvedMethod] = {}
+        for key, base_method in base_methods.items():
+            methods[key] = ResolvedMethod(
+                method=base_method.method,
+                qualifiers=propagate(base_method.qualifiers, [], flavor, where),
+                origin=base_method.origin
+            )
+
+        for method in obj.methods or []:
+            key = _key(method.name)
+            inherited_method = base_methods.get(key)
+            methods[key] = ResolvedMethod(
+                method=method,
+                qualifiers=propagate(
+                    inherited_method.qualifiers if inherited_method else [],
+                    self._qualifiers(method.qualifiers, origin),
+                    flavor, f"{where}.{method.name}"
+                ),
+                origin=origin
+            )
+
+        return ResolvedObject(
+            obj=obj,
+            superclass=base,
+            qualifiers=qualifiers,
+            properties=list(properties.values()),
+            methods=list(methods.values())
+        )
+
+    def resolve_class(self, name: str, namespace: Optional[str] = None) -> ResolvedObject:
+        """Resolve a class by its name, searching all namespaces when no namespace is given"""
+        if namespace is None:
+            key = self._names.get(_key(name), ("", _key(name)))
+        else:
+            key = (_key(namespace), _key(name))
+
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+
+        obj = self._classes.get(key)
+        if obj is None:
+            raise KeyError(f"Class {name} not found")
+
+        with self._lock:
+            return self._resolve_chain(name, key, obj)
+
+    def _resolve_chain(self, name: str, key: ClassKey, obj: WmiObject) -> ResolvedObject:
+        """Resolve a class together with all unresolved superclasses"""
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            # Resolved by another thread while waiting for the lock
+            return resolved
+
+        # Collect all unresolved superclasses first to avoid deep recursion
+        chain = [(key, obj)]
+        visited = {key}
+        while True:
+            superclass = chain[-1][1].superclass
+            if superclass is None:
+                base = None
+                break
+
+            key = (key[0], _key(superclass))
+            base = self._resolved.get(key)
+            if base is not None:
+                break
+
+            if key in visited:
+                raise RuntimeError(f"Class {name} inherits from itself")
+
+            parent = self._classes.get(key)
+            if parent is None:
+                # Superclass defined elsewhere, nothing to inherit
+                base = None
+                break
+
+            visited.add(key)
+            chain.append((key, parent))
+
+        for chain_key, chain_obj in reversed(chain):
+            base = self._inherit(chain_obj, base, Flavors.TO_SUBCLASS)
+            self._resolved[chain_key] = base
+
+        assert base is not None
+        return base
+
+    def resolve(self, obj: WmiObject) -> ResolvedObject:
+        """Resolve a class or instance"""
+        name = obj.name
+        if name is None:
+            return self._inherit(obj, None, Flavors.TO_SUBCLASS)
+
+        if obj.object_type == WmiObjectType.CLASS:
+            key = (_key(obj.namespace), _key(name))
+            if self._classes.get(key) is obj:
+                return self.resolve_class(name, obj.namespace)
+
+            # Class redefined later, resolve this definition separately
+            superclass = obj.superclass
+            base = None
+            if superclass is not None and (key[0], _key(superclass)) in self._classes:
+                base = self.resolve_class(superclass, obj.namespace)
+
+            return self._inherit(obj, base, Flavors.TO_SUBCLASS)
+
+        base = None
+        if (_key(obj.namespace), _key(name)) in self._classes:
+            base = self.resolve_class(name, obj.namespace)
+
+        return self._inherit(obj, base, Flavors.TO_INSTANCE)
+
+    def resolve_all(self) -> list[ResolvedObject]:
+        """Resolve all classes and instances"""
+        return [self.resolve(obj) for obj in self.objects]
@@ -3,28 +3,47 @@
 """CLI entry point utilities"""
 
 import sys
-from argparse import ArgumentParser, Namespace
-from typing import Final
+from argparse import ArgumentParser, Namespace, RawDescriptionHelpFormatter
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Final, Optional, cast
 from json import dump
 from .bmof import Bmof, BMOF
+from .corpus import CorpusStats, corpus_stats
 from .flavor import QualifierFlavor
+from .framed import parse_framed
+from .grep import grep
+from .mof import MofWriter, decompile
 from .wmi_object import WmiObject
 from .wmi_object import WmiMethod
 from .wmi_property import WmiProperty
 from .wmi_qualifier import WmiQualifier
 from .wmi_type import WmiType
+from .session import ParserSession
+from .stats import BlobStats, blob_stats, format_stats
+from .tables import SEPARATORS, encode_tables
+from .tolerant import Diagnostic, parse_tolerant
+from .watch import DirectoryWatcher, Manifest, POLL_INTERVAL
 from . import __doc__ as description, __version__
 
 
 __all__ = (
     "ARGUMENT_PARSER",
+    "GREP_ARGUMENT_PARSER",
+    "STATS_ARGUMENT_PARSER",
     "main",
     "main_cli"
 )
 
 ARGUMENT_PARSER: Final = ArgumentParser(
     prog="tarkin",
-    description=f"{description}."
+    description=f"{description}.",
+    formatter_class=RawDescriptionHelpFormatter,
+    epilog="subcommands:\n"
+           "  grep    search the names inside BMOF files, see \"tarkin grep --help\"\n"
+           "  stats   aggregate statistics across a corpus, see \"tarkin stats --help\"\n"
+           "\n"
+           "Files named like a subcommand can be parsed using \"tarkin -- grep\"."
 )
 ARGUMENT_PARSER.add_argument(
     "-v",
@@ -32,9 +51,139 @@ ARGUMENT_PARSER.add_argument(
     action="version",
     version=f"%(prog)s {__version__}"
 )
+ARGUMENT_PARSER.add_argument(
+    "--format",
+    choices=("json", "tables", "mof"),
+    default="json",
+    help="output format, either JSON, compact JSON storing each distinct type, qualifier and "
+         "qualifier set once in shared tables or decompiled MOF source (default: json)"
+)
+ARGUMENT_PARSER.add_argument(
+    "--stats",
+    action="store_true",
+    help="print a report about the sizes of the objects, qualifiers and strings inside PATH"
+)
+ARGUMENT_PARSER.add_argument(
+    "--tolerant",
+    action="store_true",
+    help="skip malformed objects, properties and qualifiers, reporting them on stderr"
+)
+ARGUMENT_PARSER.add_argument(
+    "-w",
+    "--watch",
+    action="store_true",
+    help="incrementally process the BMOF files inside the directory PATH, emitting NDJSON"
+)
+ARGUMENT_PARSER.add_argument(
+    "--manifest",
+    metavar="FILE",
+    help="manifest of already processed files used with --watch (default: PATH/.tarkin-manifest)"
+)
+ARGUMENT_PARSER.add_argument(
+    "--interval",
+    type=float,
+    default=POLL_INTERVAL,
+    help="polling interval in seconds used with --watch when inotify is unavailable"
+)
+ARGUMENT_PARSER.add_argument(
+    "--once",
+    action="store_true",
+    help="exit after processing the new or modified files once when used with --watch"
+)
+ARGUMENT_PARSER.add_argument(
+    "--framed",
+    action="store_true",
+    help="read concatenated BMOF data buffers from PATH, writing the results of each buffer "
+         "as soon as it is parsed"
+)
 ARGUMENT_PARSER.add_argument(
     "path",
     metavar="PATH",
+    help="BMOF file, or - for the standard input"
+)
+
+GREP_ARGUMENT_PARSER: Final = ArgumentParser(
+    prog="tarkin grep",
+    description="Search the names of classes, instances, properties, methods, parameters "
+                "and qualifiers inside BMOF files."
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "-i",
+    "--ignore-case",
+    action="store_true",
+    help="ignore the case of ASCII characters"
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "-l",
+    "--files-with-matches",
+    action="store_true",
+    help="only print the paths of files containing matches"
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="number of worker processes (default: number of CPUs)"
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "--include",
+    metavar="GLOB",
+    default="*",
+    help="glob pattern selecting the files searched inside directories (default: *)"
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "pattern",
+    metavar="PATTERN",
+    help="substring to search for"
+)
+GREP_ARGUMENT_PARSER.add_argument(
+    "paths",
+    metavar="PATH",
+    nargs="+",
+    help="BMOF file or directory searched recursively"
+)
+
+STATS_ARGUMENT_PARSER: Final = ArgumentParser(
+    prog="tarkin stats",
+    description="Aggregate class, namespace, qualifier, data type and method statistics "
+                "across a corpus of BMOF files."
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "--corpus",
+    metavar="DIR",
+    action="append",
+    required=True,
+    help="BMOF file or directory searched recursively, can be given multiple times"
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "--include",
+    metavar="GLOB",
+    default="*",
+    help="glob pattern selecting the files inside directories (default: *)"
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="number of worker processes (default: number of CPUs)"
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "--resume",
+    metavar="FILE",
+    help="JSON summary of an earlier aggregation to extend, skipping the files it contains"
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "-o",
+    "--output",
+    metavar="FILE",
+    help="write the JSON summary to FILE instead of stdout"
+)
+STATS_ARGUMENT_PARSER.add_argument(
+    "--csv",
+    metavar="FILE",
+    help="additionally write the histograms as CSV to FILE"
 )
 
 
@@ -98,9 +247,99 @@ def encode_bmof(o: object, flavors: dict[int, QualifierFlavor]) -> dict[str, obj
     raise TypeError(f"Unknown type in BMOF: {type(o)}")
 
 
-def main(args: Namespace) -> int:
-    """Entry point for the BMOF parsing tool"""
-    bmof: Bmof = BMOF.parse_file(args.path)
+def emit_result(path: Path, digest: str, result: Bmof | Exception) -> None:
+    """Write the result of processing a single BMOF file as a NDJSON record"""
+    flavors = {}
+    record: dict[str, object] = {
+        "path": str(path),
+        "digest": digest
+    }
+
+    if isinstance(result, Exception):
+        record["error"] = str(result)
+    else:
+        if result.flavors is not None:
+            for flavor in result.flavors:
+                flavors[flavor.offset] = flavor.flavors
+
+        record["objects"] = result.root.objects
+
+    dump(record, sys.stdout, default=lambda o: encode_bmof(o, flavors), ensure_ascii=False)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def watch_main(args: Namespace) -> int:
+    """Entry point for the incremental directory processing mode"""
+    directory = Path(args.path)
+    if args.manifest is None:
+        manifest = Manifest(directory / ".tarkin-manifest")
+    else:
+        manifest = Manifest(Path(args.manifest))
+
+    watcher = DirectoryWatcher(directory, manifest, emit_result)
+    if args.once:
+        watcher.scan()
+    else:
+        try:
+            watcher.watch(args.interval)
+        except KeyboardInterrupt:
+            pass
+
+    return 0
+
+
+def grep_main(args: Namespace) -> int:
+    """Entry point for searching BMOF files, returning 1 if nothing matched like grep"""
+    status = 1
+    for result in grep(map(Path, args.paths), args.pattern, args.ignore_case, args.include,
+                       workers=args.jobs):
+        if result.error is not None:
+            print(f"{GREP_ARGUMENT_PARSER.prog}: {result.path}: {result.error}", file=sys.stderr)
+            status = 2
+            continue
+
+        if not result.matches:
+            continue
+
+        if status == 1:
+            status = 0
+
+        if args.files_with_matches:
+            print(result.path)
+            continue
+
+        for match in result.matches:
+            print(f"{result.path}:{match}")
+
+    return status
+
+
+def read_input(path: str) -> bytes:
+    """Read the BMOF data buffer at path, with "-" being the standard input"""
+    if path == "-":
+        return sys.stdin.buffer.read()
+
+    return Path(path).read_bytes()
+
+
+def report_diagnostics(diagnostics: list[Diagnostic], prefix: str = "") -> None:
+    """Report the substructures skipped by the fault-isolating parser on stderr"""
+    for diagnostic in diagnostics:
+        print(f"{ARGUMENT_PARSER.prog}: {prefix}skipped {diagnostic}", file=sys.stderr)
+
+
+def write_bmof(bmof: Bmof, output_format: str, indent: Optional[int] = 4) -> None:
+    """Write a BMOF to stdout using the given output format"""
+    if output_format == "mof":
+        writer = MofWriter(sys.stdout, {f.offset: f.flavors for f in bmof.flavors or []})
+        writer.write_all(bmof.root.objects)
+        return
+
+    if output_format == "tables":
+        dump(encode_tables(bmof), sys.stdout, ensure_ascii=False, separators=SEPARATORS)
+        sys.stdout.write("\n")
+        return
 
     flavors = {}
     if bmof.flavors is not None:
@@ -108,12 +347,115 @@ def main(args: Namespace) -> int:
             flavors[flavor.offset] = flavor.flavors
 
     dump(bmof.root.objects, sys.stdout, default=lambda o: encode_bmof(o, flavors),
-         ensure_ascii=False, indent=4)
+         ensure_ascii=False, indent=indent)
     sys.stdout.write("\n")
 
+
+def framed_main(args: Namespace) -> int:
+    """
+    Entry point for processing concatenated BMOF data buffers.
+
+    The results are written as soon as each buffer is parsed, with JSON output
+    being written as one line per buffer. Returns 1 if any buffer failed.
+    """
+    status = 0
+    parse: Callable[[bytes], object] = ParserSession().parse
+    if args.stats:
+        parse = blob_stats
+    elif args.tolerant:
+        parse = parse_tolerant
+
+    with ExitStack() as stack:
+        stream = sys.stdin.buffer if args.path == "-" else \
+            stack.enter_context(Path(args.path).open("rb"))
+
+        for index, result in enumerate(parse_framed(stream, parse)):
+            if isinstance(result, Exception):
+                print(f"{ARGUMENT_PARSER.prog}: buffer {index}: {result}", file=sys.stderr)
+                status = 1
+                continue
+
+            if isinstance(result, BlobStats):
+                sys.stdout.write(format_stats(result))
+            elif isinstance(result, tuple):
+                report_diagnostics(result[1], f"buffer {index}: ")
+                write_bmof(result[0], args.format, None)
+            else:
+                write_bmof(cast(Bmof, result), args.format, None)
+
+            sys.stdout.flush()
+
+    return status
+
+
+def stats_main(args: Namespace) -> int:
+    """Entry point for aggregating statistics across a corpus, returning 1 if any file failed"""
+    previous = None
+    if args.resume is not None:
+        with open(args.resume, "r", encoding="utf-8") as fd:
+            previous = CorpusStats.read_json(fd)
+
+    errors = 0 if previous is None else previous.errors
+    stats = corpus_stats(map(Path, args.corpus), args.include, workers=args.jobs,
+                         previous=previous)
+
+    if args.output is None:
+        stats.write_json(sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as fd:
+            stats.write_json(fd)
+
+    if args.csv is not None:
+        with open(args.csv, "w", encoding="utf-8", newline="") as fd:
+            stats.write_csv(fd)
+
+    if stats.errors > errors:
+        print(f"{STATS_ARGUMENT_PARSER.prog}: {stats.errors - errors} files could not be parsed",
+              file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def main(args: Namespace) -> int:
+    """Entry point for the BMOF parsing tool"""
+    if args.watch:
+        return watch_main(args)
+
+    if args.framed:
+        return framed_main(args)
+
+    data = read_input(args.path)
+    if args.stats:
+        sys.stdout.write(format_stats(blob_stats(data)))
+        return 0
+
+    if args.format == "mof" and not args.tolerant:
+        decompile(data, sys.stdout)
+        return 0
+
+    if args.tolerant:
+        bmof, diagnostics = parse_tolerant(data)
+        report_diagnostics(diagnostics)
+    else:
+        bmof = BMOF.parse(data)
+
+    write_bmof(bmof, args.format)
+
     return 0
 
 
-def main_cli() -> int:
+def main_cli(argv: Optional[list[str]] = None) -> int:
     """CLI entry point"""
-    return main(ARGUMENT_PARSER.parse_args())
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Subcommands are only recognized as the first argument, so "--" can be used to
+    # parse files named like a subcommand.
+    if argv[:1] == ["grep"]:
+        return grep_main(GREP_ARGUMENT_PARSER.parse_args(argv[1:]))
+
+    if argv[:1] == ["stats"]:
+        return stats_main(STATS_ARGUMENT_PARSER.parse_args(argv[1:]))
+
+    return main(ARGUMENT_PARSER.parse_args(argv))
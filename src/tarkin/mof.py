@@ -0,0 +1,297 @@
+#!/usr/bin/python3
+
+"""MOF source emitter"""
+
+from __future__ import annotations
+from math import isfinite
+from pathlib import Path
+from typing import Final, Iterable, Optional, TextIO
+from construct import BytesIOWithOffsets
+from .events import decompress_bmof
+from .flavor import Flavors
+from .root import BMOF_ROOT_HEADER
+from .stream import BMOF_TRAILER
+from .wmi_method import WmiMethod
+from .wmi_object import BMOF_WMI_OBJECT, WmiClassFlags, WmiInstanceFlags, WmiObject, \
+    WmiObjectType
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+from .wmi_type import WmiDataType, WmiType
+
+
+INDENT: Final = "    "
+
+FLAVOR_NAMES: Final = {
+    Flavors.TO_INSTANCE: "ToInstance",
+    Flavors.TO_SUBCLASS: "ToSubClass",
+    Flavors.DISABLE_OVERRIDE: "DisableOverride",
+    Flavors.AMENDED: "Amended"
+}
+"""MOF keywords of the qualifier flavors, the absence of a flavor is the default"""
+
+TYPE_NAMES: Final = {
+    WmiDataType.REFERENCE: "object ref",
+    WmiDataType.VOID: "void"
+}
+"""MOF names of WMI data types not matching the lowercase enum name"""
+
+HIDDEN_QUALIFIERS: Final = frozenset({"cimtype"})
+"""Qualifiers generated by the MOF compiler which are not part of the MOF source"""
+
+ESCAPES: Final = {
+    "\\": "\\\\",
+    "\"": "\\\"",
+    "\n": "\\n",
+    "\t": "\\t",
+    "\r": "\\r",
+    "\b": "\\b",
+    "\f": "\\f"
+}
+"""Escape sequences inside MOF string literals"""
+
+
+def format_string(value: str) -> str:
+    """Format a MOF string literal"""
+    chars = []
+    for char in value:
+        escape = ESCAPES.get(char)
+        if escape is None and (char < " " or char == "\x7f"):
+            escape = f"\\x{ord(char):04X}"
+
+        chars.append(char if escape is None else escape)
+
+    return "\"" + "".join(chars) + "\""
+
+
+def format_real(value: float) -> str:
+    """Format a MOF real literal, rejecting values without a literal like infinity and NaN"""
+    if not isfinite(value):
+        raise ValueError(f"Value {value} can not be represented in MOF")
+
+    return repr(value)
+
+
+def format_type(data_type: WmiType, qualifiers: Optional[list[WmiQualifier]]) -> str:
+    """Format the MOF type of a property, preferring the type recorded by the MOF compiler"""
+    for qualifier in qualifiers or []:
+        if qualifier.name is None or qualifier.name.lower() != "cimtype":
+            continue
+
+        if not isinstance(qualifier.value, str):
+            break
+
+        cimtype = qualifier.value
+        kind, _, name = cimtype.partition(":")
+        match kind.lower():
+            case "object" if name:
+                return name
+            case "ref":
+                return f"{name or 'object'} ref"
+            case _:
+                return cimtype
+
+    basic_type = data_type.basic_type
+    return TYPE_NAMES.get(basic_type, basic_type.name.lower())
+
+
+class MofWriter:
+    """
+    Writer emitting MOF source for WMI objects.
+
+    Each object is written as soon as it is passed to the writer, so only the
+    object being written is held in memory. Namespace, class flags and instance
+    flags are emitted as pragmas whenever they change.
+
+    Keyword arguments:
+    out -- text stream receiving the MOF source
+    flavors -- flavors of the qualifiers indexed by the qualifier offset
+    """
+    def __init__(self, out: TextIO, flavors: Optional[dict[int, Flavors]] = None) -> None:
+        self.out = out
+        self.flavors = flavors or {}
+        self._namespace: Optional[str] = None
+        self._classflags: Optional[WmiClassFlags] = None
+        self._instanceflags: Optional[WmiInstanceFlags] = None
+
+    def _qualifier(self, qualifier: WmiQualifier) -> str:
+        """Format a qualifier together with its flavors"""
+        name = qualifier.name or ""
+        value = qualifier.value
+        if value is True:
+            text = name
+        elif isinstance(value, list):
+            text = name + "{" + ", ".join(self._value(v, 0) for v in value) + "}"
+        else:
+            text = f"{name}({self._value(value, 0)})"
+
+        flavors = self.flavors.get(qualifier.offset, Flavors(0))
+        names = [keyword for flavor, keyword in FLAVOR_NAMES.items() if flavors & flavor]
+        if names:
+            text += " : " + " ".join(names)
+
+        return text
+
+    def _qualifiers(self, qualifiers: Optional[list[WmiQualifier]]) -> str:
+        """Format a list of qualifiers, returning an empty string if no qualifiers are shown"""
+        shown = [
+            self._qualifier(q) for q in qualifiers or []
+            if q.name is None or q.name.lower() not in HIDDEN_QUALIFIERS
+        ]
+        if not shown:
+            return ""
+
+        return "[" + ", ".join(shown) + "]"
+
+    def _value(self, value: object, depth: int) -> str:
+        """Format a value"""
+        # pylint: disable=too-many-return-statements
+        match value:
+            case None:
+                return "NULL"
+            case bool():
+                return "TRUE" if value else "FALSE"
+            case str():
+                return format_string(value)
+            case int():
+                return repr(value)
+            case float():
+                return format_real(value)
+            case WmiObject():
+                return self._object(value, depth)
+            case list():
+                separator = ", "
+                if any(isinstance(v, WmiObject) for v in value):
+                    separator = ",\n" + INDENT * (depth + 1)
+                    return "{\n" + INDENT * (depth + 1) \
+                        + separator.join(self._value(v, depth + 1) for v in value) \
+                        + "\n" + INDENT * depth + "}"
+
+                return "{" + separator.join(self._value(v, depth) for v in value) + "}"
+            case _:
+                raise TypeError(f"Unknown value type {type(value)}")
+
+    def _property(self, prop: WmiProperty, instance: bool, depth: int) -> str:
+        """Format a property of a class or instance"""
+        if instance:
+            return f"{prop.name} = {self._value(prop.value, depth)};"
+
+        text = f"{format_type(prop.data_type, prop.qualifiers)} {prop.name}"
+        if prop.data_type.is_array:
+            text += "[]"
+
+        if prop.value is not None:
+            text += f" = {self._value(prop.value, depth)}"
+
+        qualifiers = self._qualifiers(prop.qualifiers)
+        if qualifiers:
+            text = f"{qualifiers} {text}"
+
+        return text + ";"
+
+    def _method(self, method: WmiMethod) -> str:
+        """Format a method together with its parameters"""
+        params = []
+        for param in method.parameters or []:
+            text = f"{format_type(param.data_type, param.qualifiers)} {param.name}"
+            if param.data_type.is_array:
+                text += "[]"
+
+            qualifiers = self._qualifiers(param.qualifiers)
+            params.append(f"{qualifiers} {text}" if qualifiers else text)
+
+        text = f"{format_type(method.return_type, None)} {method.name}({', '.join(params)});"
+        qualifiers = self._qualifiers(method.qualifiers)
+
+        return f"{qualifiers} {text}" if qualifiers else text
+
+    def _object(self, obj: WmiObject, depth: int) -> str:
+        """Format an object without a trailing semicolon"""
+        instance = obj.object_type == WmiObjectType.INSTANCE
+        indent = INDENT * depth
+        lines = []
+
+        qualifiers = self._qualifiers(obj.qualifiers)
+        if qualifiers:
+            lines.append(qualifiers)
+
+        if instance:
+            lines.append(f"instance of {obj.name}")
+        elif obj.superclass is not None:
+            lines.append(f"class {obj.name} : {obj.superclass}")
+        else:
+            lines.append(f"class {obj.name}")
+
+        lines.append("{")
+        for prop in obj.variables:
+            lines.append(INDENT + self._property(prop, instance, depth + 1))
+
+        for method in obj.methods or []:
+            lines.append(INDENT + self._method(method))
+
+        lines.append("}")
+
+        return ("\n" + indent).join(lines)
+
+    def _pragmas(self, obj: WmiObject) -> None:
+        """Write the pragmas needed for an object"""
+        namespace = obj.namespace
+        if namespace is not None and namespace != self._namespace:
+            self._namespace = namespace
+            if not namespace.startswith("\\\\"):
+                namespace = "\\\\.\\" + namespace
+
+            self.out.write(f"#pragma namespace({format_string(namespace)})\n\n")
+
+        if obj.object_type == WmiObjectType.CLASS:
+            classflags = obj.classflags
+            if classflags != self._classflags:
+                self._classflags = classflags
+                self.out.write(f"#pragma classflags({self._flags(classflags)})\n\n")
+        else:
+            instanceflags = obj.instanceflags
+            if instanceflags != self._instanceflags:
+                self._instanceflags = instanceflags
+                self.out.write(f"#pragma instanceflags({self._flags(instanceflags)})\n\n")
+
+    @staticmethod
+    def _flags(flags: Optional[WmiClassFlags | WmiInstanceFlags]) -> str:
+        """Format the arguments of a flags pragma"""
+        if not flags:
+            return "0"
+
+        return ", ".join(format_string((f.name or "").lower()) for f in type(flags) if f in flags)
+
+    def write(self, obj: WmiObject) -> None:
+        """Write the MOF source of a top-level object"""
+        self._pragmas(obj)
+        self.out.write(self._object(obj, 0) + ";\n\n")
+
+    def write_all(self, objects: Iterable[WmiObject]) -> None:
+        """Write the MOF source of multiple top-level objects"""
+        for obj in objects:
+            self.write(obj)
+
+
+def decompile(data: bytes, out: TextIO) -> None:
+    """
+    Decompile a BMOF data buffer into MOF source.
+
+    The objects are parsed one after another from the decompressed data and
+    written immediately, without creating the whole object tree first.
+    """
+    buffer = decompress_bmof(data)
+    root = BMOF_ROOT_HEADER.parse(bytes(buffer[:BMOF_ROOT_HEADER.sizeof()]))
+    flavors = BMOF_TRAILER.parse(bytes(buffer[root.length:]))
+    writer = MofWriter(out, {f.offset: f.flavors for f in flavors or []})
+
+    position = BMOF_ROOT_HEADER.sizeof()
+    for _ in range(root.count):
+        length = int.from_bytes(buffer[position:position + 4], "little")
+        stream = BytesIOWithOffsets(bytes(buffer[position:position + length]), None, position)
+        writer.write(BMOF_WMI_OBJECT.parse_stream(stream))
+        position += length
+
+
+def decompile_file(path: Path, out: TextIO) -> None:
+    """Decompile a BMOF file into MOF source"""
+    decompile(path.read_bytes(), out)
@@ -0,0 +1,879 @@
+#!/usr/bin/python3
+
+"""WQL query engine"""
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Final, Iterable, Optional
+from .bmof import BMOF, Bmof
+from .wmi_data import WmiData
+from .wmi_object import WmiObject, WmiObjectType
+from .wmi_type import WmiDataType
+
+
+type Literal = Optional[bool | int | float | str]
+
+type Condition = Comparison | Like | IsA | IsNull | And | Or | Not
+
+type Query = SelectQuery | AssociatorsQuery
+
+type PathKey = tuple[str, frozenset[tuple[str, object]]]
+
+META_CLASS: Final = "meta_class"
+"""Pseudo class used for querying class definitions"""
+
+TOKEN: Final = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?\b|0[xX][0-9a-fA-F]+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<operator><>|!=|<=|>=|=|<|>)
+      | (?P<symbol>[(),*])
+      | (?P<path>\{[^}]*\})
+    )
+""", re.VERBOSE)
+"""Token of the WQL query language"""
+
+ESCAPE: Final = re.compile(r"\\(.)")
+"""Escape sequence inside string literals"""
+
+OPERATORS: Final = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b
+}
+"""Comparison operators supported inside WHERE clauses"""
+
+ASSOCIATOR_FILTERS: Final = frozenset({"assocclass", "resultclass", "role", "resultrole"})
+"""Filters supported inside the WHERE clause of ASSOCIATORS OF queries"""
+
+
+class QueryError(ValueError):
+    """Error raised when a query is malformed or not supported"""
+
+
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    """Comparison of a property with a literal"""
+
+    prop: str
+
+    operator: str
+
+    value: Literal
+
+
+@dataclass(frozen=True, slots=True)
+class Like:
+    """Match of a string property against a LIKE pattern"""
+
+    prop: str
+
+    pattern: re.Pattern[str]
+
+
+@dataclass(frozen=True, slots=True)
+class IsA:
+    """Check whether a object (__THIS) or embedded object is derived from a class"""
+
+    prop: str
+
+    class_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class IsNull:
+    """Check whether a property is NULL"""
+
+    prop: str
+
+    negated: bool
+
+
+@dataclass(frozen=True, slots=True)
+class And:
+    """Conjunction of two conditions"""
+
+    left: Condition
+
+    right: Condition
+
+
+@dataclass(frozen=True, slots=True)
+class Or:
+    """Disjunction of two conditions"""
+
+    left: Condition
+
+    right: Condition
+
+
+@dataclass(frozen=True, slots=True)
+class Not:
+    """Negation of a condition"""
+
+    condition: Condition
+
+
+@dataclass(frozen=True, slots=True)
+class SelectQuery:
+    """SELECT query, with properties being None when selecting all properties"""
+
+    properties: Optional[tuple[str, ...]]
+
+    class_name: str
+
+    where: Optional[Condition]
+
+
+@dataclass(frozen=True, slots=True)
+class AssociatorsQuery:
+    """ASSOCIATORS OF query"""
+
+    path: str
+
+    assoc_class: Optional[str] = None
+
+    result_class: Optional[str] = None
+
+    role: Optional[str] = None
+
+    result_role: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class QueryPlan:
+    """Strategy used for finding the candidates of a query"""
+
+    strategy: str
+
+    classes: tuple[str, ...] = ()
+
+    index: Optional[tuple[str, object]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class QueryRow:
+    """Object returned by a query together with the selected property values"""
+
+    obj: WmiObject
+
+    properties: dict[str, Optional[WmiData]] = field(default_factory=dict)
+
+
+def _key(name: Optional[str]) -> str:
+    """Create a case-insensitive lookup key from a name"""
+    return "" if name is None else name.lower()
+
+
+def _normalize(value: object) -> object:
+    """Normalize a value for case-insensitive comparisons"""
+    if isinstance(value, str):
+        return value.casefold()
+
+    return value
+
+
+def like_pattern(pattern: str) -> re.Pattern[str]:
+    """Translate a WQL LIKE pattern into a regular expression"""
+    parts = []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        elif char == "[":
+            end = pattern.find("]", position + 1)
+            if end < 0:
+                raise QueryError(f"Unterminated character class in LIKE pattern {pattern!r}")
+
+            chars = pattern[position + 1:end]
+            negated = chars.startswith("^")
+            chars = re.escape(chars[1:] if negated else chars).replace("\\-", "-")
+            parts.append(f"[{'^' if negated else ''}{chars}]")
+            position = end
+        else:
+            parts.append(re.escape(char))
+
+        position += 1
+
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def parse_object_path(path: str) -> PathKey:
+    """
+    Parse a WMI object path into a normalized key.
+
+    Namespace prefixes are ignored, so paths match regardless of the namespace.
+    Singleton paths (Class=@) result in an empty set of key properties.
+    """
+    path = path.strip()
+    if path.startswith("\\\\") or path.startswith("//"):
+        path = path.split(":", 1)[-1]
+    elif ":" in path.split(".", 1)[0]:
+        path = path.split(":", 1)[1]
+
+    class_name, _, keys = path.partition(".")
+    if "=" in class_name:
+        class_name, _, keys = class_name.partition("=")
+        if keys.strip() == "@":
+            return _key(class_name.strip()), frozenset()
+
+        # Classes with a single unnamed key
+        keys = f"={keys}"
+
+    values: list[tuple[str, object]] = []
+    position = 0
+    while position < len(keys):
+        name_end = keys.find("=", position)
+        if name_end < 0:
+            raise QueryError(f"Malformed object path {path!r}")
+
+        name = keys[position:name_end].strip()
+        position = name_end + 1
+        value: object
+        if keys[position:position + 1] == "\"":
+            end = position + 1
+            while end < len(keys) and keys[end] != "\"":
+                end += 2 if keys[end] == "\\" else 1
+
+            value = ESCAPE.sub(r"\1", keys[position + 1:end])
+            position = end + 1
+        else:
+            end = keys.find(",", position)
+            end = len(keys) if end < 0 else end
+            text = keys[position:end].strip()
+            try:
+                value = int(text, 0)
+            except ValueError:
+                value = text
+
+            position = end
+
+        values.append((_key(name), _normalize(value)))
+        if keys[position:position + 1] == ",":
+            position += 1
+
+    return _key(class_name.strip()), frozenset(values)
+
+
+class QueryParser:
+    # pylint: disable=too-few-public-methods
+    """
+    Parser for a subset of the WQL query language.
+
+    The following queries are supported:
+     - SELECT * | property[, ...] FROM class [WHERE condition]
+     - ASSOCIATORS OF {path} [WHERE AssocClass = class ResultClass = class Role = name
+       ResultRole = name]
+
+    Conditions consist of comparisons (=, <>, !=, <, >, <=, >=) between properties and
+    literals, LIKE, ISA, IS [NOT] NULL, AND, OR, NOT and parentheses. Selecting from
+    meta_class returns class definitions instead of instances.
+
+    Keyword arguments:
+    text -- query to parse
+    """
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: list[tuple[str, str]] = []
+        self.position = 0
+
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN.match(text, position)
+            if match is None or match.lastgroup is None:
+                raise QueryError(f"Unexpected character at position {position} of {self.text!r}")
+
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+
+    def _peek(self) -> Optional[tuple[str, str]]:
+        """Retrieve the next token without consuming it"""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+        return None
+
+    def _next(self, description: str) -> tuple[str, str]:
+        """Consume the next token"""
+        token = self._peek()
+        if token is None:
+            raise QueryError(f"Expected {description} at the end of {self.text!r}")
+
+        self.position += 1
+        return token
+
+    def _keyword(self, *keywords: str) -> bool:
+        """Consume the next tokens if they match the given keywords"""
+        end = self.position + len(keywords)
+        if end > len(self.tokens):
+            return False
+
+        for (kind, value), keyword in zip(self.tokens[self.position:end], keywords):
+            if kind != "name" or value.upper() != keyword:
+                return False
+
+        self.position = end
+        return True
+
+    def _expect(self, *keywords: str) -> None:
+        """Consume the given keywords"""
+        if not self._keyword(*keywords):
+            raise QueryError(f"Expected {' '.join(keywords)} in {self.text!r}")
+
+    def _name(self) -> str:
+        """Consume a name"""
+        kind, value = self._next("name")
+        if kind != "name":
+            raise QueryError(f"Expected name instead of {value!r} in {self.text!r}")
+
+        return value
+
+    def _literal(self) -> Literal:
+        """Consume a literal"""
+        kind, value = self._next("literal")
+        match kind:
+            case "string":
+                return ESCAPE.sub(r"\1", value[1:-1])
+            case "number":
+                if re.fullmatch(r"[+-]?\d+|0[xX][0-9a-fA-F]+", value):
+                    return int(value, 0)
+                return float(value)
+            case "name" if value.upper() in ("TRUE", "FALSE"):
+                return value.upper() == "TRUE"
+            case "name" if value.upper() == "NULL":
+                return None
+
+        raise QueryError(f"Expected literal instead of {value!r} in {self.text!r}")
+
+    def _string(self) -> str:
+        """Consume a string literal"""
+        value = self._literal()
+        if not isinstance(value, str):
+            raise QueryError(f"Expected string instead of {value!r} in {self.text!r}")
+
+        return value
+
+    def _primary(self) -> Condition:
+        """Parse a single comparison or a parenthesized condition"""
+        # pylint: disable=too-many-return-statements
+        if self._keyword("NOT"):
+            return Not(self._primary())
+
+        if self._peek() == ("symbol", "("):
+            self.position += 1
+            condition = self._or()
+            if self._next(")") != ("symbol", ")"):
+                raise QueryError(f"Expected ) in {self.text!r}")
+            return condition
+
+        prop = self._name()
+        if self._keyword("IS", "NOT", "NULL"):
+            return IsNull(prop, negated=True)
+        if self._keyword("IS", "NULL"):
+            return IsNull(prop, negated=False)
+        if self._keyword("ISA"):
+            return IsA(prop, self._string())
+        if self._keyword("NOT", "LIKE"):
+            return Not(Like(prop, like_pattern(self._string())))
+        if self._keyword("LIKE"):
+            return Like(prop, like_pattern(self._string()))
+
+        kind, operator = self._next("operator")
+        if kind != "operator":
+            raise QueryError(f"Expected operator instead of {operator!r} in {self.text!r}")
+
+        value = self._literal()
+        if value is None:
+            if operator not in ("=", "<>", "!="):
+                raise QueryError(f"NULL cannot be compared using {operator}")
+            return IsNull(prop, negated=operator != "=")
+
+        return Comparison(prop, operator, value)
+
+    def _and(self) -> Condition:
+        """Parse a conjunction"""
+        condition = self._primary()
+        while self._keyword("AND"):
+            condition = And(condition, self._primary())
+
+        return condition
+
+    def _or(self) -> Condition:
+        """Parse a disjunction"""
+        condition = self._and()
+        while self._keyword("OR"):
+            condition = Or(condition, self._and())
+
+        return condition
+
+    def _select(self) -> SelectQuery:
+        """Parse a SELECT query after the SELECT keyword"""
+        properties: Optional[list[str]] = None
+        if self._peek() == ("symbol", "*"):
+            self.position += 1
+        else:
+            properties = [self._name()]
+            while self._peek() == ("symbol", ","):
+                self.position += 1
+                properties.append(self._name())
+
+        self._expect("FROM")
+        class_name = self._name()
+        where = self._or() if self._keyword("WHERE") else None
+
+        return SelectQuery(
+            properties=None if properties is None else tuple(properties),
+            class_name=class_name,
+            where=where
+        )
+
+    def _associators(self) -> AssociatorsQuery:
+        """Parse a ASSOCIATORS OF query after the ASSOCIATORS OF keywords"""
+        kind, path = self._next("object path")
+        if kind != "path":
+            raise QueryError(f"Expected object path instead of {path!r} in {self.text!r}")
+
+        filters: dict[str, str] = {}
+        if self._keyword("WHERE"):
+            while self._peek() is not None:
+                name = self._name()
+                if name.lower() not in ASSOCIATOR_FILTERS:
+                    raise QueryError(f"Unsupported ASSOCIATORS OF filter {name}")
+                if self._next("=") != ("operator", "="):
+                    raise QueryError(f"Expected = after {name} in {self.text!r}")
+                filters[name.lower()] = self._name()
+
+        return AssociatorsQuery(
+            path=path[1:-1],
+            assoc_class=filters.get("assocclass"),
+            result_class=filters.get("resultclass"),
+            role=filters.get("role"),
+            result_role=filters.get("resultrole")
+        )
+
+    def parse(self) -> Query:
+        """Parse the query"""
+        query: Query
+        if self._keyword("SELECT"):
+            query = self._select()
+        elif self._keyword("ASSOCIATORS", "OF"):
+            query = self._associators()
+        else:
+            raise QueryError(f"Unsupported query {self.text!r}")
+
+        if self._peek() is not None:
+            raise QueryError(f"Unexpected {self._peek()} in {self.text!r}")
+
+        return query
+
+
+@lru_cache(maxsize=256)
+def parse_query(text: str) -> Query:
+    """Parse a WQL query, see QueryParser for the supported subset"""
+    return QueryParser(text).parse()
+
+
+def _conjuncts(condition: Optional[Condition]) -> list[Condition]:
+    """Split a condition into the conditions combined by AND"""
+    if condition is None:
+        return []
+
+    if isinstance(condition, And):
+        return _conjuncts(condition.left) + _conjuncts(condition.right)
+
+    return [condition]
+
+
+class QueryEngine:
+    """
+    Engine evaluating WQL queries against WMI classes and instances.
+
+    Classes are identified by their case-insensitive name regardless of their namespace.
+    Instances of a class include the instances of all classes derived from it, with
+    properties not set by an instance taking the default value of its class.
+
+    Queries are answered using indexes of the class names, superclasses, instances per
+    class and property values, which are created on demand and kept across queries
+    until more objects are added.
+
+    Keyword arguments:
+    objects -- WMI classes and instances to query
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, objects: Iterable[WmiObject] = ()) -> None:
+        self.objects: list[WmiObject] = []
+        self._classes: dict[str, WmiObject] = {}
+        self._subclasses: dict[str, list[str]] = {}
+        self._instances: dict[str, list[WmiObject]] = {}
+        self._derived: dict[str, frozenset[str]] = {}
+        self._values: dict[tuple[str, str], dict[object, list[WmiObject]]] = {}
+        self._paths: Optional[dict[PathKey, WmiObject]] = None
+        self._references: Optional[dict[PathKey, list[tuple[WmiObject, str]]]] = None
+        self.add(objects)
+
+    @classmethod
+    def from_bmofs(cls, bmofs: Iterable[Bmof]) -> QueryEngine:
+        """Create a query engine for the objects inside multiple BMOFs"""
+        engine = cls()
+        for bmof in bmofs:
+            engine.add(bmof.root.objects)
+
+        return engine
+
+    @classmethod
+    def from_files(cls, paths: Iterable[Path]) -> QueryEngine:
+        """Create a query engine for the objects inside multiple BMOF files"""
+        return cls.from_bmofs(BMOF.parse_file(path) for path in paths)
+
+    def add(self, objects: Iterable[WmiObject]) -> None:
+        """Add classes and instances, invalidating the indexes depending on them"""
+        for obj in objects:
+            self.objects.append(obj)
+            name = _key(obj.name)
+            if obj.object_type == WmiObjectType.CLASS:
+                self._classes[name] = obj
+                self._subclasses.setdefault(_key(obj.superclass), []).append(name)
+                self._derived.clear()
+                # Instances inherit the default values of their classes
+                self._values.clear()
+            else:
+                self._instances.setdefault(name, []).append(obj)
+                self._values = {k: v for k, v in self._values.items() if k[0] != name}
+
+        self._paths = None
+        self._references = None
+
+    def derived(self, class_name: str) -> frozenset[str]:
+        """Retrieve the keys of a class and all classes derived from it"""
+        key = _key(class_name)
+        derived = self._derived.get(key)
+        if derived is None:
+            result = {key}
+            pending = [key]
+            while pending:
+                for subclass in self._subclasses.get(pending.pop(), []):
+                    if subclass not in result:
+                        result.add(subclass)
+                        pending.append(subclass)
+
+            derived = frozenset(result)
+            self._derived[key] = derived
+
+        return derived
+
+    def isa(self, obj: WmiObject, class_name: str) -> bool:
+        """Check whether a class or instance is derived from the given class"""
+        return _key(obj.name) in self.derived(class_name)
+
+    def _chain(self, obj: WmiObject) -> Iterable[WmiObject]:
+        """Iterate over a object, its class (for instances) and all superclasses"""
+        visited = set()
+        current: Optional[WmiObject] = obj
+        if obj.object_type == WmiObjectType.INSTANCE:
+            yield obj
+            current = self._classes.get(_key(obj.name))
+
+        while current is not None and id(current) not in visited:
+            visited.add(id(current))
+            yield current
+            superclass = current.superclass
+            current = None if superclass is None else self._classes.get(_key(superclass))
+
+    def value(self, obj: WmiObject, name: str) -> tuple[bool, Optional[WmiData]]:
+        """
+        Retrieve the effective value of a property.
+
+        Return whether the property exists together with its value. System properties
+        like __CLASS are also supported, with __RELPATH containing the object path.
+        """
+        key = _key(name)
+        match key:
+            case "__class":
+                return True, obj.name
+            case "__superclass":
+                cls = obj if obj.object_type == WmiObjectType.CLASS else \
+                    self._classes.get(_key(obj.name))
+                return True, None if cls is None else cls.superclass
+            case "__namespace":
+                return True, obj.namespace
+            case "__relpath":
+                return True, self.path(obj)
+
+        for current in self._chain(obj):
+            for prop in current.variables:
+                if _key(prop.name) != key:
+                    continue
+
+                # Instances without a value for a property take the default value
+                if prop.value is not None or current.object_type == WmiObjectType.CLASS:
+                    return True, prop.value
+
+                break
+
+        return False, None
+
+    def properties(self, obj: WmiObject) -> dict[str, Optional[WmiData]]:
+        """Retrieve the effective values of all properties"""
+        names: dict[str, str] = {}
+        for current in reversed(list(self._chain(obj))):
+            for prop in current.variables:
+                if prop.name is not None:
+                    names.setdefault(_key(prop.name), prop.name)
+
+        return {name: self.value(obj, name)[1] for name in names.values()}
+
+    def keys(self, obj: WmiObject) -> list[str]:
+        """Retrieve the names of the key properties of a class or instance"""
+        keys: dict[str, str] = {}
+        for current in self._chain(obj):
+            if current.object_type != WmiObjectType.CLASS:
+                continue
+
+            for prop in current.variables:
+                for qualifier in prop.qualifiers or []:
+                    if _key(qualifier.name) == "key" and qualifier.value is True:
+                        keys.setdefault(_key(prop.name), prop.name or "")
+
+        return sorted(keys.values(), key=str.lower)
+
+    def path(self, obj: WmiObject) -> Optional[str]:
+        """Retrieve the relative object path of a instance"""
+        if obj.object_type != WmiObjectType.INSTANCE or obj.name is None:
+            return None
+
+        parts = []
+        for name in self.keys(obj):
+            value = self.value(obj, name)[1]
+            if isinstance(value, str):
+                escaped = value.replace("\\", "\\\\").replace("\"", "\\\"")
+                parts.append(f"{name}=\"{escaped}\"")
+            else:
+                parts.append(f"{name}={value}")
+
+        if not parts:
+            return f"{obj.name}=@"
+
+        return f"{obj.name}." + ",".join(parts)
+
+    def _value_index(self, class_key: str, prop: str) -> dict[object, list[WmiObject]]:
+        """Retrieve the index of the values of a property of the instances of a class"""
+        key = (class_key, _key(prop))
+        index = self._values.get(key)
+        if index is None:
+            index = {}
+            for obj in self._instances.get(class_key, []):
+                value = self.value(obj, prop)[1]
+                try:
+                    index.setdefault(_normalize(value), []).append(obj)
+                except TypeError:
+                    # Arrays and embedded objects are never equal to a literal
+                    continue
+
+            self._values[key] = index
+
+        return index
+
+    def plan(self, query: str | Query) -> QueryPlan:
+        """Choose the strategy used for finding the candidates of a query"""
+        # pylint: disable=too-many-return-statements
+        if isinstance(query, str):
+            query = parse_query(query)
+
+        if isinstance(query, AssociatorsQuery):
+            return QueryPlan(strategy="reference index")
+
+        conjuncts = _conjuncts(query.where)
+        if _key(query.class_name) == META_CLASS:
+            for condition in conjuncts:
+                match condition:
+                    case Comparison(prop=prop, operator="=", value=str() as name) \
+                            if _key(prop) == "__class":
+                        return QueryPlan(strategy="class index", classes=(_key(name),))
+                    case IsA(prop=prop, class_name=class_name) if _key(prop) == "__this":
+                        return QueryPlan(strategy="superclass index",
+                                         classes=tuple(sorted(self.derived(class_name))))
+                    case Comparison(prop=prop, operator="=", value=str() as name) \
+                            if _key(prop) == "__superclass":
+                        return QueryPlan(strategy="superclass index",
+                                         classes=tuple(sorted(self._subclasses.get(
+                                             _key(name), []))))
+
+            return QueryPlan(strategy="class scan", classes=tuple(sorted(self._classes)))
+
+        classes = tuple(sorted(self.derived(query.class_name)))
+        for condition in conjuncts:
+            match condition:
+                case Comparison(prop=prop, operator="=", value=value) \
+                        if not prop.startswith("__"):
+                    return QueryPlan(strategy="property index", classes=classes,
+                                     index=(_key(prop), _normalize(value)))
+                case Comparison(prop=prop, operator="=", value=str() as name) \
+                        if _key(prop) == "__class":
+                    return QueryPlan(strategy="class index",
+                                     classes=tuple(c for c in classes if c == _key(name)))
+
+        return QueryPlan(strategy="class index", classes=classes)
+
+    def _candidates(self, query: SelectQuery, plan: QueryPlan) -> Iterable[WmiObject]:
+        """Retrieve the candidates of a SELECT query using the given plan"""
+        if _key(query.class_name) == META_CLASS:
+            for key in plan.classes:
+                cls = self._classes.get(key)
+                if cls is not None:
+                    yield cls
+            return
+
+        for key in plan.classes:
+            if plan.index is None:
+                yield from self._instances.get(key, [])
+            else:
+                yield from self._value_index(key, plan.index[0]).get(plan.index[1], [])
+
+    def matches(self, obj: WmiObject, condition: Condition) -> bool:
+        """Evaluate a condition for a class or instance"""
+        # pylint: disable=too-many-return-statements
+        match condition:
+            case And(left=left, right=right):
+                return self.matches(obj, left) and self.matches(obj, right)
+            case Or(left=left, right=right):
+                return self.matches(obj, left) or self.matches(obj, right)
+            case Not(condition=inner):
+                return not self.matches(obj, inner)
+            case IsNull(prop=prop, negated=negated):
+                return (self.value(obj, prop)[1] is None) != negated
+            case IsA(prop=prop, class_name=class_name):
+                if _key(prop) == "__this":
+                    return self.isa(obj, class_name)
+                value = self.value(obj, prop)[1]
+                return isinstance(value, WmiObject) and self.isa(value, class_name)
+            case Like(prop=prop, pattern=pattern):
+                value = self.value(obj, prop)[1]
+                return isinstance(value, str) and pattern.fullmatch(value) is not None
+            case Comparison(prop=prop, operator=operator, value=literal):
+                value = self.value(obj, prop)[1]
+                if value is None or isinstance(value, (list, WmiObject)):
+                    return False
+                if isinstance(value, str) != isinstance(literal, str):
+                    return False
+                try:
+                    return bool(OPERATORS[operator](_normalize(value), _normalize(literal)))
+                except TypeError:
+                    return False
+
+        raise QueryError(f"Unsupported condition {condition}")
+
+    def _references_index(self) -> dict[PathKey, list[tuple[WmiObject, str]]]:
+        """Retrieve the index of the reference properties of all instances by their target"""
+        if self._references is None:
+            references: dict[PathKey, list[tuple[WmiObject, str]]] = {}
+            for instances in self._instances.values():
+                for obj in instances:
+                    for name, value in self._reference_values(obj):
+                        references.setdefault(parse_object_path(value), []).append((obj, name))
+
+            self._references = references
+
+        return self._references
+
+    def _reference_values(self, obj: WmiObject) -> list[tuple[str, str]]:
+        """Retrieve the names and values of the reference properties of a instance"""
+        references: dict[str, str] = {}
+        for current in self._chain(obj):
+            for prop in current.variables:
+                if prop.data_type.basic_type != WmiDataType.REFERENCE and not any(
+                    _key(q.name) == "cimtype" and isinstance(q.value, str)
+                    and q.value.lower().startswith("ref") for q in prop.qualifiers or []
+                ):
+                    continue
+
+                name = prop.name or ""
+                value = self.value(obj, name)[1]
+                if isinstance(value, str):
+                    references.setdefault(_key(name), value)
+
+        return [(self._property_name(obj, key), value) for key, value in references.items()]
+
+    def _property_name(self, obj: WmiObject, key: str) -> str:
+        """Retrieve the name of a property as declared"""
+        for current in self._chain(obj):
+            for prop in current.variables:
+                if _key(prop.name) == key:
+                    return prop.name or key
+
+        return key
+
+    def _paths_index(self) -> dict[PathKey, WmiObject]:
+        """Retrieve the index of all instances by their object path"""
+        if self._paths is None:
+            paths: dict[PathKey, WmiObject] = {}
+            for instances in self._instances.values():
+                for obj in instances:
+                    path = self.path(obj)
+                    if path is not None:
+                        paths.setdefault(parse_object_path(path), obj)
+
+            self._paths = paths
+
+        return self._paths
+
+    def _associators(self, query: AssociatorsQuery) -> list[QueryRow]:
+        """Evaluate a ASSOCIATORS OF query"""
+        source = parse_object_path(query.path)
+        paths = self._paths_index()
+        results: dict[int, QueryRow] = {}
+
+        for assoc, role in self._references_index().get(source, []):
+            if query.role is not None and _key(role) != _key(query.role):
+                continue
+            if query.assoc_class is not None and not self.isa(assoc, query.assoc_class):
+                continue
+
+            for result_role, target in self._reference_values(assoc):
+                if _key(result_role) == _key(role):
+                    continue
+                if query.result_role is not None and _key(result_role) != _key(query.result_role):
+                    continue
+
+                obj = paths.get(parse_object_path(target))
+                if obj is None:
+                    continue
+                if query.result_class is not None and not self.isa(obj, query.result_class):
+                    continue
+
+                results.setdefault(id(obj), QueryRow(obj=obj, properties=self.properties(obj)))
+
+        return list(results.values())
+
+    def execute(self, query: str | Query) -> list[QueryRow]:
+        """Evaluate a WQL query, returning the matching classes or instances"""
+        if isinstance(query, str):
+            query = parse_query(query)
+
+        if isinstance(query, AssociatorsQuery):
+            return self._associators(query)
+
+        rows = []
+        for obj in self._candidates(query, self.plan(query)):
+            if query.where is not None and not self.matches(obj, query.where):
+                continue
+
+            if query.properties is None:
+                properties = self.properties(obj)
+            else:
+                properties = {name: self.value(obj, name)[1] for name in query.properties}
+
+            rows.append(QueryRow(obj=obj, properties=properties))
+
+        return rows
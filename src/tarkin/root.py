@@ -4,10 +4,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Final
-from construct import Struct, Int32ul, Const, Container, Adapter, FixedSized, Rebuild, this, \
-    len_, PrefixedArray
-from .wmi_object import BMOF_WMI_OBJECT, WmiObject
+from typing import Any, Final, Optional, Sequence
+from construct import Struct, Int32ul, Const, Container, Adapter, FixedSized, Rebuild, \
+    PrefixedArray
+from .compact import State, StringTable, reduce
+from .constructs import SizeCache, size_cache
+from .wmi_object import BMOF_WMI_OBJECT, WmiObject, sizeof_wmi_object
 
 
 @dataclass(frozen=True, slots=True)
@@ -23,6 +25,21 @@ class Root:
             objects=container["data"]["objects"]
         )
 
+    def pack(self, table: StringTable) -> State:
+        """Convert root structure for compact pickling"""
+        return tuple(obj.pack(table) for obj in self.objects)
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> Root:
+        """Restore root structure converted using pack()"""
+        return cls(
+            objects=[WmiObject.unpack(strings, obj) for obj in state]
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle root structure using a compact representation"""
+        return reduce(self)
+
 
 class RootAdapter(Adapter):
     # pylint: disable=abstract-method
@@ -40,10 +57,30 @@ class RootAdapter(Adapter):
         )
 
 
+def sizeof_root(objects: list[WmiObject], offsets: Optional[dict[int, int]] = None,
+                sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded BMOF root structure in bytes.
+
+    When offsets is given, the offsets of all qualifiers inside the objects are recorded,
+    see wmi_object.sizeof_wmi_object(). The root structure is expected to be located at
+    the start of the decompressed BMOF data. When sizes is given, the sizes of objects
+    are cached inside it, see constructs.size_cache().
+    """
+    size = 20
+    for obj in objects:
+        size += sizeof_wmi_object(obj, size, offsets, sizes)
+
+    return size
+
+
 BMOF_ROOT: Final = RootAdapter(
     Struct(
         "magic" / Const(b"FOMB"),
-        "length" / Rebuild(Int32ul, len_(this)),
+        "length" / Rebuild(
+            Int32ul,
+            lambda this: sizeof_root(this.data.objects, sizes=size_cache(this))
+        ),
         "data" / FixedSized(
             lambda this: this.length - 8,   # 8 is the length of the "magic" and "length" fields
             Struct(
@@ -69,3 +106,17 @@ It starts with a header containing the following fields:
  - Another 32-bit litle endian constant (0x1) with an unknown purpose
  - A 32-bit count field specifying the number of objects after the header
 """
+
+
+BMOF_ROOT_HEADER: Final = Struct(
+    "magic" / Const(b"FOMB"),
+    "length" / Int32ul,
+    "unknown1" / Const(1, Int32ul),
+    "unknown2" / Const(1, Int32ul),
+    "count" / Int32ul
+)
+"""
+The header of the BMOF root structure.
+
+See BMOF_ROOT for a description of the header fields.
+"""
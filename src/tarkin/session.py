@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Reusable state for parsing many BMOF files"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Final, Iterable, Iterator
+from construct import Container, StreamError, TerminatedError
+from .bmof import BMOF_DATA, BMOF_HEADER, BMOF_HEADER_SIZE, Bmof
+from .ds import decompress_into
+from .wmi_type import WmiType
+
+
+MIN_ARENA_SIZE: Final = 64 * 1024
+"""Initial size of the decompression buffer arena in bytes"""
+
+
+class ParserSession:
+    """
+    Parser keeping its state between multiple BMOF data buffers.
+
+    BMOF data is decompressed into a buffer arena which grows to the largest
+    decompressed size seen so far and is reused afterwards, instead of allocating
+    a new buffer for each BMOF. The decompressed data is copied out of the arena
+    before being parsed, since the root structure is parsed from a copy of its bytes
+    anyway. Decoded strings are interned and WMI types are cached across all parsed
+    BMOFs, so the results share equal strings and types.
+
+    A session must not be used from multiple threads at once, use a separate
+    session per thread instead.
+    """
+    __slots__ = ("_arena", "strings", "types")
+
+    def __init__(self) -> None:
+        self._arena = bytearray()
+        self.strings: dict[str, str] = {}
+        self.types: dict[int, WmiType] = {}
+
+    @property
+    def arena_size(self) -> int:
+        """Size of the decompression buffer arena in bytes"""
+        return len(self._arena)
+
+    def _buffer(self, length: int) -> memoryview:
+        """Retrieve a buffer of the given length inside the arena, growing it if necessary"""
+        if length > len(self._arena):
+            # Grow geometrically so a series of growing BMOFs does not reallocate every time
+            self._arena = bytearray(max(length, 2 * len(self._arena), MIN_ARENA_SIZE))
+
+        return memoryview(self._arena)[:length]
+
+    def parse(self, data: bytes) -> Bmof:
+        """Decompress and parse a BMOF data buffer"""
+        header = BMOF_HEADER.parse(data)
+        end = BMOF_HEADER_SIZE + header.compressed_length
+        if len(data) < end:
+            raise StreamError(f"stream read less than specified amount, expected "
+                              f"{header.compressed_length}, found {len(data) - BMOF_HEADER_SIZE}")
+        if len(data) > end:
+            raise TerminatedError("expected end of stream")
+
+        with memoryview(data) as view, self._buffer(header.final_length) as buffer:
+            decompress_into(view[BMOF_HEADER_SIZE:end], buffer)
+            decompressed = buffer.tobytes()
+
+        container: Container = BMOF_DATA.parse(decompressed, _intern_table=self.strings,
+                                               _type_cache=self.types)
+
+        return Bmof(root=container.root, flavors=container.flavors)
+
+    def parse_file(self, path: Path) -> Bmof:
+        """Decompress and parse a BMOF file"""
+        return self.parse(path.read_bytes())
+
+    def parse_files(self, paths: Iterable[Path]) -> Iterator[tuple[Path, Bmof | Exception]]:
+        """
+        Parse multiple BMOF files in turn, yielding the results in order.
+
+        Errors are yielded instead of the result of the affected file.
+        """
+        for path in paths:
+            try:
+                bmof = self.parse_file(path)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                yield path, error
+                continue
+
+            yield path, bmof
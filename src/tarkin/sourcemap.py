@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+"""Byte ranges of the nodes decoded from BMOF data"""
+
+from __future__ import annotations
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from construct import Container
+from .bmof import BMOF_DATA, Bmof
+from .constructs import SpanRecorder
+from .events import decompress_bmof
+from .flavor import Flavors, QualifierFlavor
+from .wmi_qualifier import WmiQualifier
+
+
+@dataclass(frozen=True, slots=True)
+class Span:
+    """
+    Byte range inside the decompressed BMOF data.
+
+    Keyword arguments:
+    start -- offset of the first byte
+    end -- offset after the last byte
+    """
+
+    start: int
+
+    end: int
+
+    def __len__(self) -> int:
+        """Retrieve the length of the byte range"""
+        return self.end - self.start
+
+
+class SourceMap:
+    """
+    Map from decoded nodes to their byte ranges inside the decompressed BMOF data.
+
+    Objects, properties, methods and qualifiers are mapped to the byte range of their
+    structure, and properties and qualifiers with a value additionally to the byte range
+    of the value. Nodes are looked up by identity, so only the nodes returned by the
+    same parsing process can be used. Methods and parameters are mapped to the
+    properties they were built from, so merged parameters use their first occurrence.
+
+    The raw bytes are returned as read-only memoryviews sharing the decompressed data,
+    so they can be hashed, compared or written without copying or rebuilding the node.
+    Flavors are joined with the qualifiers by merging the flavors sorted by offset with
+    the qualifiers sorted by offset once, instead of indexing them by offset.
+
+    Keyword arguments:
+    data -- decompressed BMOF data
+    recorder -- byte ranges recorded while parsing data
+    flavors -- flavors parsed from data
+    """
+    __slots__ = ("data", "_recorder", "_offsets", "_qualifiers", "_flavors")
+
+    def __init__(self, data: bytes, recorder: SpanRecorder,
+                 flavors: Optional[list[QualifierFlavor]] = None) -> None:
+        self.data = memoryview(data).toreadonly()
+        self._recorder = recorder
+
+        entries = sorted(
+            (start, obj) for obj, start, _ in recorder.nodes.values()
+            if isinstance(obj, WmiQualifier)
+        )
+        self._offsets = [start for start, _ in entries]
+        self._qualifiers = [obj for _, obj in entries]
+        self._flavors: dict[int, Flavors] = {}
+
+        index = 0
+        for flavor in sorted(flavors or [], key=lambda f: f.offset):
+            index = bisect_left(self._offsets, flavor.offset, index)
+            if index < len(self._offsets) and self._offsets[index] == flavor.offset:
+                self._flavors[id(self._qualifiers[index])] = flavor.flavors
+
+    def span(self, node: object) -> Optional[Span]:
+        """Retrieve the byte range of a node"""
+        entry = self._recorder.nodes.get(id(node))
+        if entry is None or entry[0] is not node:
+            return None
+
+        return Span(entry[1], entry[2])
+
+    def value_span(self, node: object) -> Optional[Span]:
+        """Retrieve the byte range of the value of a node"""
+        if self.span(node) is None:
+            return None
+
+        value = self._recorder.values.get(id(node))
+        if value is None:
+            return None
+
+        return Span(*value)
+
+    def raw(self, node: object) -> Optional[memoryview]:
+        """Retrieve the raw bytes of a node"""
+        span = self.span(node)
+        if span is None:
+            return None
+
+        return self.data[span.start:span.end]
+
+    def raw_value(self, node: object) -> Optional[memoryview]:
+        """Retrieve the raw bytes of the value of a node"""
+        span = self.value_span(node)
+        if span is None:
+            return None
+
+        return self.data[span.start:span.end]
+
+    def qualifier_at(self, offset: int) -> Optional[WmiQualifier]:
+        """Retrieve the qualifier starting at the given offset"""
+        index = bisect_left(self._offsets, offset)
+        if index < len(self._offsets) and self._offsets[index] == offset:
+            return self._qualifiers[index]
+
+        return None
+
+    def flavors(self, qualifier: WmiQualifier) -> Optional[Flavors]:
+        """Retrieve the flavors of a qualifier"""
+        if self.span(qualifier) is None:
+            return None
+
+        return self._flavors.get(id(qualifier))
+
+
+def parse_with_source_map(data: bytes) -> tuple[Bmof, SourceMap]:
+    """Parse a BMOF data buffer while recording the byte ranges of the decoded nodes"""
+    decompressed = bytes(decompress_bmof(data))
+    recorder = SpanRecorder()
+    container: Container = BMOF_DATA.parse(decompressed, _span_recorder=recorder)
+
+    return (
+        Bmof(root=container.root, flavors=container.flavors),
+        SourceMap(decompressed, recorder, container.flavors)
+    )
+
+
+def parse_file_with_source_map(path: Path) -> tuple[Bmof, SourceMap]:
+    """Parse a BMOF file while recording the byte ranges of the decoded nodes"""
+    return parse_with_source_map(path.read_bytes())
@@ -0,0 +1,408 @@
+#!/usr/bin/python3
+
+"""BMOF size accounting"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final, Optional
+from construct import StreamError
+from .bmof import BMOF_HEADER, BMOF_HEADER_SIZE
+from .events import BmofHandler, EventParser, decompress_bmof, NULL_REFERENCE, OBJECT_HEADER, \
+    PROPERTY_HEADER, QUALIFIER_HEADER, ARRAY_HEADER, SCALARS
+from .flavor import Flavors
+from .root import BMOF_ROOT_HEADER
+from .wmi_object import WmiObject, WmiObjectType
+from .wmi_type import WmiType, WmiDataType
+
+
+LENGTH_SIZE: Final = SCALARS[WmiDataType.UINT32].size
+"""Size of the length field at the start of each substructure"""
+
+
+@dataclass(slots=True)
+class ClassStats:
+    """Sizes attributed to a single top-level object in bytes"""
+    # pylint: disable=too-many-instance-attributes
+
+    name: Optional[str]
+
+    object_type: WmiObjectType
+
+    offset: int
+
+    size: int
+
+    properties: int = 0
+
+    methods: int = 0
+
+    qualifier_arrays: int = 0
+
+    strings: int = 0
+
+    nested_objects: int = 0
+
+    unreferenced: int = 0
+
+
+@dataclass(slots=True)
+class QualifierStats:
+    """Sizes attributed to all qualifiers sharing the same name in bytes"""
+
+    count: int = 0
+
+    size: int = 0
+
+
+@dataclass(slots=True)
+class Unreferenced:
+    """Heap bytes not referenced by any heap reference"""
+
+    offset: int
+
+    size: int
+
+    structure: str
+
+
+@dataclass(slots=True)
+class BlobStats:
+    """Size accounting for a BMOF data buffer"""
+
+    compressed_size: int
+
+    decompressed_size: int
+
+    root_size: int = 0
+
+    classes: list[ClassStats] = field(default_factory=list)
+
+    qualifiers: dict[str, QualifierStats] = field(default_factory=dict)
+
+    unreferenced: list[Unreferenced] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        """Retrieve the compression ratio"""
+        if self.decompressed_size == 0:
+            return 1.0
+
+        return self.compressed_size / self.decompressed_size
+
+    @property
+    def flavors_size(self) -> int:
+        """Retrieve the size of the flavors section in bytes"""
+        return self.decompressed_size - self.root_size
+
+    def estimate(self, size: int) -> int:
+        """Estimate the number of compressed bytes of the given number of decompressed bytes"""
+        return round(size * self.ratio)
+
+
+class StatsHandler(BmofHandler):
+    """
+    Handler attributing the bytes of decompressed BMOF data to its substructures.
+
+    The sizes are taken from the length fields of the substructures. Heap bytes not
+    covered by the substructures referenced from the heap are recorded as unreferenced.
+
+    Every byte of a top-level object is attributed to a single category: nested objects
+    and qualifier arrays include everything inside them, while properties and methods
+    only include the bytes not attributed to the other categories. Together with the
+    object header, the categories add up to the size of the top-level object.
+
+    Keyword arguments:
+    buffer -- decompressed BMOF data
+    stats -- statistics to update
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, buffer: bytes | bytearray, stats: BlobStats) -> None:
+        self.buffer = buffer
+        self.stats = stats
+        self._depth = 0
+        self._qualifiers = 0
+        self._record: Optional[str] = None
+        self._current: Optional[ClassStats] = None
+
+    def _length(self, offset: int) -> int:
+        """Read the length field at the given offset"""
+        return int.from_bytes(self.buffer[offset:offset + LENGTH_SIZE], "little")
+
+    def _claim(self, size: int) -> Optional[ClassStats]:
+        """Retrieve the statistics to attribute bytes to, removing them from the enclosing record"""
+        if self._current is None or self._depth != 1 or self._qualifiers:
+            return None
+
+        if self._record == "property":
+            self._current.properties -= size
+        elif self._record == "method":
+            self._current.methods -= size
+
+        return self._current
+
+    def _array_size(self, heap: int, reference: int) -> int:
+        """Retrieve the size of a referenced BMOF array, recording unused bytes inside it"""
+        if reference == NULL_REFERENCE:
+            return 0
+
+        offset = heap + reference
+        if offset < 0 or offset + ARRAY_HEADER.size > len(self.buffer):
+            raise StreamError(f"stream read less than specified amount, expected "
+                              f"{ARRAY_HEADER.size} at offset {offset}")
+
+        length: int
+        count: int
+        length, count = ARRAY_HEADER.unpack_from(self.buffer, offset)
+        end = min(length, len(self.buffer) - offset)
+        used = ARRAY_HEADER.size
+        for _ in range(count):
+            # The count is not validated yet, so stop at the end of the array
+            if used + LENGTH_SIZE > end:
+                break
+
+            item = self._length(offset + used)
+            if item < LENGTH_SIZE:
+                break
+
+            used += item
+
+        self._unused(offset + used, length - used, "array")
+
+        return length
+
+    def _qualifier_array_size(self, heap: int, reference: int) -> int:
+        """Retrieve the size of a referenced BMOF array of qualifiers"""
+        size = self._array_size(heap, reference)
+        current = self._claim(size)
+        if current is not None:
+            current.qualifier_arrays += size
+
+        return size
+
+    def _data_size(self, heap: int, reference: int, data_type: WmiType, value: object) -> int:
+        """Retrieve the size of a referenced data item"""
+        if reference == NULL_REFERENCE:
+            return 0
+
+        if data_type.is_array or data_type.basic_type == WmiDataType.OBJECT:
+            return self._length(heap + reference)
+
+        if data_type.basic_type == WmiDataType.STRING:
+            size = len(str(value).encode("utf_16_le")) + 2
+            self._string(size)
+            return size
+
+        return SCALARS[data_type.basic_type].size
+
+    def _name_size(self, name: Optional[str]) -> int:
+        """Retrieve the size of a name"""
+        if name is None:
+            return 0
+
+        size = len(name.encode("utf_16_le")) + 2
+        self._string(size)
+
+        return size
+
+    def _string(self, size: int) -> None:
+        """Account a string"""
+        current = self._claim(size)
+        if current is not None:
+            current.strings += size
+
+    def _unused(self, offset: int, size: int, structure: str) -> None:
+        """Record unreferenced bytes"""
+        if size <= 0:
+            return
+
+        self.stats.unreferenced.append(Unreferenced(offset=offset, size=size, structure=structure))
+        current = self._claim(size)
+        if current is not None:
+            current.unreferenced += size
+
+    def _gaps(self, start: int, end: int, ranges: list[tuple[int, int]], structure: str) -> None:
+        """Record the bytes between start and end not covered by the given byte ranges"""
+        position = start
+        for range_start, range_end in sorted(ranges):
+            self._unused(position, range_start - position, structure)
+            position = max(position, range_end)
+
+        self._unused(position, end - position, structure)
+
+    def _property(self, offset: int, name: Optional[str], data_type: WmiType,
+                  value: object, structure: str) -> int:
+        """Account a property record and return its length"""
+        length: int
+        length, _, name_offset, value_offset, qualifiers_offset = \
+            PROPERTY_HEADER.unpack_from(self.buffer, offset)
+        heap = offset + PROPERTY_HEADER.size
+        ranges = [
+            (heap + name_offset, self._name_size(name)),
+            (heap + value_offset, self._data_size(heap, value_offset, data_type, value)),
+            (heap + qualifiers_offset, self._qualifier_array_size(heap, qualifiers_offset))
+        ]
+        self._gaps(heap, offset + length, [(s, s + n) for s, n in ranges if n], structure)
+
+        return length
+
+    def start_object(self, offset: int, object_type: WmiObjectType) -> None:
+        length, qualifiers_offset, properties_offset, methods_offset, _ = \
+            OBJECT_HEADER.unpack_from(self.buffer, offset)
+        heap = offset + OBJECT_HEADER.size
+
+        if self._depth == 0:
+            self._current = ClassStats(name=None, object_type=object_type, offset=offset,
+                                       size=length)
+            self.stats.classes.append(self._current)
+        else:
+            current = self._claim(length)
+            if current is not None:
+                current.nested_objects += length
+
+        self._depth += 1
+        ranges = [
+            (heap + qualifiers_offset, self._qualifier_array_size(heap, qualifiers_offset)),
+            (heap + properties_offset, self._array_size(heap, properties_offset)),
+            (heap + methods_offset, self._array_size(heap, methods_offset))
+        ]
+        self._gaps(heap, offset + length, [(s, s + n) for s, n in ranges if n], "object")
+
+        # The array headers are attributed to the records inside the arrays
+        if self._depth == 1 and self._current is not None:
+            if properties_offset != NULL_REFERENCE:
+                self._current.properties += ARRAY_HEADER.size
+
+            if methods_offset != NULL_REFERENCE:
+                self._current.methods += ARRAY_HEADER.size
+
+    def end_object(self, offset: int, obj: Optional[WmiObject]) -> None:
+        self._depth -= 1
+
+    def start_property(self, offset: int, name: Optional[str], data_type: WmiType,
+                       value: object) -> None:
+        if self._depth != 1 or self._current is None:
+            self._property(offset, name, data_type, value, "property")
+            return
+
+        # Bytes attributed to other categories are removed while accounting the record
+        self._record = "property"
+        length = self._property(offset, name, data_type, value, "property")
+        self._current.properties += length
+        if name == "__CLASS" and isinstance(value, str):
+            self._current.name = value
+
+    def end_property(self, offset: int, name: Optional[str]) -> None:
+        if self._depth == 1:
+            self._record = None
+
+    def start_method(self, offset: int, name: Optional[str]) -> None:
+        data_type = WmiType.from_int(PROPERTY_HEADER.unpack_from(self.buffer, offset)[1])
+        if self._depth != 1 or self._current is None:
+            self._property(offset, name, data_type, None, "method")
+            return
+
+        self._record = "method"
+        length = self._property(offset, name, data_type, None, "method")
+        self._current.methods += length
+
+    def end_method(self, offset: int, name: Optional[str]) -> None:
+        if self._depth == 1:
+            self._record = None
+
+    def start_parameter(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object) -> None:
+        self._property(offset, name, data_type, value, "parameter")
+
+    def start_qualifier(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object, flavors: Flavors) -> None:
+        length, _, name_offset, value_offset = QUALIFIER_HEADER.unpack_from(self.buffer, offset)
+        heap = offset + QUALIFIER_HEADER.size
+
+        entry = self.stats.qualifiers.setdefault(name or "", QualifierStats())
+        entry.count += 1
+        entry.size += length
+
+        # The qualifier arrays already include everything inside the qualifiers
+        self._qualifiers += 1
+        ranges = [
+            (heap + name_offset, self._name_size(name)),
+            (heap + value_offset, self._data_size(heap, value_offset, data_type, value))
+        ]
+        self._gaps(heap, offset + length, [(s, s + n) for s, n in ranges if n], "qualifier")
+
+    def end_qualifier(self, offset: int, name: Optional[str]) -> None:
+        self._qualifiers -= 1
+
+    def start_array_item(self, offset: int, index: int, value: object) -> None:
+        if isinstance(value, str):
+            self._string(len(value.encode("utf_16_le")) + 2)
+
+
+def blob_stats(data: bytes) -> BlobStats:
+    """Calculate the size accounting of a BMOF data buffer"""
+    header = BMOF_HEADER.parse(data)
+    buffer = decompress_bmof(data)
+    root = BMOF_ROOT_HEADER.parse(bytes(buffer[:BMOF_ROOT_HEADER.sizeof()]))
+    stats = BlobStats(
+        compressed_size=BMOF_HEADER_SIZE + header.compressed_length,
+        decompressed_size=len(buffer),
+        root_size=root.length
+    )
+
+    EventParser(buffer, [StatsHandler(buffer, stats)]).parse()
+
+    used = BMOF_ROOT_HEADER.sizeof() + sum(c.size for c in stats.classes)
+    if root.length > used:
+        stats.unreferenced.append(Unreferenced(offset=used, size=root.length - used,
+                                               structure="root"))
+
+    return stats
+
+
+def blob_stats_file(path: Path) -> BlobStats:
+    """Calculate the size accounting of a BMOF file"""
+    return blob_stats(path.read_bytes())
+
+
+def format_stats(stats: BlobStats) -> str:
+    """Format the size accounting as a human-readable report"""
+    lines = [
+        f"Compressed size: {stats.compressed_size} bytes",
+        f"Decompressed size: {stats.decompressed_size} bytes (ratio {stats.ratio:.2f})",
+        f"Flavors section: {stats.flavors_size} bytes "
+        f"(~{stats.estimate(stats.flavors_size)} compressed)",
+        "",
+        f"{'Object':<32} {'Bytes':>8} {'~Compr.':>8} {'Props':>8} {'Methods':>8} "
+        f"{'Quals':>8} {'Strings':>8} {'Nested':>8} {'Unref.':>8}"
+    ]
+    for entry in sorted(stats.classes, key=lambda c: c.size, reverse=True):
+        name = entry.name or "<unnamed>"
+        if entry.object_type == WmiObjectType.INSTANCE:
+            name = f"instance of {name}"
+
+        lines.append(
+            f"{name:<32} {entry.size:>8} {stats.estimate(entry.size):>8} {entry.properties:>8} "
+            f"{entry.methods:>8} {entry.qualifier_arrays:>8} {entry.strings:>8} "
+            f"{entry.nested_objects:>8} {entry.unreferenced:>8}"
+        )
+
+    lines += [
+        "",
+        f"{'Qualifier':<32} {'Count':>8} {'Bytes':>8} {'~Compr.':>8}"
+    ]
+    for name, qualifier in sorted(stats.qualifiers.items(), key=lambda i: i[1].size,
+                                  reverse=True):
+        lines.append(f"{name:<32} {qualifier.count:>8} {qualifier.size:>8} "
+                     f"{stats.estimate(qualifier.size):>8}")
+
+    total = sum(u.size for u in stats.unreferenced)
+    lines += [
+        "",
+        f"Unreferenced heap bytes: {total}"
+    ]
+    for unreferenced in stats.unreferenced:
+        lines.append(f"  {unreferenced.size} bytes inside {unreferenced.structure} "
+                     f"at offset {unreferenced.offset:#x}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+
+"""Content-addressed store for BMOF objects"""
+
+from __future__ import annotations
+from hashlib import sha256
+from os import getpid
+from json import dumps, loads
+from pathlib import Path
+from threading import get_ident
+from typing import Final, Iterator, Optional
+from urllib.parse import quote, unquote
+from construct import Int32ul
+from .bmof import Bmof, BMOF
+from .flavor import Flavors, QualifierFlavor
+from .root import Root
+from .wmi_object import BMOF_WMI_OBJECT, WmiObject, sizeof_wmi_object
+
+
+CLASSES_DIRECTORY: Final = "classes"
+"""Directory containing the unique objects of a store"""
+
+BLOBS_DIRECTORY: Final = "blobs"
+"""Directory containing the object references of each imported BMOF"""
+
+
+def object_flavors(obj: WmiObject, flavors: dict[int, Flavors]) -> list[QualifierFlavor]:
+    """
+    Retrieve the flavors of all qualifiers inside an object.
+
+    The offsets of the returned flavors are relative to the start of the encoded object.
+    """
+    offsets: dict[int, int] = {}
+    sizeof_wmi_object(obj, 0, offsets)
+
+    return sorted(
+        (QualifierFlavor(offset=new, flavors=flavors[old])
+         for old, new in offsets.items() if old in flavors),
+        key=lambda f: f.offset
+    )
+
+
+def fingerprint(obj: WmiObject, flavors: list[QualifierFlavor]) -> str:
+    """
+    Calculate the canonical fingerprint of an object.
+
+    The fingerprint covers the encoded object including all qualifiers together with
+    the flavors of said qualifiers. The flavors are expected to be relative to the object,
+    see object_flavors().
+    """
+    digest = sha256(BMOF_WMI_OBJECT.build(obj))
+    for flavor in flavors:
+        digest.update(Int32ul.build(flavor.offset))
+        digest.update(Int32ul.build(int(flavor.flavors)))
+
+    return digest.hexdigest()
+
+
+class ClassStore:
+    """
+    Content-addressed store for deduplicating BMOF objects.
+
+    Each unique object is stored once inside a BMOF file named after its fingerprint,
+    together with the flavors of its qualifiers. Imported BMOF data is recorded as a list
+    of references to those objects, allowing the original object list to be reconstructed.
+
+    Keyword arguments:
+    path -- directory containing the store
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._cache: dict[str, tuple[WmiObject, list[QualifierFlavor]]] = {}
+
+        (path / CLASSES_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        (path / BLOBS_DIRECTORY).mkdir(parents=True, exist_ok=True)
+
+    def _class_path(self, ref: str) -> Path:
+        """Retrieve the path of a stored object"""
+        return self.path / CLASSES_DIRECTORY / ref[:2] / f"{ref}.bmf"
+
+    def _blob_path(self, name: str) -> Path:
+        """Retrieve the path of a BMOF record"""
+        return self.path / BLOBS_DIRECTORY / quote(name, safe="")
+
+    def add_object(self, obj: WmiObject, flavors: dict[int, Flavors]) -> str:
+        """Store an object together with its flavors and return its reference"""
+        relative = object_flavors(obj, flavors)
+        ref = fingerprint(obj, relative)
+
+        path = self._class_path(ref)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            offsets: dict[int, int] = {}
+            sizeof_wmi_object(obj, 0, offsets)
+            data = BMOF.build(
+                Bmof(
+                    root=Root(objects=[obj]),
+                    flavors=[
+                        QualifierFlavor(offset=offset, flavors=flavors[offset])
+                        for offset in offsets if offset in flavors
+                    ]
+                )
+            )
+            # Write to a temporary file first to never expose partially written objects
+            temp_path = path.with_suffix(f".{getpid()}-{get_ident()}.tmp")
+            temp_path.write_bytes(data)
+            temp_path.replace(path)
+
+        return ref
+
+    def load_object(self, ref: str) -> tuple[WmiObject, list[QualifierFlavor]]:
+        """Load a stored object together with the flavors relative to the object"""
+        entry = self._cache.get(ref)
+        if entry is None:
+            bmof: Bmof = BMOF.parse_file(self._class_path(ref))
+            obj = bmof.root.objects[0]
+            flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+            entry = self._cache.setdefault(ref, (obj, object_flavors(obj, flavors)))
+
+        return entry
+
+    def import_bmof(self, name: str, bmof: Bmof) -> list[str]:
+        """Import BMOF data under the given name and return the object references"""
+        flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+        refs = [self.add_object(obj, flavors) for obj in bmof.root.objects]
+
+        record = {
+            "flavors": bmof.flavors is not None,
+            "classes": refs
+        }
+        self._blob_path(name).write_text(dumps(record), encoding="utf-8")
+
+        return refs
+
+    def import_file(self, path: Path, name: Optional[str] = None) -> list[str]:
+        """Import a BMOF file, using the file path as the default name"""
+        return self.import_bmof(str(path) if name is None else name, BMOF.parse_file(path))
+
+    def names(self) -> Iterator[str]:
+        """Retrieve the names of all imported BMOF data"""
+        for path in (self.path / BLOBS_DIRECTORY).iterdir():
+            yield unquote(path.name)
+
+    def refs(self, name: str) -> list[str]:
+        """Retrieve the object references of imported BMOF data"""
+        record = loads(self._blob_path(name).read_text(encoding="utf-8"))
+
+        return list(record["classes"])
+
+    def reconstruct(self, name: str) -> Bmof:
+        """Reconstruct imported BMOF data"""
+        record = loads(self._blob_path(name).read_text(encoding="utf-8"))
+
+        objects = []
+        flavors: list[QualifierFlavor] = []
+        offset = 20     # 20 is the size of the root header
+        for ref in record["classes"]:
+            obj, relative = self.load_object(ref)
+            objects.append(obj)
+            flavors.extend(
+                QualifierFlavor(offset=f.offset + offset, flavors=f.flavors) for f in relative
+            )
+            offset += sizeof_wmi_object(obj)
+
+        # Objects from different files can contain qualifiers with identical offsets,
+        # so encode the objects to assign each qualifier its final offset.
+        bmof: Bmof = BMOF.parse(BMOF.build(Bmof(root=Root(objects=objects), flavors=None)))
+
+        return Bmof(
+            root=bmof.root,
+            flavors=flavors if record["flavors"] else None
+        )
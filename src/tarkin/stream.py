@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+"""Incremental BMOF parser"""
+
+from __future__ import annotations
+from typing import Final, BinaryIO, Iterator, Optional
+from construct import BytesIOWithOffsets, FocusedSeq, Optional as COptional, Terminated, \
+    StreamError, stream_read
+from .bmof import BMOF_HEADER
+from .ds import DsDecompressor
+from .flavor import BMOF_FLAVORS, QualifierFlavor
+from .root import BMOF_ROOT_HEADER
+from .wmi_object import BMOF_WMI_OBJECT, WmiObject
+
+
+CHUNK_SIZE: Final = 64 * 1024
+
+BMOF_TRAILER: Final = FocusedSeq(
+    "flavors",
+    "flavors" / COptional(BMOF_FLAVORS),
+    Terminated
+)
+
+
+class BmofStreamParser:
+    # pylint: disable=too-few-public-methods
+    """
+    Incremental parser for BMOF data buffers.
+
+    The compressed BMOF data is read and decompressed in chunks, with each object being
+    parsed as soon as its data is available. Decompressed data is released once the object
+    containing it was parsed, so only the data of a single object is held in memory.
+    The flavors section is parsed after the last object was returned.
+
+    Keyword arguments:
+    stream -- binary stream containing the BMOF data buffer
+    chunk_size -- number of compressed bytes to read at once
+    """
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> None:
+        header = BMOF_HEADER.parse(stream_read(stream, BMOF_HEADER.sizeof(), "(header)"))
+
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.flavors: Optional[list[QualifierFlavor]] = None
+        self._remaining: int = header.compressed_length
+        self._decompressor = DsDecompressor(header.final_length)
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def _fill(self, length: int) -> None:
+        """Decompress data until at least the given number of bytes is available"""
+        while len(self._buffer) < length:
+            if self._remaining == 0:
+                self._buffer += self._decompressor.flush()
+                if len(self._buffer) < length:
+                    raise StreamError(f"stream read less than specified amount, expected "
+                                      f"{length}, found {len(self._buffer)}")
+                break
+
+            chunk = self.stream.read(min(self.chunk_size, self._remaining))
+            if not chunk:
+                raise StreamError("stream ended before all compressed data was read")
+
+            self._remaining -= len(chunk)
+            self._buffer += self._decompressor.decompress(chunk)
+
+    def _take(self, length: int) -> BytesIOWithOffsets:
+        """Consume the given number of decompressed bytes"""
+        if length < 0:
+            raise StreamError(f"length must be non-negative, found {length}")
+
+        self._fill(length)
+        stream = BytesIOWithOffsets(bytes(self._buffer[:length]), None, self._offset)
+        del self._buffer[:length]
+        self._offset += length
+
+        return stream
+
+    def objects(self) -> Iterator[WmiObject]:
+        """Iterate over the objects inside the BMOF data buffer"""
+        root = BMOF_ROOT_HEADER.parse_stream(self._take(BMOF_ROOT_HEADER.sizeof()))
+
+        for _ in range(root.count):
+            self._fill(4)
+            length = int.from_bytes(self._buffer[:4], "little")
+            if length < 4:
+                raise StreamError(f"invalid object length {length} at offset {self._offset}")
+
+            yield BMOF_WMI_OBJECT.parse_stream(self._take(length))
+
+        if self._offset > root.length:
+            raise StreamError("objects exceed the length of the root structure")
+
+        self._take(root.length - self._offset)
+        trailer = self._take(self._decompressor.length - self._offset)
+        self.flavors = BMOF_TRAILER.parse_stream(trailer)
@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+
+"""Deduplicated JSON representation of BMOF data"""
+
+from __future__ import annotations
+from collections.abc import Hashable
+from typing import Any, Final, Mapping, Optional
+from .bmof import Bmof
+from .flavor import Flavors
+from .wmi_data import WmiData
+from .wmi_method import WmiMethod
+from .wmi_object import WmiClassFlags, WmiInstanceFlags, WmiObject
+from .wmi_property import WmiProperty
+from .wmi_qualifier import WmiQualifier
+from .wmi_type import WmiType
+
+
+type Document = dict[str, Any]
+
+SEPARATORS: Final = (",", ":")
+"""JSON separators used for writing documents without whitespace"""
+
+
+def _name(flags: Optional[Flavors | WmiClassFlags | WmiInstanceFlags]) -> Optional[str]:
+    """Format the name of flags"""
+    if flags is None or flags.name is None:
+        return None
+
+    return flags.name.lower()
+
+
+def _freeze(value: Optional[WmiData]) -> Hashable:
+    """Convert a qualifier value into a hashable key"""
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+
+    # Keep booleans, integers and floats with the same value apart
+    return type(value), value
+
+
+class TableEncoder:
+    """
+    Encoder converting WMI objects into a deduplicated JSON document.
+
+    Each distinct WMI type, qualifier and qualifier set is stored once inside the
+    tables "types", "qualifiers" and "qualifier_sets" of the document. Objects,
+    properties, methods and qualifiers refer to them using their index, with
+    qualifier sets being lists of qualifier indices. Missing qualifier lists are
+    encoded as null. Otherwise the objects match the default JSON output.
+
+    Keyword arguments:
+    flavors -- flavors of the qualifiers indexed by the qualifier offset
+    """
+    def __init__(self, flavors: Optional[Mapping[int, Flavors]] = None) -> None:
+        self.flavors = flavors or {}
+        self.types: list[dict[str, object]] = []
+        self.qualifiers: list[dict[str, object]] = []
+        self.qualifier_sets: list[list[int]] = []
+        self._types: dict[WmiType, int] = {}
+        self._qualifiers: dict[Hashable, int] = {}
+        self._qualifier_sets: dict[tuple[int, ...], int] = {}
+
+    def type(self, data_type: WmiType) -> int:
+        """Retrieve the index of a WMI type"""
+        index = self._types.get(data_type)
+        if index is None:
+            index = len(self.types)
+            self._types[data_type] = index
+            self.types.append({
+                "basic_type": data_type.basic_type.name.lower(),
+                "is_array": data_type.is_array
+            })
+
+        return index
+
+    def qualifier(self, qualifier: WmiQualifier) -> int:
+        """Retrieve the index of a qualifier"""
+        flavor = _name(self.flavors.get(qualifier.offset))
+        data_type = self.type(qualifier.data_type)
+
+        key = (qualifier.name, data_type, _freeze(qualifier.value), flavor)
+        index = self._qualifiers.get(key)
+        if index is None:
+            index = len(self.qualifiers)
+            self._qualifiers[key] = index
+            self.qualifiers.append({
+                "name": qualifier.name,
+                "data_type": data_type,
+                "value": qualifier.value,
+                "flavors": flavor
+            })
+
+        return index
+
+    def qualifier_set(self, qualifiers: Optional[list[WmiQualifier]]) -> Optional[int]:
+        """Retrieve the index of a qualifier set"""
+        if qualifiers is None:
+            return None
+
+        key = tuple(self.qualifier(q) for q in qualifiers)
+        index = self._qualifier_sets.get(key)
+        if index is None:
+            index = len(self.qualifier_sets)
+            self._qualifier_sets[key] = index
+            self.qualifier_sets.append(list(key))
+
+        return index
+
+    def value(self, value: Optional[WmiData]) -> object:
+        """Encode a property value"""
+        if isinstance(value, WmiObject):
+            return self.object(value)
+
+        if isinstance(value, list):
+            return [self.value(v) for v in value]
+
+        return value
+
+    def property(self, prop: WmiProperty) -> dict[str, object]:
+        """Encode a property or parameter"""
+        return {
+            "name": prop.name,
+            "data_type": self.type(prop.data_type),
+            "value": self.value(prop.value),
+            "qualifiers": self.qualifier_set(prop.qualifiers)
+        }
+
+    def method(self, method: WmiMethod) -> dict[str, object]:
+        """Encode a method"""
+        parameters = None
+        if method.parameters is not None:
+            parameters = [self.property(p) for p in method.parameters]
+
+        return {
+            "name": method.name,
+            "parameters": parameters,
+            "qualifiers": self.qualifier_set(method.qualifiers),
+            "return_type": self.type(method.return_type)
+        }
+
+    def object(self, obj: WmiObject) -> dict[str, object]:
+        """Encode an object"""
+        methods = None
+        if obj.methods is not None:
+            methods = [self.method(m) for m in obj.methods]
+
+        return {
+            "name": obj.name,
+            "object_type": obj.object_type.name.lower(),
+            "superclass": obj.superclass,
+            "namespace": obj.namespace,
+            "classflags": _name(obj.classflags),
+            "instanceflags": _name(obj.instanceflags),
+            "qualifiers": self.qualifier_set(obj.qualifiers),
+            "properties": [self.property(p) for p in obj.variables],
+            "methods": methods
+        }
+
+    def encode(self, objects: list[WmiObject]) -> Document:
+        """Encode top-level objects into a document containing the tables"""
+        encoded = [self.object(o) for o in objects]
+
+        return {
+            "types": self.types,
+            "qualifiers": self.qualifiers,
+            "qualifier_sets": self.qualifier_sets,
+            "objects": encoded
+        }
+
+
+def encode_tables(bmof: Bmof) -> Document:
+    """Encode the objects of a BMOF into a deduplicated JSON document"""
+    flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+
+    return TableEncoder(flavors).encode(bmof.root.objects)
+
+
+class TableDecoder:
+    # pylint: disable=too-few-public-methods
+    """
+    Decoder expanding the references of a deduplicated JSON document.
+
+    The expanded objects match the default JSON output. Expanded types and
+    qualifiers are shared between all references to them.
+
+    Keyword arguments:
+    document -- document created by TableEncoder
+    """
+    def __init__(self, document: Document) -> None:
+        self.types: list[dict[str, object]] = document["types"]
+        self.qualifiers = [
+            dict(q, data_type=self.types[q["data_type"]]) for q in document["qualifiers"]
+        ]
+        self.qualifier_sets = [[self.qualifiers[i] for i in s] for s in document["qualifier_sets"]]
+        self.objects: list[dict[str, Any]] = document["objects"]
+
+    def _qualifiers(self, index: Optional[int]) -> Optional[list[dict[str, object]]]:
+        """Expand a qualifier set"""
+        if index is None:
+            return None
+
+        return list(self.qualifier_sets[index])
+
+    def _value(self, value: object) -> object:
+        """Expand a property value"""
+        if isinstance(value, dict):
+            return self._object(value)
+
+        if isinstance(value, list):
+            return [self._value(v) for v in value]
+
+        return value
+
+    def _property(self, prop: dict[str, Any]) -> dict[str, object]:
+        """Expand a property or parameter"""
+        return {
+            "name": prop["name"],
+            "data_type": self.types[prop["data_type"]],
+            "value": self._value(prop["value"]),
+            "qualifiers": self._qualifiers(prop["qualifiers"])
+        }
+
+    def _method(self, method: dict[str, Any]) -> dict[str, object]:
+        """Expand a method"""
+        parameters = method["parameters"]
+        if parameters is not None:
+            parameters = [self._property(p) for p in parameters]
+
+        return {
+            "name": method["name"],
+            "parameters": parameters,
+            "qualifiers": self._qualifiers(method["qualifiers"]),
+            "return_type": self.types[method["return_type"]]
+        }
+
+    def _object(self, obj: dict[str, Any]) -> dict[str, object]:
+        """Expand an object"""
+        methods = obj["methods"]
+        if methods is not None:
+            methods = [self._method(m) for m in methods]
+
+        return dict(
+            obj,
+            qualifiers=self._qualifiers(obj["qualifiers"]),
+            properties=[self._property(p) for p in obj["properties"]],
+            methods=methods
+        )
+
+    def decode(self) -> list[dict[str, object]]:
+        """Expand all top-level objects"""
+        return [self._object(o) for o in self.objects]
+
+
+def expand_tables(document: Document) -> list[dict[str, object]]:
+    """Expand a deduplicated JSON document into the objects of the default JSON output"""
+    return TableDecoder(document).decode()
@@ -0,0 +1,234 @@
+#!/usr/bin/python3
+
+"""Fault-isolating BMOF parser"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from struct import Struct
+from typing import Any, Callable, Final, Optional
+from construct import BytesIOWithOffsets, Construct, ConstructError, Container, StreamError
+from .bmof import Bmof
+from .constructs import BmofString, StringCache
+from .events import ARRAY_HEADER, NULL_REFERENCE, OBJECT_HEADER, PROPERTY_HEADER, \
+    decompress_bmof
+from .flavor import QualifierFlavor
+from .root import BMOF_ROOT_HEADER, Root
+from .stream import BMOF_TRAILER
+from .wmi_data import BmofWmiData
+from .wmi_method import WmiMethod
+from .wmi_object import BMOF_WMI_OBJECT, WmiMethodAdapter, WmiObject, WmiObjectType
+from .wmi_property import BMOF_WMI_PROPERTY, WmiProperty
+from .wmi_qualifier import BMOF_WMI_QUALIFIER, WmiQualifier
+from .wmi_type import WmiType
+
+
+BMOF_WMI_METHOD: Final = WmiMethodAdapter(BMOF_WMI_PROPERTY)
+"""The BMOF method structure, see BMOF_WMI_OBJECT"""
+
+LENGTH: Final = Struct("<I")
+"""Length field at the start of each length-prefixed structure"""
+
+
+@dataclass(frozen=True, slots=True)
+class Diagnostic:
+    """Error encountered while parsing a substructure"""
+
+    offset: int
+
+    structure: str
+
+    error: Exception
+
+    def __str__(self) -> str:
+        """Format the diagnostic"""
+        return f"{self.structure} at offset {self.offset:#x}: {self.error}"
+
+
+class TolerantParser:
+    # pylint: disable=too-few-public-methods
+    """
+    Parser for decompressed BMOF data skipping malformed substructures.
+
+    Each object, property, method and qualifier is parsed separately. When a substructure
+    cannot be parsed, its well-formed qualifiers, properties and methods are still recovered.
+    Otherwise a diagnostic is recorded and parsing resumes after the end of the substructure
+    given by its length field. Only when the length field itself is malformed the remaining
+    entries of the enclosing array are skipped. Construct errors as well as the runtime and
+    value errors raised by the adapters are treated as malformed data.
+
+    Keyword arguments:
+    buffer -- decompressed BMOF data
+    """
+    def __init__(self, buffer: bytes | bytearray) -> None:
+        self.buffer = bytes(buffer)
+        self.diagnostics: list[Diagnostic] = []
+        self._strings: StringCache = {}
+
+    def _record(self, offset: int, structure: str, error: Exception) -> None:
+        """Record a diagnostic"""
+        self.diagnostics.append(Diagnostic(offset=offset, structure=structure, error=error))
+
+    def _unpack(self, struct: Struct, offset: int, end: int) -> tuple[Any, ...]:
+        """Unpack a struct at the given offset without exceeding the given end"""
+        if offset < 0 or offset + struct.size > end:
+            raise StreamError(f"stream read less than specified amount, expected {struct.size} "
+                              f"at offset {offset}")
+
+        return struct.unpack_from(self.buffer, offset)
+
+    def _parse(self, construct: Construct, offset: int, end: int) -> Any:
+        """Parse a construct located between the given offsets"""
+        stream = BytesIOWithOffsets(self.buffer[offset:end], None, offset)
+
+        # Salvaging substructures decodes the strings again
+        return construct.parse_stream(stream, _string_cache=self._strings)
+
+    def _reference(self, heap: int, reference: int, end: int) -> Optional[int]:
+        """Resolve a heap reference, checking that it points inside the enclosing structure"""
+        if reference == NULL_REFERENCE:
+            return None
+
+        if heap + reference >= end:
+            raise StreamError(f"heap reference to offset {heap + reference} exceeds the "
+                              f"structure ending at offset {end}")
+
+        return heap + reference
+
+    def _entries[T](self, position: int, count: int, end: int, construct: Construct,
+                    structure: str, salvage: Optional[Callable[[int, int], T]] = None) -> list[T]:
+        """Parse length-prefixed entries, skipping malformed entries"""
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        items: list[T] = []
+        for _ in range(count):
+            try:
+                (size,) = self._unpack(LENGTH, position, end)
+                if size < LENGTH.size or position + size > end:
+                    raise StreamError(f"invalid length {size}")
+            except StreamError as error:
+                # Without a valid length the start of the next entry is unknown
+                self._record(position, structure, error)
+                break
+
+            try:
+                items.append(self._parse(construct, position, position + size))
+            except (ConstructError, RuntimeError, ValueError) as error:
+                if salvage is None:
+                    self._record(position, structure, error)
+                else:
+                    recorded = len(self.diagnostics)
+                    try:
+                        items.append(salvage(position, position + size))
+                    except (ConstructError, RuntimeError, ValueError):
+                        # Report the entry as a whole instead of its parts
+                        del self.diagnostics[recorded:]
+                        self._record(position, structure, error)
+
+            position += size
+
+        return items
+
+    def _array[T](self, offset: Optional[int], end: int, construct: Construct, structure: str,
+                  salvage: Optional[Callable[[int, int], T]] = None) -> Optional[list[T]]:
+        """Parse a BMOF array, skipping malformed entries"""
+        if offset is None:
+            return None
+
+        length, count = self._unpack(ARRAY_HEADER, offset, end)
+
+        return self._entries(offset + ARRAY_HEADER.size, count, min(end, offset + length),
+                             construct, structure, salvage)
+
+    def _property(self, offset: int, end: int) -> WmiProperty:
+        """Parse a property, skipping malformed qualifiers"""
+        _, data_type, name_offset, value_offset, qualifiers_offset = \
+            self._unpack(PROPERTY_HEADER, offset, end)
+        heap = offset + PROPERTY_HEADER.size
+        wmi_type = WmiType.from_int(data_type)
+
+        name = None
+        name_position = self._reference(heap, name_offset, end)
+        if name_position is not None:
+            name = self._parse(BmofString(), name_position, end)
+
+        value = None
+        value_position = self._reference(heap, value_offset, end)
+        if value_position is not None:
+            value = self._parse(BmofWmiData(lambda _: wmi_type), value_position, end)
+
+        return WmiProperty(
+            data_type=wmi_type,
+            name=name,
+            value=value,
+            qualifiers=self._array(self._reference(heap, qualifiers_offset, end), end,
+                                   BMOF_WMI_QUALIFIER, "qualifier")
+        )
+
+    def _method(self, offset: int, end: int) -> WmiMethod:
+        """Parse a method, skipping malformed qualifiers"""
+        # pylint: disable=protected-access
+        method: WmiMethod = BMOF_WMI_METHOD._decode(self._property(offset, end),
+                                                    Container(_params=Container()), "(method)")
+
+        return method
+
+    def _object(self, offset: int, end: int) -> WmiObject:
+        """Parse an object, skipping malformed qualifiers, properties and methods"""
+        _, qualifiers_offset, properties_offset, methods_offset, object_type = \
+            self._unpack(OBJECT_HEADER, offset, end)
+        heap = offset + OBJECT_HEADER.size
+        wmi_object_type = WmiObjectType(object_type)
+
+        qualifiers: Optional[list[WmiQualifier]] = self._array(
+            self._reference(heap, qualifiers_offset, end), end, BMOF_WMI_QUALIFIER, "qualifier"
+        )
+        properties = self._array(self._reference(heap, properties_offset, end), end,
+                                 BMOF_WMI_PROPERTY, "property", self._property)
+        methods = self._array(self._reference(heap, methods_offset, end), end,
+                              BMOF_WMI_METHOD, "method", self._method)
+
+        return WmiObject(
+            object_type=wmi_object_type,
+            qualifiers=qualifiers,
+            properties=properties,
+            methods=methods
+        )
+
+    def parse(self) -> Bmof:
+        """Parse the BMOF data, returning the objects and flavors which could be parsed"""
+        objects: list[WmiObject] = []
+        flavors: Optional[list[QualifierFlavor]] = None
+        try:
+            root = self._parse(BMOF_ROOT_HEADER, 0, len(self.buffer))
+        except (ConstructError, RuntimeError, ValueError) as error:
+            self._record(0, "root", error)
+            return Bmof(root=Root(objects=objects), flavors=flavors)
+
+        objects = self._entries(BMOF_ROOT_HEADER.sizeof(), root.count,
+                                min(root.length, len(self.buffer)), BMOF_WMI_OBJECT, "object",
+                                self._object)
+
+        try:
+            flavors = self._parse(BMOF_TRAILER, root.length, len(self.buffer))
+        except (ConstructError, RuntimeError, ValueError) as error:
+            self._record(root.length, "flavors", error)
+
+        return Bmof(root=Root(objects=objects), flavors=flavors)
+
+
+def parse_tolerant(data: bytes) -> tuple[Bmof, list[Diagnostic]]:
+    """
+    Parse a BMOF data buffer, skipping malformed substructures.
+
+    Return the BMOF containing all substructures which could be parsed together with
+    a diagnostic for each skipped substructure. Errors during decompression are raised.
+    """
+    parser = TolerantParser(decompress_bmof(data))
+    bmof = parser.parse()
+
+    return bmof, parser.diagnostics
+
+
+def parse_tolerant_file(path: Path) -> tuple[Bmof, list[Diagnostic]]:
+    """Parse a BMOF file, skipping malformed substructures"""
+    return parse_tolerant(path.read_bytes())
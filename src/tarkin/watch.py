@@ -0,0 +1,320 @@
+#!/usr/bin/python3
+
+"""Incremental processing of BMOF directories"""
+
+from __future__ import annotations
+import os
+from ctypes import CDLL, get_errno
+from ctypes.util import find_library
+from dataclasses import dataclass
+from hashlib import sha256
+from json import dumps, loads
+from pathlib import Path
+from select import select
+from struct import Struct
+from time import sleep
+from typing import Callable, Final, Iterator, Optional
+from .bmof import Bmof, BMOF
+
+
+type Sink = Callable[[Path, str, Bmof | Exception], None]
+
+POLL_INTERVAL: Final = 5.0
+"""Default interval between directory scans in seconds"""
+
+COMPACT_THRESHOLD: Final = 64
+"""Number of stale manifest lines tolerated before compacting regardless of its size"""
+
+IN_CLOSE_WRITE: Final = 0x00000008
+IN_MOVED_TO: Final = 0x00000080
+IN_CREATE: Final = 0x00000100
+IN_ISDIR: Final = 0x40000000
+INOTIFY_MASK: Final = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+"""Inotify events causing the watched directories to be scanned again"""
+
+INOTIFY_EVENT: Final = Struct("=iIII")
+"""Header of a inotify event (watch descriptor, mask, cookie, length of the name)"""
+
+
+@dataclass(frozen=True, slots=True)
+class ManifestEntry:
+    """Manifest entry describing an already processed file"""
+
+    path: str
+
+    size: int
+
+    mtime: int
+
+    digest: str
+
+    @classmethod
+    def from_dict(cls, entry: dict[str, object]) -> ManifestEntry:
+        """Parse manifest entry from a dictionary"""
+        return cls(
+            path=str(entry["path"]),
+            size=int(str(entry["size"])),
+            mtime=int(str(entry["mtime"])),
+            digest=str(entry["digest"])
+        )
+
+    def to_dict(self) -> dict[str, object]:
+        """Convert manifest entry into a dictionary"""
+        return {
+            "path": self.path,
+            "size": self.size,
+            "mtime": self.mtime,
+            "digest": self.digest
+        }
+
+
+class Manifest:
+    """
+    Manifest of already processed files.
+
+    The manifest is stored as a NDJSON file with new entries being appended after each
+    processed file, so an interrupted run loses at most the entry of the file being
+    processed. When an entry for a path appears multiple times, the last entry wins.
+    Removed files are recorded using a tombstone entry only containing the path.
+    Superseded entries and tombstones are dropped by rewriting the manifest when
+    loading it and once they outnumber the current entries.
+
+    Keyword arguments:
+    path -- path of the manifest file
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, ManifestEntry] = {}
+        self._lines = 0
+
+        if path.exists():
+            with path.open("r", encoding="utf-8") as fd:
+                for line in fd:
+                    if not line.strip():
+                        continue
+
+                    self._lines += 1
+                    data = loads(line)
+                    if data.get("deleted"):
+                        self.entries.pop(str(data["path"]), None)
+                        continue
+
+                    entry = ManifestEntry.from_dict(data)
+                    self.entries[entry.path] = entry
+
+            if self._lines > len(self.entries):
+                self.compact()
+
+    def is_current(self, path: Path, stat: os.stat_result) -> bool:
+        """Check if a file was not modified since being processed"""
+        entry = self.entries.get(str(path))
+        if entry is None:
+            return False
+
+        return entry.size == stat.st_size and entry.mtime == stat.st_mtime_ns
+
+    def _append(self, data: dict[str, object]) -> None:
+        """Append a line to the manifest, compacting it when mostly containing stale lines"""
+        if self._lines >= 2 * len(self.entries) + COMPACT_THRESHOLD:
+            self.compact()
+            return
+
+        with self.path.open("a", encoding="utf-8") as fd:
+            fd.write(dumps(data) + "\n")
+
+        self._lines += 1
+
+    def record(self, entry: ManifestEntry) -> None:
+        """Record a processed file"""
+        self.entries[entry.path] = entry
+        self._append(entry.to_dict())
+
+    def remove(self, path: str) -> None:
+        """Remove the entry of a file which no longer exists"""
+        if self.entries.pop(path, None) is not None:
+            self._append({"path": path, "deleted": True})
+
+    def compact(self) -> None:
+        """Rewrite the manifest so it only contains the current entries"""
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with temp.open("w", encoding="utf-8") as fd:
+            for entry in self.entries.values():
+                fd.write(dumps(entry.to_dict()) + "\n")
+
+        os.replace(temp, self.path)
+        self._lines = len(self.entries)
+
+
+class Inotify:
+    """
+    Minimal inotify wrapper used for waiting on directory changes.
+
+    Keyword arguments:
+    libc -- C library providing the inotify functions
+    """
+    def __init__(self, libc: CDLL) -> None:
+        self._libc = libc
+        self.fd: int = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    @classmethod
+    def create(cls) -> Optional[Inotify]:
+        """Create a inotify instance if supported by the current platform"""
+        name = find_library("c")
+        if name is None:
+            return None
+
+        try:
+            libc = CDLL(name, use_errno=True)
+            if not hasattr(libc, "inotify_init1"):
+                return None
+
+            return cls(libc)
+        except OSError:
+            return None
+
+    def add_watch(self, path: Path) -> None:
+        """Watch a directory for changes"""
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), INOTIFY_MASK) < 0:
+            errno = get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Wait until at least one event occurred or the timeout expired.
+
+        Return whether a file was completely written or a directory was created.
+        Newly created files are ignored until they are closed to avoid processing
+        partially written files.
+        """
+        readable, _, _ = select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        changed = False
+        while offset < len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size + length
+
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) or mask & IN_CREATE and mask & IN_ISDIR:
+                changed = True
+
+        return changed
+
+    def close(self) -> None:
+        """Close the inotify instance"""
+        os.close(self.fd)
+
+
+def file_digest(path: Path) -> str:
+    """Calculate the SHA-256 digest of a file"""
+    digest = sha256()
+    with path.open("rb") as fd:
+        for chunk in iter(lambda: fd.read(64 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class DirectoryWatcher:
+    """
+    Incremental processor for directories containing BMOF files.
+
+    Each file is only processed when not already recorded inside the manifest or
+    when its size or modification time changed. Files whose content did not change
+    are not processed again.
+
+    Keyword arguments:
+    directory -- directory containing the BMOF files, searched recursively
+    manifest -- manifest of already processed files
+    sink -- callback receiving the path, digest and either the parsed BMOF or the error
+    pattern -- glob pattern selecting the BMOF files
+    """
+    def __init__(self, directory: Path, manifest: Manifest, sink: Sink,
+                 pattern: str = "*") -> None:
+        self.directory = directory
+        self.manifest = manifest
+        self.sink = sink
+        self.pattern = pattern
+
+    def _candidates(self, seen: set[str]) -> Iterator[tuple[Path, os.stat_result]]:
+        """Find all files which are new or were modified, adding all found files to seen"""
+        manifest_path = self.manifest.path.resolve()
+
+        for path in sorted(self.directory.rglob(self.pattern)):
+            if not path.is_file() or path.resolve() == manifest_path:
+                continue
+
+            seen.add(str(path))
+            stat = path.stat()
+            if not self.manifest.is_current(path, stat):
+                yield path, stat
+
+    def _remove_deleted(self, seen: set[str]) -> None:
+        """Remove the manifest entries of files inside the directory which no longer exist"""
+        for name in list(self.manifest.entries):
+            path = Path(name)
+            if name not in seen and path.is_relative_to(self.directory) and not path.is_file():
+                self.manifest.remove(name)
+
+    def scan(self) -> int:
+        """
+        Process all new or modified files and return the number of processed files.
+
+        Manifest entries of deleted files are removed afterwards.
+        """
+        count = 0
+        seen: set[str] = set()
+        for path, stat in self._candidates(seen):
+            digest = file_digest(path)
+            entry = self.manifest.entries.get(str(path))
+
+            if entry is None or entry.digest != digest:
+                result: Bmof | Exception
+                try:
+                    result = BMOF.parse_file(path)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    result = error
+
+                self.sink(path, digest, result)
+                count += 1
+
+            self.manifest.record(
+                ManifestEntry(path=str(path), size=stat.st_size, mtime=stat.st_mtime_ns,
+                              digest=digest)
+            )
+
+        self._remove_deleted(seen)
+
+        return count
+
+    def watch(self, interval: float = POLL_INTERVAL) -> None:
+        """
+        Continuously process new or modified files.
+
+        Inotify is used for waiting on changes when available, otherwise the directory
+        is polled using the given interval.
+        """
+        inotify = Inotify.create()
+        try:
+            while True:
+                if inotify is not None:
+                    inotify.add_watch(self.directory)
+                    for path in self.directory.rglob("*"):
+                        if path.is_dir():
+                            inotify.add_watch(path)
+
+                self.scan()
+
+                if inotify is None:
+                    sleep(interval)
+                else:
+                    while not inotify.wait(None):
+                        pass
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -4,11 +4,13 @@
 
 
 from __future__ import annotations
-from typing import Callable
+from typing import Any, Callable, Final, Optional, Sequence
 from construct import Switch, Mapping, Int8ul, Int8sl, Int16ul, Int16sl, Int32sl, Int32ul, \
-    Int64ul, Int64sl, Float32l, Float64l, Error, CString, Prefixed, Container, IfThenElse, \
+    Int64ul, Int64sl, Float32l, Float64l, Error, Prefixed, Container, IfThenElse, \
     FocusedSeq, Const, Array, Rebuild, LazyBound
 from tarkin import wmi_object
+from .compact import StringTable
+from .constructs import BmofString, SizeCache
 from .wmi_type import WmiDataType, WmiType
 
 
@@ -24,6 +26,111 @@ type WmiData = bool \
     | list[wmi_object.WmiObject]
 
 
+WMI_DATA_SIZES: Final = {
+    WmiDataType.BOOLEAN: 2,
+    WmiDataType.UINT8: 1,
+    WmiDataType.SINT8: 1,
+    WmiDataType.UINT16: 2,
+    WmiDataType.SINT16: 2,
+    WmiDataType.UINT32: 4,
+    WmiDataType.SINT32: 4,
+    WmiDataType.UINT64: 8,
+    WmiDataType.SINT64: 8,
+    WmiDataType.REAL32: 4,
+    WmiDataType.REAL64: 8
+}
+"""Size of fixed-size WMI data items in bytes"""
+
+
+def sizeof_string(value: str) -> int:
+    """Calculate the size of an encoded null-terminated utf-16-le string in bytes"""
+    return len(value.encode("utf_16_le")) + 2
+
+
+def sizeof_wmi_data(value: WmiData, data_type: WmiType,
+                    offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                    sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded WMI data item in bytes.
+
+    When offsets is given, the offsets of all qualifiers inside objects contained
+    in the WMI data item are recorded, see wmi_object.sizeof_wmi_object().
+    When sizes is given, the sizes of objects are cached inside it, see constructs.size_cache().
+    """
+    if not data_type.is_array:
+        return _sizeof_single_data(value, data_type.basic_type, offset, offsets, sizes)
+
+    assert isinstance(value, list)
+    size = 16
+    for item in value:
+        size += _sizeof_single_data(item, data_type.basic_type, offset + size, offsets, sizes)
+
+    return size
+
+
+def _sizeof_single_data(value: object, basic_type: WmiDataType, offset: int,
+                        offsets: Optional[dict[int, int]], sizes: Optional[SizeCache]) -> int:
+    """Calculate the size of an encoded single WMI data item in bytes"""
+    match basic_type:
+        case WmiDataType.STRING:
+            assert isinstance(value, str)
+            return sizeof_string(value)
+        case WmiDataType.OBJECT:
+            assert isinstance(value, wmi_object.WmiObject)
+            return wmi_object.sizeof_wmi_object(value, offset, offsets, sizes)
+        case _:
+            return WMI_DATA_SIZES[basic_type]
+
+
+def pack_wmi_data(value: Optional[WmiData], data_type: WmiType, table: StringTable) -> Any:
+    """Convert a WMI data item for compact pickling, see compact.reduce()"""
+    if value is None:
+        return None
+
+    if data_type.is_array:
+        assert isinstance(value, list)
+        return tuple(_pack_single_data(item, data_type.basic_type, table) for item in value)
+
+    return _pack_single_data(value, data_type.basic_type, table)
+
+
+def _pack_single_data(value: object, basic_type: WmiDataType, table: StringTable) -> Any:
+    """Convert a single WMI data item for compact pickling"""
+    match basic_type:
+        case WmiDataType.STRING:
+            assert isinstance(value, str)
+            return table.add(value)
+        case WmiDataType.OBJECT:
+            assert isinstance(value, wmi_object.WmiObject)
+            return value.pack(table)
+        case _:
+            return value
+
+
+def unpack_wmi_data(state: Any, data_type: WmiType, strings: Sequence[str]) -> Optional[WmiData]:
+    """Restore a WMI data item converted using pack_wmi_data()"""
+    if state is None:
+        return None
+
+    if data_type.is_array:
+        return [_unpack_single_data(item, data_type.basic_type, strings) for item in state]
+
+    result: WmiData = _unpack_single_data(state, data_type.basic_type, strings)
+
+    return result
+
+
+def _unpack_single_data(state: Any, basic_type: WmiDataType, strings: Sequence[str]) -> Any:
+    """Restore a single WMI data item converted using _pack_single_data()"""
+    match basic_type:
+        case WmiDataType.STRING:
+            return strings[state]
+        case WmiDataType.OBJECT:
+            return wmi_object.WmiObject.unpack(strings, state)
+        case _:
+            return state
+
+
 class BmofWmiSingleData(Switch):
     # pylint: disable=abstract-method
     """
@@ -56,7 +163,7 @@ class BmofWmiSingleData(Switch):
                 WmiDataType.SINT64: Int64sl,
                 WmiDataType.REAL32: Float32l,
                 WmiDataType.REAL64: Float64l,
-                WmiDataType.STRING: CString("utf_16_le"),
+                WmiDataType.STRING: BmofString(),
                 # LazyBound is necessary because WMI data items are usually
                 # already contained inside an object.
                 WmiDataType.OBJECT: LazyBound(lambda: wmi_object.BMOF_WMI_OBJECT),
@@ -78,7 +185,7 @@ class BmofWmiData(IfThenElse):
                     "unknown" / Const(0x1, Int32ul),
                     "count" / Rebuild(
                         Int32ul,
-                        lambda context: len(context.items)
+                        lambda context: len(context["items"])
                     ),
                     "items" / Prefixed(
                         Int32ul,
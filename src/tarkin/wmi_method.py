@@ -3,16 +3,51 @@
 """WMI method parser"""
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Iterable
-from .wmi_property import WmiProperty
+from dataclasses import dataclass, field, replace
+from enum import IntFlag, unique, STRICT
+from typing import Any, Final, Optional, Iterable, Sequence, cast
+from .compact import State, StringTable, reduce
+from .wmi_property import WmiProperty, pack_properties, pack_qualifiers, unpack_properties, \
+    unpack_qualifiers
 from .wmi_qualifier import WmiQualifier
 from .wmi_type import WmiType, WmiDataType
 
 
+DATA_ID_QUALIFIERS: Final = ("wmidataid", "id")
+"""
+Qualifiers specifying the position of a parameter inside the method buffers.
+
+The "ID" qualifier assigned by the MOF compiler is used when no "WmiDataId"
+qualifier is present.
+"""
+
+
+@unique
+class ParameterDirection(IntFlag, boundary=STRICT):
+    """Direction of a WMI method parameter"""
+    IN = 1
+    OUT = 2
+
+
+@dataclass(frozen=True, slots=True)
+class ParameterSignature:
+    """Direction and position of a WMI method parameter"""
+
+    name: str
+
+    direction: ParameterDirection
+
+    data_id: Optional[int]
+
+
 @dataclass(frozen=True, slots=True)
 class WmiMethod:
-    """WMI method"""
+    """
+    WMI method.
+
+    The signature contains the parameters ordered by their data ID when known,
+    see MethodBuilder. It is ignored when comparing WMI methods.
+    """
 
     name: str
 
@@ -22,47 +57,184 @@ class WmiMethod:
 
     return_type: WmiType
 
+    signature: Optional[tuple[ParameterSignature, ...]] = field(default=None, compare=False)
+
+    def pack(self, table: StringTable) -> State:
+        """Convert WMI method for compact pickling"""
+        return (
+            table.add(self.name),
+            pack_properties(self.parameters, table),
+            pack_qualifiers(self.qualifiers, table),
+            int(self.return_type),
+            None if self.signature is None else tuple(
+                (table.add(p.name), int(p.direction), p.data_id) for p in self.signature
+            )
+        )
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> WmiMethod:
+        """Restore WMI method converted using pack()"""
+        return cls(
+            name=strings[state[0]],
+            parameters=unpack_properties(strings, state[1]),
+            qualifiers=unpack_qualifiers(strings, state[2]),
+            return_type=WmiType.from_int(state[3]),
+            signature=None if state[4] is None else tuple(
+                ParameterSignature(name=strings[n], direction=ParameterDirection(d), data_id=i)
+                for n, d, i in state[4]
+            )
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle WMI method using a compact representation"""
+        return reduce(self)
+
     @classmethod
     def from_properties(cls, name: str, params: Iterable[WmiProperty],
-                        qualifiers: list[WmiQualifier]):
+                        qualifiers: Optional[list[WmiQualifier]]) -> WmiMethod:
         """
         Create a WMI method from a list of possibly duplicated parameters.
 
-        Each parameter is deduplicated based on its name. Qualifiers of duplicated
-        parameters are added to the qualifiers of the deduplicated parameter.
-        Parameters named "ReturnValue" are treated as describing the return type
-        of the associated WMI method.
+        Each parameter is deduplicated based on its name, see MethodBuilder. The
+        direction of each parameter is taken from its "in" and "out" qualifiers.
+        """
+        builder = MethodBuilder(name, qualifiers)
+        builder.add(params)
+
+        return builder.build()
+
+
+class _MergedParameter:
+    # pylint: disable=too-few-public-methods
+    """Parameter being merged from its occurrences inside the __PARAMETERS objects"""
+    __slots__ = ("param", "qualifiers", "names", "direction")
+
+    def __init__(self, param: WmiProperty) -> None:
+        self.param = param
+        self.qualifiers: Optional[list[WmiQualifier]] = None
+        self.names: set[Optional[str]] = set()
+        self.direction = ParameterDirection(0)
+        if param.qualifiers is not None:
+            self.merge(param.qualifiers)
+
+    def merge(self, qualifiers: list[WmiQualifier]) -> None:
+        """Add the qualifiers not already present"""
+        if self.qualifiers is None:
+            self.qualifiers = []
+
+        for qualifier in qualifiers:
+            if qualifier.name not in self.names:
+                self.names.add(qualifier.name)
+                self.qualifiers.append(qualifier)
+
+    def build(self) -> WmiProperty:
+        """Create the merged parameter"""
+        if self.qualifiers == self.param.qualifiers:
+            return self.param
+
+        return replace(self.param, qualifiers=self.qualifiers)
+
+    def signature(self, name: str, direction: Optional[ParameterDirection]) -> ParameterSignature:
+        """Create the signature of the merged parameter"""
+        values = {(q.name or "").lower(): q.value for q in self.qualifiers or []}
+        if direction is None:
+            direction = ParameterDirection(0)
+            if values.get("in") is True:
+                direction |= ParameterDirection.IN
+            if values.get("out") is True:
+                direction |= ParameterDirection.OUT
+
+        data_id = None
+        for key in DATA_ID_QUALIFIERS:
+            value = values.get(key)
+            if value is not None:
+                # IDs which are not integers do not specify a position
+                if isinstance(value, int) and not isinstance(value, bool):
+                    data_id = value
+
+                break
+
+        return ParameterSignature(name=name, direction=direction, data_id=data_id)
+
+
+class MethodBuilder:
+    """
+    Engine reconstructing a WMI method from the parameters inside its __PARAMETERS objects.
+
+    Parameters are deduplicated based on their name, which is necessary since parameters
+    used for both input and output appear inside both __PARAMETERS objects. Qualifiers of
+    duplicated parameters are added to the qualifiers of the deduplicated parameter unless
+    a qualifier with the same name is already present. Parameters named "ReturnValue" are
+    treated as describing the return type of the method. Each parameter and qualifier is
+    processed once using hashed lookups, so the time needed is linear in the number of
+    parameters and qualifiers apart from ordering the signature.
+
+    Keyword arguments:
+    name -- name of the method
+    qualifiers -- qualifiers of the method
+    """
+    __slots__ = ("name", "qualifiers", "return_type", "_params", "_known")
+
+    def __init__(self, name: str, qualifiers: Optional[list[WmiQualifier]]) -> None:
+        self.name = name
+        self.qualifiers = qualifiers
+        self.return_type = WmiType.from_data_type(WmiDataType.VOID)
+        self._params: dict[Optional[str], _MergedParameter] = {}
+        self._known = True
+
+    def add(self, params: Iterable[WmiProperty],
+            direction: Optional[ParameterDirection] = None) -> None:
+        """
+        Add the parameters of a __PARAMETERS object.
+
+        When the direction of the parameters is unknown, it is taken from the "in" and
+        "out" qualifiers of the parameters when building the method.
         """
-        return_type = WmiType.from_data_type(WmiDataType.VOID)
-        final_params = {}
+        if direction is None:
+            self._known = False
 
         for param in params:
             if param.name == "ReturnValue":
-                return_type = param.data_type
-            elif param.name in final_params:
-                final_param = final_params[param.name]
+                self.return_type = param.data_type
+                continue
 
-                if final_param.data_type != param.data_type:
+            merged = self._params.get(param.name)
+            if merged is None:
+                merged = _MergedParameter(param)
+                self._params[param.name] = merged
+            else:
+                if merged.param.data_type != param.data_type:
                     raise RuntimeError(f"Parameter {param.name} contains different data types")
 
-                if final_param.value != param.value:
+                if merged.param.value != param.value:
                     raise RuntimeError(f"Parameter {param.name} contains different values")
 
-                if param.qualifiers is None:
-                    continue
-
-                if final_param.qualifiers is None:
-                    final_param.qualifiers = []
-
-                for qualifier in param.qualifiers:
-                    if qualifier.name not in map(lambda p: p.name, final_param.qualifiers):
-                        final_param.qualifiers.append(qualifier)
-            else:
-                final_params[param.name] = param
-
-        return cls(
-            name=name,
-            parameters=list(final_params.values()),
-            qualifiers=qualifiers,
-            return_type=return_type
+                if param.qualifiers is not None:
+                    merged.merge(param.qualifiers)
+
+            if direction is not None:
+                merged.direction |= direction
+
+    def origins(self) -> list[WmiProperty]:
+        """Retrieve the first occurrence of each parameter, in the order used by build()"""
+        return [merged.param for merged in self._params.values()]
+
+    def build(self) -> WmiMethod:
+        """Create the WMI method"""
+        signature = [
+            merged.signature(cast(str, name), merged.direction if self._known else None)
+            for name, merged in self._params.items()
+        ]
+
+        # Parameters without an ID keep their order after all parameters having an ID
+        order = sorted(range(len(signature)), key=lambda i: (
+            signature[i].data_id is None, signature[i].data_id or 0, i
+        ))
+
+        return WmiMethod(
+            name=self.name,
+            parameters=[merged.build() for merged in self._params.values()],
+            qualifiers=self.qualifiers,
+            return_type=self.return_type,
+            signature=tuple(signature[i] for i in order)
         )
@@ -5,13 +5,15 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import IntEnum, IntFlag, unique, STRICT
-from itertools import chain
-from typing import Final, Optional, Iterable
+from typing import Any, Final, Optional, Iterable, Sequence
 from construct import Struct, Container, Adapter, Int32ul, Prefixed, Tell
-from .constructs import BmofArray, BmofHeapReference
-from .wmi_type import WmiDataType
-from .wmi_method import WmiMethod
-from .wmi_property import BMOF_WMI_PROPERTY, WmiProperty
+from .compact import State, StringTable, reduce
+from .constructs import BmofArray, BmofHeapReference, SizeCache, SpanAdapter, SpanRecorder, \
+    size_cache
+from .wmi_type import WmiDataType, WmiType
+from .wmi_method import MethodBuilder, WmiMethod
+from .wmi_property import BMOF_WMI_PROPERTY, WmiProperty, sizeof_properties, sizeof_qualifiers, \
+    pack_properties, pack_qualifiers, unpack_properties, unpack_qualifiers
 from .wmi_qualifier import BMOF_WMI_QUALIFIER, WmiQualifier
 
 
@@ -60,6 +62,29 @@ class WmiObject:
             methods=container["heap"]["methods"]
         )
 
+    def pack(self, table: StringTable) -> State:
+        """Convert WMI object for compact pickling"""
+        return (
+            int(self.object_type),
+            pack_qualifiers(self.qualifiers, table),
+            pack_properties(self.properties, table),
+            None if self.methods is None else tuple(m.pack(table) for m in self.methods)
+        )
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> WmiObject:
+        """Restore WMI object converted using pack()"""
+        return cls(
+            object_type=WmiObjectType(state[0]),
+            qualifiers=unpack_qualifiers(strings, state[1]),
+            properties=unpack_properties(strings, state[2]),
+            methods=None if state[3] is None else [WmiMethod.unpack(strings, m) for m in state[3]]
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle WMI object using a compact representation"""
+        return reduce(self)
+
     @property
     def name(self) -> Optional[str]:
         """Retrieve the class name"""
@@ -160,7 +185,7 @@ class WmiObject:
                     yield prop
 
 
-class WmiObjectAdapter(Adapter):
+class WmiObjectAdapter(SpanAdapter):
     # pylint: disable=abstract-method
     """Adapter for converting an container into a WMI object"""
     def _decode(self, obj: Container, context: Container, path: str) -> WmiObject:
@@ -169,7 +194,27 @@ class WmiObjectAdapter(Adapter):
 
     def _encode(self, obj: WmiObject, context: Container, path: str) -> Container:
         """Encode WMI object to container"""
-        raise NotImplementedError("Object encoding is not yet implemented")
+        sizes = size_cache(context)
+        qualifiers_size = 0
+        if obj.qualifiers is not None:
+            qualifiers_size = sizeof_qualifiers(obj.qualifiers, sizes=sizes)
+
+        properties_size = 0
+        if obj.properties is not None:
+            properties_size = sizeof_properties(obj.properties, sizes=sizes)
+
+        return Container(
+            qualifiers_offset=0xFFFFFFFF if obj.qualifiers is None else 0,
+            properties_offset=0xFFFFFFFF if obj.properties is None else qualifiers_size,
+            methods_offset=0xFFFFFFFF if obj.methods is None
+            else qualifiers_size + properties_size,
+            object_type=int(obj.object_type),
+            heap=Container(
+                qualifiers=obj.qualifiers,
+                properties=obj.properties,
+                methods=obj.methods
+            )
+        )
 
 
 class WmiMethodAdapter(Adapter):
@@ -183,11 +228,13 @@ class WmiMethodAdapter(Adapter):
     parameters are instead encoded inside a WMI property having the void
     data type.
     """
-    def _decode(self, obj: WmiProperty, context: Container, path: str) -> WmiMethod:
-        """Decode container to WMI object"""
+    @staticmethod
+    def _builder(obj: WmiProperty) -> MethodBuilder:
+        """Collect the parameters of a WMI method"""
+        builder = MethodBuilder(obj.name, obj.qualifiers)
         if obj.data_type == WmiDataType.VOID:
             # void method with no arguments
-            return WmiMethod.from_properties(obj.name, [], obj.qualifiers)
+            return builder
 
         if obj.data_type.basic_type != WmiDataType.OBJECT:
             raise RuntimeError("Method property does not contain objects")
@@ -195,6 +242,8 @@ class WmiMethodAdapter(Adapter):
         if not obj.data_type.is_array:
             raise RuntimeError("Method property is not an array")
 
+        # The method property can contain up to two objects for input and output parameters.
+        # Their order is not guaranteed, so the qualifiers specify the direction.
         for param_obj in obj.value:
             if param_obj.object_type != WmiObjectType.INSTANCE:
                 raise RuntimeError("Parameter object is not an instance")
@@ -210,14 +259,126 @@ class WmiMethodAdapter(Adapter):
                 if len(param_obj.methods) != 0:
                     raise RuntimeError("Parameter object contains methods")
 
-        # The method property can contain up to two objects for input and output parameters
-        params = chain.from_iterable(map(lambda o: o.variables, obj.value))
+            builder.add(param_obj.variables)
+
+        return builder
+
+    def _decode(self, obj: WmiProperty, context: Container, path: str) -> WmiMethod:
+        """Decode container to WMI object"""
+        builder = self._builder(obj)
+        method = builder.build()
 
-        return WmiMethod.from_properties(obj.name, params, obj.qualifiers)
+        recorder: Optional[SpanRecorder] = context["_params"].get("_span_recorder")
+        if recorder is not None:
+            # The method and its parameters are located at the properties they were built from
+            recorder.alias(method, obj)
+            for param, origin in zip(method.parameters or [], builder.origins()):
+                recorder.alias(param, origin)
 
-    def _encode(self, obj: WmiMethod, context: Container, path: str) -> Container:
+        return method
+
+    def _encode(self, obj: WmiMethod, context: Container, path: str) -> WmiProperty:
         """Encode WMI method to a WMI property"""
-        raise NotImplementedError("Method encoding is not yet implemented")
+        return method_property(obj)
+
+
+def parameters_object(params: list[WmiProperty]) -> WmiObject:
+    """Create a "__PARAMETERS" object holding the given WMI method parameters"""
+    return WmiObject(
+        object_type=WmiObjectType.INSTANCE,
+        qualifiers=None,
+        properties=params + [
+            WmiProperty(
+                data_type=WmiType.from_data_type(WmiDataType.STRING),
+                name="__CLASS",
+                value="__PARAMETERS",
+                qualifiers=None
+            )
+        ],
+        methods=[]
+    )
+
+
+def method_property(method: WmiMethod) -> WmiProperty:
+    """
+    Encode a WMI method as a WMI property.
+
+    Parameters with an "out" qualifier are placed inside the object holding the
+    output parameters, while all other parameters and parameters also having an "in"
+    qualifier are placed inside the object holding the input parameters. The return type
+    is encoded as an additional output parameter named "ReturnValue".
+    """
+    if not method.parameters and method.return_type == WmiDataType.VOID:
+        return WmiProperty(
+            data_type=WmiType.from_data_type(WmiDataType.VOID),
+            name=method.name,
+            value=None,
+            qualifiers=method.qualifiers
+        )
+
+    inputs = []
+    outputs = []
+    for param in method.parameters or []:
+        names = {q.name.lower() for q in param.qualifiers or [] if q.name is not None}
+        if "out" in names:
+            outputs.append(param)
+
+        if "in" in names or "out" not in names:
+            inputs.append(param)
+
+    if method.return_type != WmiDataType.VOID:
+        outputs.append(
+            WmiProperty(
+                data_type=method.return_type,
+                name="ReturnValue",
+                value=None,
+                qualifiers=None
+            )
+        )
+
+    return WmiProperty(
+        data_type=WmiType(basic_type=WmiDataType.OBJECT, is_array=True),
+        name=method.name,
+        value=[parameters_object(params) for params in (inputs, outputs) if params],
+        qualifiers=method.qualifiers
+    )
+
+
+def sizeof_wmi_object(obj: WmiObject,
+                      offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                      sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded WMI object in bytes.
+
+    When offsets is given, the offsets of all qualifiers inside the object are recorded
+    by mapping the current offset of each qualifier to its offset inside the encoded data,
+    assuming that the object is encoded at the given offset. This is used to keep the
+    flavors section consistent when encoding BMOF data.
+    When sizes is given and offsets is not, the sizes of the object and all objects
+    contained in it are cached inside it, see constructs.size_cache().
+    """
+    if offsets is not None:
+        sizes = None
+    elif sizes is not None:
+        cached = sizes.get(id(obj))
+        if cached is not None:
+            return cached[1]
+
+    size = 20
+    if obj.qualifiers is not None:
+        size += sizeof_qualifiers(obj.qualifiers, offset + size, offsets, sizes)
+
+    if obj.properties is not None:
+        size += sizeof_properties(obj.properties, offset + size, offsets, sizes)
+
+    if obj.methods is not None:
+        size += sizeof_properties([method_property(m) for m in obj.methods],
+                                  offset + size, offsets, sizes)
+
+    if sizes is not None:
+        sizes[id(obj)] = (obj, size)
+
+    return size
 
 
 BMOF_WMI_OBJECT: Final = WmiObjectAdapter(
@@ -4,11 +4,14 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Final, Optional
-from construct import Struct, Container, Adapter, Prefixed, Int32ul, Tell, CString
-from .constructs import BmofArray, BmofHeapReference
-from .wmi_data import BmofWmiData, WmiData
-from .wmi_qualifier import BMOF_WMI_QUALIFIER, WmiQualifier
+from typing import Any, Final, Optional, Sequence
+from construct import Struct, Container, Prefixed, Int32ul, Tell
+from .compact import State, StringTable, lookup, reduce
+from .constructs import BmofArray, BmofHeapReference, BmofString, SizeCache, SpanAdapter, \
+    ValueSpan, size_cache
+from .wmi_data import BmofWmiData, WmiData, sizeof_string, sizeof_wmi_data, pack_wmi_data, \
+    unpack_wmi_data
+from .wmi_qualifier import BMOF_WMI_QUALIFIER, WmiQualifier, sizeof_wmi_qualifier
 from .wmi_type import BMOF_WMI_TYPE, WmiType
 
 
@@ -34,8 +37,33 @@ class WmiProperty:
             qualifiers=container["heap"]["qualifiers"]
         )
 
+    def pack(self, table: StringTable) -> State:
+        """Convert WMI property for compact pickling"""
+        return (
+            int(self.data_type),
+            table.add(self.name),
+            pack_wmi_data(self.value, self.data_type, table),
+            pack_qualifiers(self.qualifiers, table)
+        )
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> WmiProperty:
+        """Restore WMI property converted using pack()"""
+        data_type = WmiType.from_int(state[0])
 
-class WmiPropertyAdapter(Adapter):
+        return cls(
+            data_type=data_type,
+            name=lookup(strings, state[1]),
+            value=unpack_wmi_data(state[2], data_type, strings),
+            qualifiers=unpack_qualifiers(strings, state[3])
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle WMI property using a compact representation"""
+        return reduce(self)
+
+
+class WmiPropertyAdapter(SpanAdapter):
     # pylint: disable=abstract-method
     """Adapter for converting an container into a WMI property"""
     def _decode(self, obj: Container, context: Container, path: str) -> WmiProperty:
@@ -44,7 +72,115 @@ class WmiPropertyAdapter(Adapter):
 
     def _encode(self, obj: WmiProperty, context: Container, path: str) -> Container:
         """Encode WMI property to container"""
-        raise NotImplementedError("Property encoding is not yet implemented")
+        name_size = 0 if obj.name is None else sizeof_string(obj.name)
+        value_size = 0
+        if obj.value is not None:
+            value_size = sizeof_wmi_data(obj.value, obj.data_type, sizes=size_cache(context))
+
+        return Container(
+            data_type=obj.data_type,
+            name_offset=0xFFFFFFFF if obj.name is None else 0,
+            value_offset=0xFFFFFFFF if obj.value is None else name_size,
+            qualifiers_offset=0xFFFFFFFF if obj.qualifiers is None else name_size + value_size,
+            heap=Container(
+                name=obj.name,
+                value=obj.value,
+                qualifiers=obj.qualifiers
+            )
+        )
+
+
+def pack_qualifiers(qualifiers: Optional[list[WmiQualifier]],
+                    table: StringTable) -> Optional[State]:
+    """Convert a list of WMI qualifiers for compact pickling"""
+    if qualifiers is None:
+        return None
+
+    return tuple(qualifier.pack(table) for qualifier in qualifiers)
+
+
+def unpack_qualifiers(strings: Sequence[str],
+                      state: Optional[State]) -> Optional[list[WmiQualifier]]:
+    """Restore a list of WMI qualifiers converted using pack_qualifiers()"""
+    if state is None:
+        return None
+
+    return [WmiQualifier.unpack(strings, qualifier) for qualifier in state]
+
+
+def pack_properties(properties: Optional[list[WmiProperty]],
+                    table: StringTable) -> Optional[State]:
+    """Convert a list of WMI properties for compact pickling"""
+    if properties is None:
+        return None
+
+    return tuple(prop.pack(table) for prop in properties)
+
+
+def unpack_properties(strings: Sequence[str],
+                      state: Optional[State]) -> Optional[list[WmiProperty]]:
+    """Restore a list of WMI properties converted using pack_properties()"""
+    if state is None:
+        return None
+
+    return [WmiProperty.unpack(strings, prop) for prop in state]
+
+
+def sizeof_qualifiers(qualifiers: list[WmiQualifier],
+                      offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                      sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded BMOF array containing WMI qualifiers in bytes.
+
+    When offsets is given, the offsets of all qualifiers are recorded, see
+    wmi_object.sizeof_wmi_object(). When sizes is given, the sizes of objects
+    are cached inside it, see constructs.size_cache().
+    """
+    size = 8
+    for qualifier in qualifiers:
+        size += sizeof_wmi_qualifier(qualifier, offset + size, offsets, sizes)
+
+    return size
+
+
+def sizeof_properties(properties: list[WmiProperty],
+                      offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                      sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded BMOF array containing WMI properties in bytes.
+
+    When offsets is given, the offsets of all qualifiers inside the properties are recorded,
+    see wmi_object.sizeof_wmi_object(). When sizes is given, the sizes of objects are
+    cached inside it, see constructs.size_cache().
+    """
+    size = 8
+    for prop in properties:
+        size += sizeof_wmi_property(prop, offset + size, offsets, sizes)
+
+    return size
+
+
+def sizeof_wmi_property(prop: WmiProperty,
+                        offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                        sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded WMI property in bytes.
+
+    When offsets is given, the offsets of all qualifiers inside the property are recorded,
+    see wmi_object.sizeof_wmi_object(). When sizes is given, the sizes of objects are
+    cached inside it, see constructs.size_cache().
+    """
+    size = 20
+    if prop.name is not None:
+        size += sizeof_string(prop.name)
+
+    if prop.value is not None:
+        size += sizeof_wmi_data(prop.value, prop.data_type, offset + size, offsets, sizes)
+
+    if prop.qualifiers is not None:
+        size += sizeof_qualifiers(prop.qualifiers, offset + size, offsets, sizes)
+
+    return size
 
 
 BMOF_WMI_PROPERTY: Final = WmiPropertyAdapter(
@@ -59,12 +195,14 @@ BMOF_WMI_PROPERTY: Final = WmiPropertyAdapter(
                 "offset" / Tell,
                 "name" / BmofHeapReference(
                     lambda context: min(context._.name_offset + context.offset, 0xFFFFFFFF),
-                    CString("utf_16_le")
+                    BmofString()
                 ),
                 "value" / BmofHeapReference(
                     lambda context: min(context._.value_offset + context.offset, 0xFFFFFFFF),
-                    BmofWmiData(
-                        lambda context: context._.data_type
+                    ValueSpan(
+                        BmofWmiData(
+                            lambda context: context._.data_type
+                        )
                     )
                 ),
                 "qualifiers" / BmofHeapReference(
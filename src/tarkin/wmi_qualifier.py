@@ -4,10 +4,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Final, Optional
-from construct import Struct, Container, Adapter, Int32ul, Tell, Prefixed, CString
-from .constructs import BmofHeapReference
-from .wmi_data import BmofWmiData, WmiData
+from typing import Any, Final, Optional, Sequence
+from construct import Struct, Container, Int32ul, Tell, Prefixed
+from .compact import State, StringTable, lookup, reduce
+from .constructs import BmofHeapReference, BmofString, SizeCache, SpanAdapter, ValueSpan
+from .wmi_data import BmofWmiData, WmiData, sizeof_string, sizeof_wmi_data, pack_wmi_data, \
+    unpack_wmi_data
 from .wmi_type import BMOF_WMI_TYPE, WmiType
 
 
@@ -33,8 +35,33 @@ class WmiQualifier:
             offset=int(container["offset"])
         )
 
+    def pack(self, table: StringTable) -> State:
+        """Convert WMI qualifier for compact pickling"""
+        return (
+            int(self.data_type),
+            table.add(self.name),
+            pack_wmi_data(self.value, self.data_type, table),
+            self.offset
+        )
+
+    @classmethod
+    def unpack(cls, strings: Sequence[str], state: State) -> WmiQualifier:
+        """Restore WMI qualifier converted using pack()"""
+        data_type = WmiType.from_int(state[0])
+
+        return cls(
+            data_type=data_type,
+            name=lookup(strings, state[1]),
+            value=unpack_wmi_data(state[2], data_type, strings),
+            offset=state[3]
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle WMI qualifier using a compact representation"""
+        return reduce(self)
+
 
-class WmiQualifierAdapter(Adapter):
+class WmiQualifierAdapter(SpanAdapter):
     # pylint: disable=abstract-method
     """Adapter for converting an container into a WMI qualifier"""
     def _decode(self, obj: Container, context: Container, path: str) -> WmiQualifier:
@@ -43,7 +70,44 @@ class WmiQualifierAdapter(Adapter):
 
     def _encode(self, obj: WmiQualifier, context: Container, path: str) -> Container:
         """Encode WMI qualifier to container"""
-        raise NotImplementedError("Qualifier encoding is not yet implemented")
+        name_size = 0 if obj.name is None else sizeof_string(obj.name)
+
+        return Container(
+            qualifier=Container(
+                data_type=obj.data_type,
+                name_offset=0xFFFFFFFF if obj.name is None else 0,
+                value_offset=0xFFFFFFFF if obj.value is None else name_size,
+                heap=Container(
+                    name=obj.name,
+                    value=obj.value
+                )
+            )
+        )
+
+
+def sizeof_wmi_qualifier(qualifier: WmiQualifier,
+                         offset: int = 0, offsets: Optional[dict[int, int]] = None,
+                         sizes: Optional[SizeCache] = None) -> int:
+    """
+    Calculate the size of an encoded WMI qualifier in bytes.
+
+    When offsets is given, the offset of the qualifier is recorded, see
+    wmi_object.sizeof_wmi_object(). Qualifiers encoded multiple times keep the
+    offset of their first occurrence. When sizes is given, the sizes of objects
+    are cached inside it, see constructs.size_cache().
+    """
+    if offsets is not None:
+        offsets.setdefault(qualifier.offset, offset)
+
+    size = 16
+    if qualifier.name is not None:
+        size += sizeof_string(qualifier.name)
+
+    if qualifier.value is not None:
+        size += sizeof_wmi_data(qualifier.value, qualifier.data_type, offset + size, offsets,
+                                sizes)
+
+    return size
 
 
 BMOF_WMI_QUALIFIER: Final = WmiQualifierAdapter(
@@ -59,12 +123,14 @@ BMOF_WMI_QUALIFIER: Final = WmiQualifierAdapter(
                     "offset" / Tell,
                     "name" / BmofHeapReference(
                         lambda context: min(context._.name_offset + context.offset, 0xFFFFFFFF),
-                        CString("utf_16_le")
+                        BmofString()
                     ),
                     "value" / BmofHeapReference(
                         lambda context: min(context._.value_offset + context.offset, 0xFFFFFFFF),
-                        BmofWmiData(
-                            lambda context: context._.data_type
+                        ValueSpan(
+                            BmofWmiData(
+                                lambda context: context._.data_type
+                            )
                         )
                     )
                 )
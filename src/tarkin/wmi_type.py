@@ -5,7 +5,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import IntEnum, unique, STRICT
-from typing import Final
+from typing import Any, Final, Optional
 from construct import Adapter, Container, Int32ul
 
 
@@ -84,13 +84,31 @@ class WmiType:
         """Hash WMI type"""
         return int(self)
 
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle WMI type as an integer"""
+        return WmiType.from_int, (int(self),)
+
 
 class WmiTypeAdapter(Adapter):
     # pylint: disable=abstract-method
-    """Adapter for converting an integer into an WMI type"""
+    """
+    Adapter for converting an integer into an WMI type.
+
+    A dictionary shared between multiple parsing processes can be passed using the
+    "_type_cache" context parameter, so each WMI type is only created once.
+    """
     def _decode(self, obj: int, context: Container, path: str) -> WmiType:
         """Decode integer to Wmi type"""
-        return WmiType.from_int(obj)
+        cache: Optional[dict[int, WmiType]] = context["_params"].get("_type_cache")
+        if cache is None:
+            return WmiType.from_int(obj)
+
+        wmi_type = cache.get(obj)
+        if wmi_type is None:
+            wmi_type = WmiType.from_int(obj)
+            cache[obj] = wmi_type
+
+        return wmi_type
 
     def _encode(self, obj: WmiType, context: Container, path: str) -> int:
         """Encode Wmi type to integer"""
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+
+"""Helpers shared between the tests"""
+
+from struct import pack
+from tarkin.flavor import QualifierFlavor
+from tarkin.wmi_object import WmiObject, WmiObjectType
+from tarkin.wmi_type import WmiDataType
+
+
+def object_data(properties_offset: int, methods_offset: int) -> bytes:
+    """Create the binary representation of a class containing a single void property"""
+    name = "Test\0".encode("utf_16_le")
+    prop = pack("<IIIII", 20 + len(name), WmiDataType.VOID, 0, 0xFFFFFFFF, 0xFFFFFFFF) + name
+    heap = pack("<II", 8 + len(prop), 1) + prop
+
+    return pack("<IIIII", 20 + len(heap), 0xFFFFFFFF, properties_offset, methods_offset,
+                WmiObjectType.CLASS) + heap
+
+
+def root_data(objects: list[bytes]) -> bytes:
+    """Create the decompressed BMOF data containing the given binary objects"""
+    data = b"".join(objects)
+
+    return b"FOMB" + pack("<IIII", 20 + len(data), 1, 1, len(objects)) + data
+
+
+def collect_flavors(objects: list[WmiObject], flavors: list[QualifierFlavor]) -> list[tuple]:
+    """Collect the flavors of all qualifiers with their names in encoding order"""
+    mapping = {f.offset: f.flavors for f in flavors}
+    result = []
+
+    def visit(obj: WmiObject) -> None:
+        for qualifier in obj.qualifiers or []:
+            result.append((qualifier.name, mapping.get(qualifier.offset)))
+
+        for prop in obj.properties or []:
+            for qualifier in prop.qualifiers or []:
+                result.append((qualifier.name, mapping.get(qualifier.offset)))
+
+            values = prop.value if isinstance(prop.value, list) else [prop.value]
+            for value in values:
+                if isinstance(value, WmiObject):
+                    visit(value)
+
+        for method in obj.methods or []:
+            for qualifier in method.qualifiers or []:
+                result.append((qualifier.name, mapping.get(qualifier.offset)))
+
+            for param in method.parameters or []:
+                for qualifier in param.qualifiers or []:
+                    result.append((qualifier.name, mapping.get(qualifier.offset)))
+
+    for obj in objects:
+        visit(obj)
+
+    return result
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+"""Tests for the asyncio interface"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import aclosing
+from pathlib import Path
+from threading import Lock, enumerate as enumerate_threads
+from typing import Any, Callable, Final
+from unittest import IsolatedAsyncioTestCase
+from tarkin.aio import create_executor, iter_objects, load, load_many
+from tarkin.bmof import Bmof, BMOF
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool recording the maximum number of concurrently submitted jobs"""
+
+    def __init__(self) -> None:
+        super().__init__(4)
+        self.lock = Lock()
+        self.active = 0
+        self.maximum = 0
+
+    def _done(self, _: Future[Any]) -> None:
+        with self.lock:
+            self.active -= 1
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        with self.lock:
+            self.active += 1
+            self.maximum = max(self.maximum, self.active)
+
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(self._done)
+
+        return future
+
+
+class AioTest(IsolatedAsyncioTestCase):
+    """Tests for the asyncio interface"""
+
+    def setUp(self) -> None:
+        """Collect the BMOF files"""
+        self.paths = sorted(MOF_PATH.glob("*.bmf"))
+
+    async def test_load(self) -> None:
+        """Test loading a single file"""
+        path = MOF_PATH / "wmi_class.bmf"
+        self.assertEqual(await load(path), BMOF.parse_file(path))
+
+    async def test_load_many(self) -> None:
+        """Test loading multiple files using threads and processes"""
+        expected = {path: BMOF.parse_file(path) for path in self.paths}
+
+        for kind in ("thread", "process"):
+            with self.subTest(kind=kind):
+                results = {}
+                async for path, result in load_many(self.paths, kind=kind, limit=2):
+                    results[path] = result
+
+                self.assertEqual(results, expected)
+
+    async def test_bounded(self) -> None:
+        """Test that the number of concurrently parsed files is bounded"""
+        with CountingExecutor() as executor:
+            count = 0
+            async for _ in load_many(self.paths * 4, executor, limit=3):
+                count += 1
+
+            self.assertEqual(count, len(self.paths) * 4)
+            self.assertLessEqual(executor.maximum, 3)
+
+    async def test_errors(self) -> None:
+        """Test that errors are either raised or returned"""
+        paths = [MOF_PATH / "wmi_class.bmf", MOF_PATH / "wmi_class.mof"]
+
+        results = {}
+        async for path, result in load_many(paths, return_exceptions=True):
+            results[path] = result
+
+        self.assertIsInstance(results[paths[0]], Bmof)
+        self.assertIsInstance(results[paths[1]], Exception)
+
+        with self.assertRaises(Exception):
+            async for _ in load_many(paths, limit=1):
+                pass
+
+    async def test_iter_objects(self) -> None:
+        """Test iterating over the objects of multiple files"""
+        path = MOF_PATH / "wmi_class_with_object.bmf"
+        objects = [obj async for _, obj in iter_objects([path])]
+
+        self.assertEqual(objects, BMOF.parse_file(path).root.objects)
+
+    async def test_cancel(self) -> None:
+        """Test that closing or cancelling the generator cancels the pending loads"""
+        with create_executor("thread", 2) as executor:
+            async with aclosing(load_many(self.paths * 4, executor, limit=2)) as results:
+                async for _ in results:
+                    break
+
+            consumer = asyncio.create_task(self._consume(executor))
+            await asyncio.sleep(0)
+            consumer.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await consumer
+
+            self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+    async def _consume(self, executor: ThreadPoolExecutor) -> None:
+        """Consume all results"""
+        async with aclosing(load_many(self.paths * 4, executor, limit=2)) as results:
+            async for _ in results:
+                await asyncio.sleep(1)
+
+    async def test_shutdown(self) -> None:
+        """Test that owned executors are shut down after the started loads finished"""
+        async with aclosing(load_many(self.paths * 4, limit=4, workers=2)) as results:
+            async for _ in results:
+                break
+
+        self.assertFalse([t for t in enumerate_threads() if t.name.startswith("tarkin")])
+
+        with self.assertRaises(ValueError):
+            async for _ in load_many(self.paths, workers=0):
+                pass
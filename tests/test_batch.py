@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+"""Stress tests for parsing from multiple threads"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Barrier
+from typing import Final
+from unittest import TestCase
+from unittest.mock import patch
+from tarkin.bmof import Bmof, BMOF
+from tarkin.batch import parse_files
+from tarkin.codec import compile_object
+from tarkin.inheritance import InheritanceResolver, ResolvedObject
+from tarkin.wmi_object import WmiObjectType
+
+MOF_PATH: Final = Path("tests/mof")
+
+THREADS: Final = 8
+
+ROUNDS: Final = 4
+
+
+class BatchTest(TestCase):
+    """Stress tests for parsing from multiple threads"""
+
+    def setUp(self) -> None:
+        """Parse all BMOF files serially"""
+        self.paths = sorted(MOF_PATH.glob("*.bmf"))
+        self.expected = {path: BMOF.parse_file(path) for path in self.paths}
+
+    def test_parse_files(self) -> None:
+        """Test that parsing using a thread pool returns the results in order"""
+        paths = self.paths * ROUNDS + [MOF_PATH / "wmi_class.mof"]
+        results = list(parse_files(paths, THREADS))
+
+        self.assertEqual([path for path, _ in results], paths)
+        for path, result in results[:-1]:
+            self.assertEqual(result, self.expected[path])
+
+        self.assertIsInstance(results[-1][1], Exception)
+
+    def test_concurrent_parse(self) -> None:
+        """Test that concurrently parsing the same data returns identical results"""
+        barrier = Barrier(THREADS)
+        data = {path: path.read_bytes() for path in self.paths}
+
+        def work(_: int) -> dict[Path, Bmof]:
+            barrier.wait()
+            results = {}
+            for _ in range(ROUNDS):
+                for path, buffer in data.items():
+                    results[path] = BMOF.parse(buffer)
+
+            return results
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            for results in executor.map(work, range(THREADS)):
+                self.assertEqual(results, self.expected)
+
+    def test_pure_decompression(self) -> None:
+        """Test parsing without the doublespace extension as used on free-threaded interpreters"""
+        with patch("tarkin.ds.DS_EXTENSION", None):
+            for path, result in parse_files(self.paths, THREADS):
+                self.assertEqual(result, self.expected[path])
+
+    def test_concurrent_caches(self) -> None:
+        """Test that the shared caches return consistent results"""
+        objects = [obj for bmof in self.expected.values() for obj in bmof.root.objects]
+        names = sorted({obj.name for obj in objects
+                        if obj.name is not None and obj.object_type == WmiObjectType.CLASS})
+        resolver = InheritanceResolver(objects)
+        barrier = Barrier(THREADS)
+
+        def work(_: int) -> tuple[list[object], list[ResolvedObject]]:
+            barrier.wait()
+            results = [(compile_object(obj).size, resolver.resolve(obj)) for obj in objects]
+            return results, [resolver.resolve_class(name) for name in names]
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            results = list(executor.map(work, range(THREADS)))
+
+        for result, classes in results[1:]:
+            self.assertEqual(result, results[0][0])
+            for resolved, first in zip(classes, results[0][1]):
+                self.assertIs(resolved, first)
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+
+"""Tests for BMOF encoding"""
+
+from dataclasses import fields, is_dataclass, replace
+from pathlib import Path
+from typing import Any, Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.wmi_qualifier import WmiQualifier
+from .helpers import collect_flavors
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+def normalize(value: Any) -> Any:
+    """Replace the offsets of all qualifiers inside a tree of WMI objects"""
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+
+    if isinstance(value, WmiQualifier):
+        return replace(value, offset=0)
+
+    if is_dataclass(value) and not isinstance(value, type):
+        return replace(value, **{f.name: normalize(getattr(value, f.name)) for f in fields(value)})
+
+    return value
+
+
+class BmofTest(TestCase):
+    """Tests for BMOF encoding"""
+
+    def test_round_trip(self) -> None:
+        """Test if encoded BMOF data decodes to the same objects"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                result = BMOF.parse(BMOF.build(bmof))
+
+                self.assertEqual(
+                    collect_flavors(result.root.objects, result.flavors or []),
+                    collect_flavors(bmof.root.objects, bmof.flavors or [])
+                )
+                # Qualifier offsets change when encoding
+                self.assertEqual(normalize(result.root.objects), normalize(bmof.root.objects))
+                self.assertEqual(BMOF.parse(BMOF.build(result)), result)
+
+    def test_flavors_optional(self) -> None:
+        """Test if BMOF data without a flavors section is encoded without one"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                if bmof.flavors is None:
+                    self.assertIsNone(BMOF.parse(BMOF.build(bmof)).flavors)
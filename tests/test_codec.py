@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+"""Tests for the WMI buffer codecs"""
+
+from struct import pack
+from typing import Final
+from unittest import TestCase
+from tarkin.codec import CodecField, compile_fields, compile_method, compile_object
+from tarkin.wmi_object import WmiObject, WmiObjectType, WmiMethod
+from tarkin.wmi_property import WmiProperty
+from tarkin.wmi_qualifier import WmiQualifier
+from tarkin.wmi_type import WmiType, WmiDataType
+
+UINT8: Final = WmiType.from_data_type(WmiDataType.UINT8)
+UINT32: Final = WmiType.from_data_type(WmiDataType.UINT32)
+STRING: Final = WmiType.from_data_type(WmiDataType.STRING)
+UINT16_ARRAY: Final = WmiType(basic_type=WmiDataType.UINT16, is_array=True)
+
+
+def qualifier(name: str, value: object) -> WmiQualifier:
+    """Create a qualifier"""
+    return WmiQualifier(name=name, data_type=UINT32, value=value, offset=0)
+
+
+def prop(name: str, data_type: WmiType, *qualifiers: WmiQualifier) -> WmiProperty:
+    """Create a property"""
+    return WmiProperty(data_type=data_type, name=name, value=None, qualifiers=list(qualifiers))
+
+
+class CodecTest(TestCase):
+    """Tests for the WMI buffer codecs"""
+
+    def test_data_block(self) -> None:
+        """Test if data block fields are ordered by their WmiDataId and aligned"""
+        obj = WmiObject(
+            object_type=WmiObjectType.CLASS,
+            qualifiers=None,
+            properties=[
+                prop("InstanceName", STRING),
+                prop("Value", UINT32, qualifier("WmiDataId", 2)),
+                prop("Flag", UINT8, qualifier("WmiDataId", 1)),
+                prop("Data", UINT16_ARRAY, qualifier("WmiDataId", 3), qualifier("max", 2))
+            ],
+            methods=None
+        )
+        codec = compile_object(obj)
+        data = pack("<B3xIHH", 1, 0xdeadbeef, 2, 3)
+        values = {"Flag": 1, "Value": 0xdeadbeef, "Data": [2, 3]}
+
+        self.assertEqual([f.name for f in codec.fields], ["Flag", "Value", "Data"])
+        self.assertEqual(codec.size, len(data))
+        self.assertEqual(codec.decode(data), values)
+        self.assertEqual(codec.encode(values), data)
+        self.assertIs(compile_object(obj), codec)
+        self.assertEqual(codec.skipped, ())
+
+    def test_skipped(self) -> None:
+        """Test if properties without a WmiDataId are reported"""
+        obj = WmiObject(
+            object_type=WmiObjectType.CLASS,
+            qualifiers=None,
+            properties=[
+                prop("InstanceName", STRING),
+                prop("Value", UINT32, qualifier("WmiDataId", 1)),
+                prop("Missing", UINT32)
+            ],
+            methods=None
+        )
+
+        self.assertEqual(compile_object(obj).skipped, ("Missing",))
+        with self.assertRaises(RuntimeError):
+            compile_object(obj, strict=True)
+
+    def test_variable(self) -> None:
+        """Test if strings and dynamically sized arrays are aligned after variable fields"""
+        codec = compile_fields((
+            CodecField(name="Name", data_type=STRING),
+            CodecField(name="Count", data_type=UINT8),
+            CodecField(name="Items", data_type=UINT16_ARRAY, size_is="Count"),
+            CodecField(name="Value", data_type=UINT32),
+            CodecField(name="Rest", data_type=UINT16_ARRAY)
+        ))
+        data = pack("<H2sBxHHxxIHH", 2, "A".encode("utf_16_le"), 2, 5, 6, 7, 8, 9)
+        values = {"Name": "A", "Count": 2, "Items": [5, 6], "Value": 7, "Rest": [8, 9]}
+
+        self.assertIsNone(codec.size)
+        self.assertEqual(codec.decode(data), values)
+        self.assertEqual(codec.encode(values), data)
+
+        with self.assertRaises(ValueError):
+            codec.encode(values | {"Count": 3})
+
+    def test_method(self) -> None:
+        """Test if method parameters are split into input and output buffers"""
+        method = WmiMethod(
+            name="Method",
+            parameters=[
+                prop("Second", UINT32, qualifier("in", True), qualifier("ID", 1)),
+                prop("First", UINT8, qualifier("in", True), qualifier("out", True),
+                     qualifier("ID", 0))
+            ],
+            qualifiers=None,
+            return_type=UINT32
+        )
+        inputs, outputs = compile_method(method)
+
+        self.assertEqual([f.name for f in inputs.fields], ["First", "Second"])
+        self.assertEqual([f.name for f in outputs.fields], ["First", "ReturnValue"])
+        self.assertEqual(outputs.encode({"First": 1, "ReturnValue": 2}), pack("<B3xI", 1, 2))
+
+    def test_invalid(self) -> None:
+        """Test if invalid layouts are rejected"""
+        with self.assertRaises(RuntimeError):
+            compile_fields((
+                CodecField(name="Items", data_type=UINT16_ARRAY),
+                CodecField(name="Value", data_type=UINT32)
+            ))
+
+        with self.assertRaises(RuntimeError):
+            compile_fields((CodecField(name="Items", data_type=UINT16_ARRAY, size_is="Count"),))
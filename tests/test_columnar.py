@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+"""Tests for the columnar representation"""
+
+from array import array
+from dataclasses import replace
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.columnar import ColumnarModel, Owner, NO_ROW, count_by, group_by, load_columnar, \
+    take, where, where_in
+from tarkin.flavor import Flavors
+from tarkin.wmi_object import WmiObjectType
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class ColumnarTest(TestCase):
+    """Tests for the columnar representation"""
+
+    def test_roundtrip(self) -> None:
+        """Test if BMOF files are converted from and to the data classes"""
+        for path in sorted(MOF_PATH.rglob("*.bmf")):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                model = ColumnarModel()
+                from_events = model.add_file(path)
+                from_bmof = model.add_bmof(bmof)
+
+                self.assertEqual(model.to_bmof(from_events), bmof)
+                self.assertEqual(model.to_bmof(from_bmof).root, bmof.root)
+
+    def test_empty_flavors(self) -> None:
+        """Test if flavor entries without any flavors are preserved"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_qualifier_flavors.bmf")
+        assert bmof.flavors is not None
+        flavors = [replace(f, flavors=Flavors(0)) for f in bmof.flavors]
+        empty = BMOF.parse(BMOF.build(replace(bmof, flavors=flavors)))
+        assert empty.flavors is not None
+        self.assertEqual(len(empty.flavors), len(flavors))
+
+        model = ColumnarModel()
+        self.assertEqual(model.to_bmof(model.add_data(BMOF.build(empty))), empty)
+        self.assertEqual(model.to_bmof(model.add_bmof(empty)).flavors, empty.flavors)
+
+    def test_tables(self) -> None:
+        """Test the contents of the tables"""
+        model = load_columnar([MOF_PATH / "wmi_class_with_object_array.bmf"])
+        objects = model.objects
+
+        self.assertEqual(model.blobs, [str(MOF_PATH / "wmi_class_with_object_array.bmf")])
+        self.assertEqual([model.string(n) for n in take(objects.name, range(len(objects)))],
+                         ["TestClass", "EmbeddedClass", "TestClass", "EmbeddedClass",
+                          "EmbeddedClass"])
+
+        embedded = [row for row in range(len(objects)) if objects.parent[row] != NO_ROW]
+        self.assertEqual(len(embedded), 2)
+        for row in embedded:
+            value = objects.parent[row]
+            self.assertEqual(model.values.owner_kind[value], Owner.PROPERTY)
+            self.assertEqual(model.string(model.properties.name[model.values.owner[value]]),
+                             "EmbeddedObject")
+            self.assertEqual(model.values.data[value], row)
+
+    def test_helpers(self) -> None:
+        """Test the filter and group-by helpers"""
+        model = load_columnar(sorted(MOF_PATH.glob("*.bmf")))
+        objects = model.objects
+        name = model.find("EmbeddedClass")
+
+        self.assertEqual(model.find("Missing"), NO_ROW)
+        rows = where(objects.name, name)
+        self.assertGreater(len(rows), 0)
+        self.assertTrue(all(model.to_object(r).name == "EmbeddedClass" for r in rows))
+
+        instances = where(objects.object_type, WmiObjectType.INSTANCE)
+        groups = group_by(objects.name, instances)
+        self.assertEqual(sum(len(g) for g in groups.values()), len(instances))
+        self.assertEqual(count_by(objects.name, instances),
+                         {k: len(v) for k, v in groups.items()})
+
+        keys = where(model.qualifiers.name, model.find("key"))
+        self.assertEqual(where_in(model.qualifiers.name, [model.find("key")]), keys)
+        self.assertEqual(take(model.qualifiers.owner_kind, keys),
+                         array("B", [Owner.PROPERTY] * len(keys)))
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+"""Tests for the compact pickling support"""
+
+import pickle
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.flavor import Flavors, QualifierFlavor
+from tarkin.wmi_object import WmiObjectType
+from tarkin.wmi_type import WmiDataType, WmiType
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class CompactPickleTest(TestCase):
+    """Tests for the compact pickling support"""
+
+    def test_round_trip(self) -> None:
+        """Test that pickled BMOF data is restored unchanged"""
+        for path in sorted(MOF_PATH.glob("*.bmf")):
+            with self.subTest(path=path.name):
+                bmof = BMOF.parse_file(path)
+                restored = pickle.loads(pickle.dumps(bmof, pickle.HIGHEST_PROTOCOL))
+
+                self.assertEqual(restored, bmof)
+                self.assertEqual(BMOF.build(restored), BMOF.build(bmof))
+
+                for obj in bmof.root.objects:
+                    self.assertEqual(pickle.loads(pickle.dumps(obj)), obj)
+                    for prop in obj.properties or []:
+                        self.assertEqual(pickle.loads(pickle.dumps(prop)), prop)
+
+                    for method in obj.methods or []:
+                        self.assertEqual(pickle.loads(pickle.dumps(method)), method)
+
+    def test_enums(self) -> None:
+        """Test that enums are restored as enums"""
+        bmof = pickle.loads(pickle.dumps(BMOF.parse_file(MOF_PATH / "wmi_qualifier_flavors.bmf")))
+        assert bmof.flavors is not None
+        for flavor in bmof.flavors:
+            self.assertIsInstance(flavor.flavors, Flavors)
+
+        for obj in bmof.root.objects:
+            self.assertIsInstance(obj.object_type, WmiObjectType)
+            for prop in obj.properties or []:
+                self.assertIsInstance(prop.data_type.basic_type, WmiDataType)
+
+        flavor = QualifierFlavor(offset=4, flavors=Flavors.TO_SUBCLASS | Flavors.AMENDED)
+        self.assertEqual(pickle.loads(pickle.dumps(flavor)), flavor)
+
+        data_type = WmiType(basic_type=WmiDataType.STRING, is_array=True)
+        self.assertEqual(pickle.loads(pickle.dumps(data_type)), data_type)
+
+    def test_string_table(self) -> None:
+        """Test that repeated strings are only pickled once"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_class_with_object.bmf")
+        data = pickle.dumps(bmof, pickle.HIGHEST_PROTOCOL)
+
+        self.assertEqual(data.count(b"CIMTYPE"), 1)
+        self.assertNotIn(b"WmiQualifier", data)
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+
+"""Tests for common BMOF constructs"""
+
+from io import BufferedReader, BytesIO
+from unittest import TestCase
+from construct import StreamError
+from tarkin.constructs import BmofString, HeapReferenceError, HeapTracker, decode_string
+from tarkin.wmi_object import BMOF_WMI_OBJECT
+from .helpers import object_data
+
+
+class HeapReferenceTest(TestCase):
+    """Tests for heap references"""
+
+    def test_disjoint(self) -> None:
+        """Test if disjoint heap references are accepted"""
+        obj = BMOF_WMI_OBJECT.parse(object_data(0, 0xFFFFFFFF))
+
+        self.assertIsNone(obj.methods)
+        self.assertEqual(len(obj.properties), 1)
+
+    def test_overlapping(self) -> None:
+        """Test if overlapping heap references are rejected"""
+        with self.assertRaises(HeapReferenceError):
+            BMOF_WMI_OBJECT.parse(object_data(0, 0))
+
+        with self.assertRaises(HeapReferenceError):
+            BMOF_WMI_OBJECT.parse(object_data(0, 8))
+
+    def test_budget(self) -> None:
+        """Test if the decode budget is enforced"""
+        tracker = HeapTracker(1)
+
+        tracker.enter(0, 0, "(test)")
+        with self.assertRaises(HeapReferenceError):
+            tracker.leave(0, 1024, "(test)")
+
+    def test_budget_nested(self) -> None:
+        """Test if the decode budget is charged before entering nested heap references"""
+        tracker = HeapTracker(1024)
+        tracker.budget = 64
+
+        tracker.enter(0, 0, "(test)")
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(512, 128, "(test)")
+
+    def test_cyclic(self) -> None:
+        """Test if cyclic heap references are rejected"""
+        tracker = HeapTracker(1024)
+
+        tracker.enter(0, 0, "(test)")
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(0, 16, "(test)")
+
+    def test_enclosing(self) -> None:
+        """Test if heap references into the decoded part of enclosing byte ranges are rejected"""
+        tracker = HeapTracker(1024)
+
+        tracker.enter(0, 0, "(test)")
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(8, 16, "(test)")
+
+        tracker.enter(256, 16, "(test)")
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(8, 300, "(test)")
+
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(260, 300, "(test)")
+
+        # The not yet decoded parts of the enclosing byte ranges are accepted
+        tracker.enter(512, 300, "(test)")
+        tracker.leave(512, 520, "(test)")
+        tracker.enter(32, 320, "(test)")
+        tracker.leave(32, 40, "(test)")
+
+    def test_failure(self) -> None:
+        """Test if byte ranges which failed to decode are discarded"""
+        tracker = HeapTracker(1024)
+
+        tracker.enter(0, 0, "(test)")
+        tracker.leave(0, None, "(test)")
+        tracker.enter(0, 0, "(test)")
+        tracker.leave(0, 16, "(test)")
+
+        with self.assertRaises(HeapReferenceError):
+            tracker.enter(8, 32, "(test)")
+
+
+class StringTest(TestCase):
+    """Tests for null-terminated utf-16-le strings"""
+
+    def test_decode(self) -> None:
+        """Test if the terminator is only accepted when aligned"""
+        data = b"\xff" + "\u0100\u0001\0".encode("utf_16_le") + b"\xff"
+
+        self.assertEqual(decode_string(data, 1), ("\u0100\u0001", 7))
+
+        with self.assertRaises(StreamError):
+            decode_string(b"\x01\0\0\x01", 0)
+
+    def test_parse(self) -> None:
+        """Test if strings are parsed from in-memory streams and other streams"""
+        data = "Test\0Next\0".encode("utf_16_le")
+        for stream in (BytesIO(data), BufferedReader(BytesIO(data))):
+            with self.subTest(stream=type(stream)):
+                self.assertEqual(BmofString().parse_stream(stream), "Test")
+                self.assertEqual(stream.tell(), 10)
+
+        with self.assertRaises(StreamError):
+            BmofString().parse(data[:8])
+
+    def test_cache(self) -> None:
+        """Test if decoded strings are cached by their absolute offset"""
+        cache = {6: ("Cached", 10)}
+        stream = BytesIO(b"\0" * 6 + "Test\0".encode("utf_16_le"))
+        stream.seek(6)
+
+        self.assertEqual(BmofString().parse_stream(stream, _string_cache=cache), "Cached")
+        self.assertEqual(stream.tell(), 10)
+
+    def test_build(self) -> None:
+        """Test if strings are built with a terminator"""
+        self.assertEqual(BmofString().build("Test"), "Test\0".encode("utf_16_le"))
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Tests for the corpus statistics"""
+
+from io import StringIO
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.corpus import CorpusStats, corpus_stats, iter_corpus_stats
+
+MOF_PATH: Final = Path("tests/mof")
+
+WORKERS: Final = 4
+
+
+class CorpusStatsTest(TestCase):
+    """Tests for the corpus statistics"""
+
+    def test_histograms(self) -> None:
+        """Test if the histograms of a single file are calculated"""
+        stats = corpus_stats([MOF_PATH / "wmi_class_inheritance.bmf"], kind="thread")
+
+        self.assertEqual((stats.files, stats.errors, len(stats.digests)), (1, 0, 1))
+        self.assertEqual(stats.classes, {"TestClass": 1, "DerivedTestClass": 1})
+        self.assertEqual(stats.namespaces, {"root\\default": 2})
+        self.assertEqual(stats.methods, {"1": 2})
+        self.assertEqual(stats.qualifiers["WMI"], 2)
+        self.assertEqual(stats.qualifier_values["Provider"], {"WmiProv": 2})
+        self.assertEqual(stats.qualifier_values["in"], {"true": 2})
+        self.assertEqual(stats.data_types["sint32"], 2)
+
+    def test_merge(self) -> None:
+        """Test if merging the statistics of each file matches a serial aggregation"""
+        paths = sorted(MOF_PATH.rglob("*.bmf"))
+        expected = CorpusStats(files=len(paths))
+        for path in paths:
+            for obj in BMOF.parse_file(path).root.objects:
+                expected.add_object(obj)
+
+        stats = corpus_stats([MOF_PATH, MOF_PATH / "wmi_class.mof"], kind="thread",
+                             workers=WORKERS)
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(stats.files, len(paths) + 1)
+        for name in ("classes", "instances", "namespaces", "qualifiers", "qualifier_values",
+                     "data_types", "methods"):
+            with self.subTest(histogram=name):
+                self.assertEqual(getattr(stats, name), getattr(expected, name))
+
+    def test_resume(self) -> None:
+        """Test if a aggregation can be extended without aggregating files again"""
+        paths = sorted(MOF_PATH.glob("*.bmf"))
+        full = corpus_stats(paths, kind="thread", workers=WORKERS)
+
+        out = StringIO()
+        corpus_stats(paths[:5], kind="thread", workers=WORKERS).write_json(out)
+        previous = CorpusStats.read_json(StringIO(out.getvalue()))
+        resumed = corpus_stats(paths, kind="thread", workers=WORKERS, previous=previous)
+        self.assertEqual(resumed, full)
+
+        skipped = dict(iter_corpus_stats(paths, kind="thread", skip=frozenset(full.digests)))
+        self.assertEqual([s.files for s in skipped.values()], [0] * len(paths))
+
+    def test_overlap(self) -> None:
+        """Test if aggregations sharing only some of their files are rejected"""
+        paths = sorted(MOF_PATH.glob("*.bmf"))
+        stats = corpus_stats(paths[:2], kind="thread")
+        expected = stats.to_dict()
+
+        with self.assertRaises(ValueError):
+            stats.merge(corpus_stats(paths[1:3], kind="thread"))
+
+        self.assertEqual(stats.to_dict(), expected)
+        stats.merge(corpus_stats(paths[2:3], kind="thread"))
+        self.assertEqual(stats.files, 3)
+
+        with self.assertRaises(ValueError):
+            corpus_stats(paths, kind="thread", workers=0)
+
+    def test_csv(self) -> None:
+        """Test if the histograms are written as CSV"""
+        out = StringIO()
+        corpus_stats([MOF_PATH / "wmi_simple_instance.bmf"], kind="thread").write_csv(out)
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(lines[:3], ["histogram,key,value,count", "files,,,1", "errors,,,0"])
+        self.assertIn("instances,SimpleClass,,1", lines)
+        self.assertIn("qualifier_values,Locale,MS\\0x409,1", lines)
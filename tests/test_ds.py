@@ -6,11 +6,13 @@ from pathlib import Path
 from typing import Final
 from unittest import TestCase
 from construct import GreedyBytes
-from tarkin.ds import CompressedDS
+from tarkin.ds import GIL_DISABLED, CompressedDS, DsDecompressor, decompress_chunks, compress, \
+    supports_free_threading
 
 COMPRESSED_PATH: Final = Path("tests/compression/compressed.bin")
 DECOMPRESSED_PATH: Final = Path("tests/compression/decompressed.bin")
 
+
 class DsTest(TestCase):
     """Tests for doublespace decompression"""
 
@@ -26,10 +28,20 @@ class DsTest(TestCase):
     def test_compression(self) -> None:
         """Test compression of binary data"""
         decompressed = DECOMPRESSED_PATH.read_bytes()
-        ds = CompressedDS(GreedyBytes, 0)
+        ds = CompressedDS(GreedyBytes, len(decompressed))
+
+        compressed = ds.build(decompressed)
 
-        with self.assertRaises(NotImplementedError):
-            ds.build(decompressed)
+        self.assertLess(len(compressed), len(decompressed))
+        self.assertEqual(ds.parse(compressed), decompressed)
+
+    def test_compression_edge_cases(self) -> None:
+        """Test compression of empty, incompressible and highly repetitive data"""
+        for data in (bytes(), bytes(range(256)) * 3, bytes(5000), b"abc" * 1000):
+            with self.subTest(length=len(data)):
+                ds = CompressedDS(GreedyBytes, len(data))
+
+                self.assertEqual(ds.parse(compress(data)), data)
 
     def test_length_mismatch(self) -> None:
         """Test if a mismatched length causes an error"""
@@ -47,3 +59,30 @@ class DsTest(TestCase):
 
         with self.assertRaises(OSError):
             ds.parse(data)
+
+    def test_chunked_decompression(self) -> None:
+        """Test incremental decompression of compressed data"""
+        compressed = COMPRESSED_PATH.read_bytes()
+        decompressed = DECOMPRESSED_PATH.read_bytes()
+
+        for size in (1, 7, len(compressed)):
+            chunks = [compressed[i:i + size] for i in range(0, len(compressed), size)]
+            result = b"".join(decompress_chunks(chunks, len(decompressed)))
+
+            self.assertEqual(result, decompressed)
+
+    def test_chunked_truncated(self) -> None:
+        """Test if truncated data causes an error during incremental decompression"""
+        compressed = COMPRESSED_PATH.read_bytes()
+        decompressor = DsDecompressor(DECOMPRESSED_PATH.stat().st_size)
+
+        decompressor.decompress(compressed[:len(compressed) // 2])
+
+        with self.assertRaises((OSError, RuntimeError)):
+            decompressor.flush()
+
+    def test_free_threading(self) -> None:
+        """Test if modules are only reported as free-threading safe without the GIL"""
+        self.assertEqual(supports_free_threading("json"), GIL_DISABLED)
+        self.assertFalse(supports_free_threading("tarkin_missing_module"))
+        self.assertFalse(supports_free_threading("tarkin_missing_package.module"))
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+"""Tests for the event-based BMOF parser"""
+
+from pathlib import Path
+from typing import Final, Optional
+from unittest import TestCase
+from tarkin.bmof import BMOF, BMOF_DATA
+from tarkin.constructs import HeapReferenceError
+from tarkin.events import BmofHandler, EventParser, parse_events_file
+from tarkin.flavor import Flavors
+from tarkin.wmi_object import WmiObject, WmiObjectType
+from tarkin.wmi_type import WmiType
+from .helpers import object_data, root_data
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class RecordingHandler(BmofHandler):
+    """Handler recording the qualifiers and top-level objects"""
+
+    def __init__(self, wants_objects: bool) -> None:
+        self.wants_objects = wants_objects
+        self.depth = 0
+        self.objects: list[Optional[WmiObject]] = []
+        self.qualifiers: list[tuple[int, Optional[str], object, Flavors]] = []
+        self.events: list[str] = []
+
+    def start_object(self, offset: int, object_type: WmiObjectType) -> None:
+        self.depth += 1
+        self.events.append("start_object")
+
+    def end_object(self, offset: int, obj: Optional[WmiObject]) -> None:
+        self.depth -= 1
+        self.events.append("end_object")
+        if self.depth == 0:
+            self.objects.append(obj)
+
+    def start_qualifier(self, offset: int, name: Optional[str], data_type: WmiType,
+                        value: object, flavors: Flavors) -> None:
+        self.qualifiers.append((offset, name, value, flavors))
+
+    def start_property(self, offset: int, name: Optional[str], data_type: WmiType,
+                       value: object) -> None:
+        self.events.append(f"start_property {name}")
+
+    def end_property(self, offset: int, name: Optional[str]) -> None:
+        self.events.append(f"end_property {name}")
+
+
+def model_qualifiers(objects: list[WmiObject], flavors: dict[int, Flavors]) -> list[tuple]:
+    """Collect all scalar qualifiers of the model"""
+    result = []
+    for obj in objects:
+        qualifiers = list(obj.qualifiers or [])
+        for prop in obj.properties or []:
+            qualifiers.extend(prop.qualifiers or [])
+
+            values = prop.value if isinstance(prop.value, list) else [prop.value]
+            result.extend(model_qualifiers([v for v in values if isinstance(v, WmiObject)],
+                                           flavors))
+
+        for method in obj.methods or []:
+            qualifiers.extend(method.qualifiers or [])
+
+        for qualifier in qualifiers:
+            value = None if isinstance(qualifier.value, list) else qualifier.value
+            result.append((qualifier.offset, qualifier.name, value,
+                           flavors.get(qualifier.offset, Flavors(0))))
+
+    return result
+
+
+class EventParserTest(TestCase):
+    """Tests for the event-based BMOF parser"""
+
+    def test_events(self) -> None:
+        """Test if the events match the objects returned by the regular parser"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+                lazy = RecordingHandler(False)
+                eager = RecordingHandler(True)
+
+                parse_events_file(path, [lazy, eager])
+
+                self.assertEqual(eager.objects, bmof.root.objects)
+                self.assertEqual(lazy.objects, [None] * len(bmof.root.objects))
+                self.assertEqual(lazy.events, eager.events)
+                self.assertEqual(lazy.events.count("start_object"),
+                                 lazy.events.count("end_object"))
+
+                # Method qualifiers are reported per parameter object, so only compare
+                # qualifiers of objects, properties and methods.
+                expected = model_qualifiers(bmof.root.objects, flavors)
+                self.assertLessEqual(set(expected), set(lazy.qualifiers))
+
+    def test_property_order(self) -> None:
+        """Test if property events are nested"""
+        handler = RecordingHandler(False)
+        parse_events_file(MOF_PATH / "wmi_class_with_object.bmf", [handler])
+
+        self.assertEqual(handler.events[:3], ["start_object", "start_property InstanceName",
+                                              "end_property InstanceName"])
+
+        # The instance containing the embedded object follows the classes
+        start = len(handler.events) - handler.events[::-1].index("start_property EmbeddedObject")
+        end = len(handler.events) - handler.events[::-1].index("end_property EmbeddedObject")
+        self.assertEqual(handler.events[start], "start_object")
+        self.assertEqual(handler.events[end - 2], "end_object")
+
+    def test_heap_references(self) -> None:
+        """Test if the same heap references are rejected as by the regular parser"""
+        handler = RecordingHandler(False)
+        EventParser(root_data([object_data(0, 0xFFFFFFFF)]), [handler]).parse()
+        self.assertEqual(handler.events.count("start_object"), 1)
+
+        for methods_offset in (0, 8):
+            with self.subTest(methods_offset=methods_offset):
+                data = root_data([object_data(0, methods_offset)])
+                with self.assertRaises(HeapReferenceError):
+                    BMOF_DATA.parse(data)
+
+                with self.assertRaises(HeapReferenceError):
+                    EventParser(data, [RecordingHandler(False)]).parse()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+"""Tests for parsing concatenated BMOF data buffers"""
+
+import os
+from io import BytesIO
+from pathlib import Path
+from threading import Thread
+from typing import Final
+from unittest import TestCase
+from construct import StreamError
+from tarkin.aio import parse_data
+from tarkin.bmof import BMOF
+from tarkin.framed import iter_blobs, parse_framed
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class FramedTest(TestCase):
+    """Tests for parsing concatenated BMOF data buffers"""
+
+    def setUp(self) -> None:
+        """Read all BMOF files"""
+        self.paths = sorted(MOF_PATH.rglob("*.bmf"))
+        self.blobs = [path.read_bytes() for path in self.paths]
+
+    def test_blobs(self) -> None:
+        """Test if concatenated buffers are split using their headers"""
+        self.assertEqual(list(iter_blobs(BytesIO(b"".join(self.blobs)))), self.blobs)
+        self.assertEqual(list(iter_blobs(BytesIO())), [])
+
+    def test_parse(self) -> None:
+        """Test if each buffer is parsed in order"""
+        results = list(parse_framed(BytesIO(b"".join(self.blobs)), parse_data))
+
+        self.assertEqual(len(results), len(self.paths))
+        for path, result in zip(self.paths, results):
+            with self.subTest(path=path):
+                self.assertEqual(result, BMOF.parse_file(path))
+
+    def test_errors(self) -> None:
+        """Test if malformed buffers are reported without losing the others"""
+        data = bytearray(self.blobs[0])
+        data[-4:] = b"\xff" * 4
+
+        # The length of the corrupted buffer is intact, so parsing continues
+        results = list(parse_framed(BytesIO(bytes(data) + self.blobs[1]), parse_data))
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0], Exception)
+        self.assertEqual(results[1], BMOF.parse_file(self.paths[1]))
+
+        results = list(parse_framed(BytesIO(self.blobs[0] + self.blobs[1][:-1]), parse_data))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], BMOF.parse_file(self.paths[0]))
+        self.assertIsInstance(results[1], StreamError)
+
+        results = list(parse_framed(BytesIO(b"MOF" + self.blobs[0]), parse_data))
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0], Exception)
+
+    def test_stream_error(self) -> None:
+        """Test if unexpected errors of the stream are passed to the consumer"""
+        class FailingStream(BytesIO):
+            """Stream failing after the first buffer"""
+
+            def __init__(self, data: bytes, limit: int) -> None:
+                super().__init__(data)
+                self.limit = limit
+
+            def read(self, size: int | None = -1, /) -> bytes:
+                if self.tell() >= self.limit:
+                    raise ValueError("Unexpected stream error")
+
+                return super().read(size)
+
+        stream = FailingStream(self.blobs[0] + self.blobs[1], len(self.blobs[0]))
+        results = list(parse_framed(stream, parse_data))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], BMOF.parse_file(self.paths[0]))
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_pipe(self) -> None:
+        """Test if results are yielded while the following buffers are being written"""
+        read_fd, write_fd = os.pipe()
+
+        def write() -> None:
+            with os.fdopen(write_fd, "wb", buffering=0) as pipe:
+                for blob in self.blobs:
+                    # Write in small pieces to cause short reads
+                    for start in range(0, len(blob), 7):
+                        pipe.write(blob[start:start + 7])
+
+        writer = Thread(target=write)
+        writer.start()
+        with os.fdopen(read_fd, "rb") as pipe:
+            results = list(parse_framed(pipe, parse_data))
+
+        writer.join()
+        self.assertEqual(results, [BMOF.parse_file(path) for path in self.paths])
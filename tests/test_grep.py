@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+"""Tests for searching BMOF files"""
+
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.events import decompress_bmof
+from tarkin.grep import GrepMatch, Matcher, grep, grep_file
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class GrepTest(TestCase):
+    """Tests for searching BMOF files"""
+
+    def test_prefilter(self) -> None:
+        """Test if files not containing the pattern are not parsed"""
+        buffer = decompress_bmof((MOF_PATH / "wmi_class.bmf").read_bytes())
+
+        self.assertTrue(Matcher("TestMethod").prefilter(buffer))
+        self.assertFalse(Matcher("testmethod").prefilter(buffer))
+        self.assertTrue(Matcher("testmethod", ignore_case=True).prefilter(buffer))
+        self.assertTrue(Matcher("ä", ignore_case=True).prefilter(buffer))
+
+        result = grep_file(MOF_PATH / "wmi_class.bmf", Matcher("Missing"))
+        self.assertTrue(result.prefiltered)
+        self.assertEqual(result.matches, [])
+
+    def test_matches(self) -> None:
+        """Test if the names of objects and their members are reported"""
+        result = grep_file(MOF_PATH / "wmi_class.bmf", Matcher("test", ignore_case=True))
+
+        self.assertFalse(result.prefiltered)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.matches, [
+            GrepMatch(location="", kind="class", name="TestClass"),
+            GrepMatch(location="class TestClass", kind="property", name="TestProperty"),
+            GrepMatch(location="class TestClass", kind="method", name="TestMethod"),
+            GrepMatch(location="class TestClass.TestMethod", kind="parameter", name="Test1"),
+            GrepMatch(location="class TestClass.TestMethod", kind="parameter", name="Test2")
+        ])
+
+        result = grep_file(MOF_PATH / "wmi_class_with_object_array.bmf", Matcher("Embedded"))
+        self.assertIn("instance of TestClass.EmbeddedObject[1]: instance of EmbeddedClass",
+                      map(str, result.matches))
+
+    def test_directories(self) -> None:
+        """Test if directories are searched in parallel, skipping files which are not BMOF files"""
+        results = list(grep([MOF_PATH, MOF_PATH / "wmi_class.mof"], "guid", kind="thread",
+                            workers=2))
+        paths = [r.path for r in results if r.matches]
+
+        self.assertEqual(paths, [MOF_PATH / "wmi_class.bmf", MOF_PATH / "wmi_class_inheritance.bmf",
+                                 MOF_PATH / "wmi_class_with_object.bmf",
+                                 MOF_PATH / "wmi_class_with_object_array.bmf",
+                                 MOF_PATH / "wmi_simple_class.bmf",
+                                 MOF_PATH / "wmi_simple_instance.bmf"])
+        self.assertEqual([r.path for r in results if r.error is not None],
+                         [MOF_PATH / "wmi_class.mof"])
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+"""Tests for the WMI class inheritance resolver"""
+
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.flavor import Flavors, QualifierFlavor
+from tarkin.inheritance import InheritanceResolver
+from tarkin.wmi_object import WmiObject, WmiObjectType
+from tarkin.wmi_property import WmiProperty
+from tarkin.wmi_qualifier import WmiQualifier
+from tarkin.wmi_type import WmiType, WmiDataType
+
+MOF_PATH: Final = Path("tests/mof")
+
+STRING: Final = WmiType.from_data_type(WmiDataType.STRING)
+
+
+def qualifier(name: str, value: str, offset: int) -> WmiQualifier:
+    """Create a string qualifier"""
+    return WmiQualifier(name=name, data_type=STRING, value=value, offset=offset)
+
+
+def wmi_class(name: str, superclass: str | None, qualifiers: list[WmiQualifier],
+              properties: list[WmiProperty]) -> WmiObject:
+    """Create a WMI class"""
+    system = [WmiProperty(data_type=STRING, name="__CLASS", value=name, qualifiers=None)]
+    if superclass is not None:
+        system.append(
+            WmiProperty(data_type=STRING, name="__SUPERCLASS", value=superclass, qualifiers=None)
+        )
+
+    return WmiObject(
+        object_type=WmiObjectType.CLASS,
+        qualifiers=qualifiers,
+        properties=system + properties,
+        methods=[]
+    )
+
+
+class InheritanceResolverTest(TestCase):
+    """Tests for the WMI class inheritance resolver"""
+
+    def test_inheritance(self) -> None:
+        """Test if properties and methods are inherited"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_class_inheritance.bmf")
+        resolver = InheritanceResolver(bmof.root.objects, bmof.flavors)
+        derived = resolver.resolve_class("derivedtestclass")
+
+        self.assertEqual(
+            [(p.name, p.origin) for p in derived.properties],
+            [
+                ("InstanceName", "TestClass"),
+                ("Active", "TestClass"),
+                ("TestProperty", "TestClass"),
+                ("NewTestProperty", "DerivedTestClass")
+            ]
+        )
+        self.assertEqual([m.name for m in derived.methods], ["TestMethod", "NewTestMethod"])
+        self.assertIs(derived.superclass, resolver.resolve_class("TestClass"))
+
+        # Only the CIMTYPE qualifier has the TO_SUBCLASS flavor
+        prop = derived.find_property("instancename")
+        assert prop is not None
+        self.assertEqual([q.name for q in prop.qualifiers], ["CIMTYPE"])
+
+    def test_instance(self) -> None:
+        """Test if instances use the values of their class"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_data_types_instance.bmf")
+        resolver = InheritanceResolver(bmof.root.objects, bmof.flavors)
+        cls, instance = resolver.resolve_all()
+
+        self.assertIs(instance.superclass, cls)
+        self.assertEqual(
+            [p.name for p in instance.properties[:len(cls.properties)]],
+            [p.name for p in cls.properties]
+        )
+        prop = instance.find_property("Uint8")
+        assert prop is not None
+        self.assertEqual((prop.prop.value, prop.origin), (64, "DataTypes"))
+        self.assertEqual(instance.methods, [])
+
+    def test_flavors(self) -> None:
+        """Test if qualifiers are propagated according to their flavors"""
+        flavors = [
+            QualifierFlavor(offset=1, flavors=Flavors.TO_SUBCLASS),
+            QualifierFlavor(offset=2, flavors=Flavors.TO_INSTANCE),
+            QualifierFlavor(offset=3, flavors=Flavors.TO_SUBCLASS | Flavors.DISABLE_OVERRIDE)
+        ]
+        base = wmi_class("Base", None, [
+            qualifier("Subclass", "base", 1),
+            qualifier("Instance", "base", 2),
+            qualifier("Fixed", "base", 3)
+        ], [])
+        derived = wmi_class("Derived", "Base", [
+            qualifier("Subclass", "derived", 4),
+            qualifier("Fixed", "base", 5)
+        ], [])
+
+        resolved = InheritanceResolver([base, derived], flavors).resolve_class("Derived")
+
+        self.assertEqual(
+            [(q.name, q.qualifier.value, q.origin) for q in resolved.qualifiers],
+            [("Subclass", "derived", "Derived"), ("Fixed", "base", "Base")]
+        )
+
+        invalid = wmi_class("Invalid", "Base", [qualifier("Fixed", "invalid", 6)], [])
+        with self.assertRaises(RuntimeError):
+            InheritanceResolver([base, invalid], flavors).resolve_class("Invalid")
+
+    def test_memoisation(self) -> None:
+        """Test if deep hierarchies are resolved once without recursion"""
+        classes = [wmi_class("Class0", None, [], [
+            WmiProperty(data_type=STRING, name="Property0", value=None, qualifiers=None)
+        ])]
+        for i in range(1, 2000):
+            classes.append(wmi_class(f"Class{i}", f"Class{i - 1}", [], []))
+
+        resolver = InheritanceResolver(classes)
+        resolved = resolver.resolve_all()
+
+        self.assertEqual([p.origin for p in resolved[-1].properties], ["Class0"])
+        self.assertIs(resolved[-1].superclass, resolved[-2])
+
+    def test_cycle(self) -> None:
+        """Test if cyclic inheritance is detected"""
+        classes = [wmi_class("A", "B", [], []), wmi_class("B", "A", [], [])]
+
+        with self.assertRaises(RuntimeError):
+            InheritanceResolver(classes).resolve_class("A")
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+
+"""Tests for the reconstruction of WMI methods"""
+
+import pickle
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.wmi_method import MethodBuilder, ParameterDirection, ParameterSignature, WmiMethod
+from tarkin.wmi_object import WmiMethodAdapter, parameters_object
+from tarkin.wmi_property import WmiProperty
+from tarkin.wmi_qualifier import WmiQualifier
+from tarkin.wmi_type import WmiType, WmiDataType
+
+MOF_PATH: Final = Path("tests/mof")
+
+BOOLEAN: Final = WmiType.from_data_type(WmiDataType.BOOLEAN)
+
+SINT32: Final = WmiType.from_data_type(WmiDataType.SINT32)
+
+IN: Final = ParameterDirection.IN
+
+OUT: Final = ParameterDirection.OUT
+
+
+def qualifier(name: str, value: bool | int | str = True) -> WmiQualifier:
+    """Create a qualifier"""
+    if isinstance(value, bool):
+        data_type = BOOLEAN
+    elif isinstance(value, int):
+        data_type = SINT32
+    else:
+        data_type = WmiType.from_data_type(WmiDataType.STRING)
+
+    return WmiQualifier(name=name, data_type=data_type, value=value, offset=0)
+
+
+def param(name: str, *qualifiers: WmiQualifier) -> WmiProperty:
+    """Create a parameter"""
+    return WmiProperty(data_type=SINT32, name=name, value=None, qualifiers=list(qualifiers))
+
+
+class MethodBuilderTest(TestCase):
+    """Tests for the reconstruction of WMI methods"""
+
+    def test_signature(self) -> None:
+        """Test if the direction of parameters is recovered from the __PARAMETERS objects"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_class.bmf")
+        method = bmof.root.objects[0].methods[0]
+
+        self.assertEqual([p.name for p in method.parameters], ["Test1", "Test2"])
+        self.assertEqual(method.signature, (
+            ParameterSignature(name="Test1", direction=IN, data_id=0),
+            ParameterSignature(name="Test2", direction=IN | OUT, data_id=1)
+        ))
+        self.assertEqual(pickle.loads(pickle.dumps(method)).signature, method.signature)
+
+    def test_merge(self) -> None:
+        """Test if duplicated parameters are merged into new parameters"""
+        first = WmiProperty(data_type=SINT32, name="Value", value=None, qualifiers=None)
+        second = param("Value", qualifier("out"), qualifier("ID", 0))
+        builder = MethodBuilder("Method", None)
+        builder.add([first], IN)
+        builder.add([second, param("ReturnValue")], OUT)
+        method = builder.build()
+
+        self.assertEqual(method.parameters, [second])
+        self.assertIsNone(first.qualifiers)
+        self.assertEqual(method.return_type, SINT32)
+        self.assertEqual(method.signature,
+                         (ParameterSignature(name="Value", direction=IN | OUT, data_id=0),))
+
+        other = WmiProperty(data_type=BOOLEAN, name="Value", value=None, qualifiers=None)
+        with self.assertRaises(RuntimeError):
+            WmiMethod.from_properties("Method", [first, other], None)
+
+    def test_order(self) -> None:
+        """Test if the signature is ordered by data ID"""
+        method = WmiMethod.from_properties("Method", [
+            param("NoId", qualifier("in")),
+            param("Second", qualifier("out"), qualifier("ID", 1)),
+            param("First", qualifier("in"), qualifier("WmiDataId", 0), qualifier("ID", 5))
+        ], None)
+
+        self.assertEqual([(p.name, p.direction, p.data_id) for p in method.signature or ()], [
+            ("First", IN, 0),
+            ("Second", OUT, 1),
+            ("NoId", IN, None)
+        ])
+
+    def test_output_first(self) -> None:
+        """Test if the direction of parameters does not depend on the order of the objects"""
+        prop = WmiProperty(
+            data_type=WmiType(basic_type=WmiDataType.OBJECT, is_array=True),
+            name="Method",
+            value=[
+                parameters_object([param("Result", qualifier("out"), qualifier("ID", 1))]),
+                parameters_object([param("Value", qualifier("in"), qualifier("ID", 0))])
+            ],
+            qualifiers=None
+        )
+        method = WmiMethodAdapter._builder(prop).build()  # pylint: disable=protected-access
+
+        self.assertEqual(method.signature, (
+            ParameterSignature(name="Value", direction=IN, data_id=0),
+            ParameterSignature(name="Result", direction=OUT, data_id=1)
+        ))
+
+    def test_invalid_id(self) -> None:
+        """Test if IDs which are not integers are ignored"""
+        method = WmiMethod.from_properties("Method", [
+            param("Value", qualifier("in"), qualifier("ID", "abc"))
+        ], None)
+
+        self.assertEqual(method.signature,
+                         (ParameterSignature(name="Value", direction=IN, data_id=None),))
+
+    def test_many(self) -> None:
+        """Test if methods with many parameters are reconstructed"""
+        count = 5000
+        inputs = [param(f"P{i}", qualifier("in"), qualifier("ID", count - i)) for i in range(count)]
+        outputs = [param(f"P{i}", qualifier("out"), qualifier("ID", count - i))
+                   for i in range(count)]
+        builder = MethodBuilder("Method", None)
+        builder.add(inputs, IN)
+        builder.add(outputs, OUT)
+        method = builder.build()
+
+        self.assertEqual(len(method.parameters or []), count)
+        self.assertEqual([q.name for q in (method.parameters or [])[0].qualifiers or []],
+                         ["in", "ID", "out"])
+        self.assertEqual(len(inputs[0].qualifiers or []), 2)
+        self.assertEqual((method.signature or ())[0].name, f"P{count - 1}")
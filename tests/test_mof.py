@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+
+"""Tests for the MOF source emitter"""
+
+from io import StringIO
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.mof import MofWriter, decompile_file, format_real, format_string
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+def decompile_path(path: Path) -> str:
+    """Decompile a BMOF file into a string"""
+    out = StringIO()
+    decompile_file(path, out)
+
+    return out.getvalue()
+
+
+class MofTest(TestCase):
+    """Tests for the MOF source emitter"""
+
+    def test_streaming(self) -> None:
+        """Test that streaming decompilation matches decompiling the parsed objects"""
+        for path in sorted(MOF_PATH.rglob("*.bmf")):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                out = StringIO()
+                MofWriter(out, {f.offset: f.flavors for f in bmof.flavors or []}) \
+                    .write_all(bmof.root.objects)
+
+                self.assertEqual(decompile_path(path), out.getvalue())
+
+    def test_class(self) -> None:
+        """Test decompiling classes with qualifiers, properties and methods"""
+        source = decompile_path(MOF_PATH / "wmi_class.bmf")
+
+        self.assertIn("#pragma namespace(\"\\\\\\\\.\\\\root\\\\default\")\n", source)
+        self.assertIn("guid(\"{7F61DFFE-EED6-4087-BB73-C41C9A9B6EB9}\")]\nclass TestClass\n{\n",
+                      source)
+        self.assertIn("    [key, read] string InstanceName;\n", source)
+        self.assertIn("    [Description(\"Test property\")] sint32 TestProperty;\n", source)
+        self.assertIn("string TestMethod([in, id(0)] sint32 Test1, "
+                      "[in, id(1), out] boolean Test2);", source)
+        self.assertNotIn("CIMTYPE", source)
+
+    def test_defaults(self) -> None:
+        """Test decompiling default values"""
+        self.assertIn("    string Property = \"DefaultValue\";\n",
+                      decompile_path(MOF_PATH / "wmi_class_with_defaults.bmf"))
+        self.assertIn("    uint32 values[] = {57005, 48879};\n",
+                      decompile_path(MOF_PATH / "wmi_class_with_array.bmf"))
+
+    def test_instance(self) -> None:
+        """Test decompiling instances with embedded objects"""
+        source = decompile_path(MOF_PATH / "wmi_class_with_object_array.bmf")
+
+        self.assertIn("    [Description(\"Embedded object\")] object EmbeddedObject[];\n", source)
+        self.assertIn("instance of TestClass\n{\n    InstanceName = \"Test\";\n    Active = TRUE;\n"
+                      "    EmbeddedObject = {\n        instance of EmbeddedClass\n        {\n"
+                      "            InstanceName = \"Entry1\";\n        },\n", source)
+
+    def test_flavors(self) -> None:
+        """Test decompiling qualifier flavors"""
+        source = decompile_path(MOF_PATH / "wmi_qualifier_flavors.bmf")
+
+        self.assertIn("[Description(\"TEST\") : Amended]\nclass ClassWithQualifiers1\n", source)
+        self.assertIn("[Description(\"TEST\") : ToSubClass]\nclass ClassWithQualifiers8\n", source)
+
+    def test_classflags(self) -> None:
+        """Test decompiling class flags"""
+        source = decompile_path(MOF_PATH / "pragma" / "wmi_pragma_classflags.bmf")
+
+        self.assertIn("#pragma classflags(\"createonly\")\n\nclass Class1\n", source)
+        self.assertIn("#pragma classflags(\"updateonly\", \"forceupdate\")\n\nclass Class5\n",
+                      source)
+
+    def test_string(self) -> None:
+        """Test escaping of string literals"""
+        self.assertEqual(format_string("a\\b\"c\nd\x01"), "\"a\\\\b\\\"c\\nd\\x0001\"")
+
+    def test_real(self) -> None:
+        """Test if real values without a MOF literal are rejected"""
+        self.assertEqual(format_real(1.5), "1.5")
+        self.assertEqual(format_real(-1e300), "-1e+300")
+
+        for value in (float("inf"), float("-inf"), float("nan")):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                format_real(value)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+"""Tests for the WQL query engine"""
+
+from pathlib import Path
+from typing import Final, Optional
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.query import QueryEngine, QueryError, parse_object_path, parse_query
+from tarkin.wmi_data import WmiData
+from tarkin.wmi_object import WmiObject, WmiObjectType
+from tarkin.wmi_property import WmiProperty
+from tarkin.wmi_qualifier import WmiQualifier
+from tarkin.wmi_type import WmiType, WmiDataType
+
+MOF_PATH: Final = Path("tests/mof")
+
+STRING: Final = WmiType.from_data_type(WmiDataType.STRING)
+
+SINT32: Final = WmiType.from_data_type(WmiDataType.SINT32)
+
+REFERENCE: Final = WmiType.from_data_type(WmiDataType.REFERENCE)
+
+KEY: Final = WmiQualifier(name="key", data_type=WmiType.from_data_type(WmiDataType.BOOLEAN),
+                          value=True, offset=0)
+
+
+def prop(name: str, data_type: WmiType, value: Optional[WmiData] = None,
+         key: bool = False) -> WmiProperty:
+    """Create a property"""
+    return WmiProperty(data_type=data_type, name=name, value=value,
+                       qualifiers=[KEY] if key else [])
+
+
+def wmi_class(name: str, superclass: Optional[str], properties: list[WmiProperty]) -> WmiObject:
+    """Create a WMI class"""
+    system = [WmiProperty(data_type=STRING, name="__CLASS", value=name, qualifiers=None)]
+    if superclass is not None:
+        system.append(
+            WmiProperty(data_type=STRING, name="__SUPERCLASS", value=superclass, qualifiers=None)
+        )
+
+    return WmiObject(object_type=WmiObjectType.CLASS, qualifiers=[],
+                     properties=system + properties, methods=[])
+
+
+def instance(name: str, **values: WmiData) -> WmiObject:
+    """Create a WMI instance"""
+    properties = [WmiProperty(data_type=STRING, name="__CLASS", value=name, qualifiers=None)]
+    for key, value in values.items():
+        data_type = STRING if isinstance(value, str) else SINT32
+        properties.append(prop(key, data_type, value))
+
+    return WmiObject(object_type=WmiObjectType.INSTANCE, qualifiers=[],
+                     properties=properties, methods=[])
+
+
+def engine() -> QueryEngine:
+    """Create a query engine with devices, drivers and associations between them"""
+    return QueryEngine([
+        wmi_class("Device", None, [prop("Name", STRING, key=True), prop("Size", SINT32, 8)]),
+        wmi_class("Disk", "Device", [prop("Label", STRING)]),
+        wmi_class("Driver", None, [prop("Id", SINT32, key=True)]),
+        wmi_class("DeviceDriver", None, [
+            prop("Device", REFERENCE, key=True),
+            prop("Driver", REFERENCE, key=True)
+        ]),
+        instance("Device", Name="cpu", Size=4),
+        instance("Device", Name="memory"),
+        instance("Disk", Name="sda", Size=512, Label="System"),
+        instance("Disk", Name="sdb", Size=1024, Label="Data"),
+        instance("Driver", Id=1),
+        instance("Driver", Id=2),
+        instance("DeviceDriver", Device="Device.Name=\"cpu\"", Driver="Driver.Id=1"),
+        instance("DeviceDriver", Device="\\\\.\\root\\wmi:Disk.Name=\"SDA\"", Driver="Driver.Id=2"),
+        instance("DeviceDriver", Device="Disk.Name=\"sdb\"", Driver="Driver.Id=2")
+    ])
+
+
+def names(rows: list) -> list[Optional[WmiData]]:
+    """Retrieve the Name properties of query results"""
+    return sorted(str(row.properties.get("Name")) for row in rows)
+
+
+class QueryParserTest(TestCase):
+    """Tests for the WQL query parser"""
+
+    def test_errors(self) -> None:
+        """Test if malformed queries are rejected"""
+        for query in ("DELETE FROM Device", "SELECT FROM Device", "SELECT * FROM Device WHERE",
+                      "SELECT * FROM Device WHERE Size < NULL", "SELECT * FROM Device ;",
+                      "ASSOCIATORS OF {Device=@} WHERE Class = Device"):
+            with self.subTest(query=query):
+                with self.assertRaises(QueryError):
+                    parse_query(query)
+
+    def test_object_path(self) -> None:
+        """Test if object paths are normalized"""
+        self.assertEqual(parse_object_path("\\\\.\\root\\wmi:Disk.Name=\"SDA\",Id=0x10"),
+                         parse_object_path("disk.id=16,name=\"sda\""))
+        self.assertEqual(parse_object_path("Config=@"), ("config", frozenset()))
+
+
+class QueryEngineTest(TestCase):
+    """Tests for the WQL query engine"""
+
+    def test_meta_class(self) -> None:
+        """Test if classes are queried using the class indexes"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                objects = BMOF.parse_file(path).root.objects
+                query = QueryEngine(objects)
+                classes = [o for o in objects if o.object_type == WmiObjectType.CLASS]
+                for cls in classes:
+                    rows = query.execute(f"SELECT * FROM meta_class WHERE __CLASS = '{cls.name}'")
+                    self.assertEqual([row.obj.name for row in rows], [cls.name])
+
+        query = QueryEngine.from_bmofs([BMOF.parse_file(MOF_PATH / "wmi_class_inheritance.bmf")])
+        rows = query.execute("SELECT * FROM meta_class WHERE __THIS ISA 'testclass'")
+        self.assertEqual(sorted(row.obj.name for row in rows), ["DerivedTestClass", "TestClass"])
+        rows = query.execute("SELECT __CLASS FROM meta_class WHERE __SUPERCLASS = 'TestClass'")
+        self.assertEqual([row.properties for row in rows], [{"__CLASS": "DerivedTestClass"}])
+
+    def test_select(self) -> None:
+        """Test if instances of derived classes and default values are considered"""
+        query = engine()
+        self.assertEqual(names(query.execute("SELECT * FROM Device")),
+                         ["cpu", "memory", "sda", "sdb"])
+        self.assertEqual(names(query.execute("SELECT * FROM Device WHERE Size = 8")), ["memory"])
+        self.assertEqual(names(query.execute("select Name from device where size >= 8 "
+                                             "and not (name = 'SDB' or Label is null)")),
+                         ["sda"])
+        self.assertEqual(names(query.execute("SELECT * FROM Device WHERE Name LIKE 's_[a-b]'")),
+                         ["sda", "sdb"])
+        self.assertEqual(names(query.execute("SELECT * FROM Device WHERE Label <> NULL "
+                                             "OR __CLASS = 'device' AND Size < 5")),
+                         ["cpu", "sda", "sdb"])
+        self.assertEqual(names(query.execute("SELECT * FROM Device WHERE Size = 'cpu'")), [])
+        self.assertEqual(query.execute("SELECT Label FROM Disk WHERE Name = 'sda'")[0].properties,
+                         {"Label": "System"})
+
+    def test_plan(self) -> None:
+        """Test if the planner uses the indexes"""
+        query = engine()
+        plan = query.plan("SELECT * FROM Device WHERE Size > 4 AND Name = 'SDA'")
+        self.assertEqual(plan.strategy, "property index")
+        self.assertEqual(plan.classes, ("device", "disk"))
+        self.assertEqual(plan.index, ("name", "sda"))
+        self.assertEqual(query.plan("SELECT * FROM Device WHERE Size > 4").strategy,
+                         "class index")
+
+        # Indexes are cached across queries until objects are added
+        query.execute("SELECT * FROM Device WHERE Name = 'sda'")
+        index = query._value_index("disk", "name")  # pylint: disable=protected-access
+        query.execute("SELECT * FROM Disk WHERE Name = 'sdb'")
+        self.assertIs(query._value_index("disk", "name"), index)  # pylint: disable=protected-access
+        query.add([instance("Disk", Name="sdc")])
+        self.assertEqual(names(query.execute("SELECT * FROM Device WHERE Name = 'sdc'")), ["sdc"])
+
+    def test_class_added_later(self) -> None:
+        """Test if the value indexes consider default values of classes added later"""
+        query = QueryEngine([instance("Config", Name="default")])
+        self.assertEqual(names(query.execute("SELECT * FROM Config WHERE Level = 1")), [])
+
+        properties = [prop("Name", STRING, key=True), prop("Level", SINT32, 1)]
+        query.add([wmi_class("Config", None, properties)])
+        self.assertEqual(names(query.execute("SELECT * FROM Config WHERE Level = 1")),
+                         ["default"])
+        self.assertEqual(names(query.execute("SELECT * FROM Config WHERE Level >= 1")),
+                         ["default"])
+
+    def test_associators(self) -> None:
+        """Test if ASSOCIATORS OF queries follow references in both directions"""
+        query = engine()
+        rows = query.execute("ASSOCIATORS OF {Driver.Id=2}")
+        self.assertEqual(names(rows), ["sda", "sdb"])
+        rows = query.execute("ASSOCIATORS OF {Disk.Name=\"sda\"} WHERE ResultClass = Driver")
+        self.assertEqual([row.properties for row in rows], [{"Id": 2}])
+        rows = query.execute("ASSOCIATORS OF {Driver.Id=2} WHERE ResultRole = Driver")
+        self.assertEqual(rows, [])
+        rows = query.execute("ASSOCIATORS OF {Device.Name=\"cpu\"} "
+                             "WHERE AssocClass = DeviceDriver Role = Device")
+        self.assertEqual([row.properties for row in rows], [{"Id": 1}])
+        self.assertEqual(query.execute("ASSOCIATORS OF {Device.Name=\"memory\"}"), [])
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+"""Tests for the reusable parser session"""
+
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from construct import ConstructError
+from tarkin.bmof import BMOF
+from tarkin.session import ParserSession
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class ParserSessionTest(TestCase):
+    """Tests for the reusable parser session"""
+
+    def setUp(self) -> None:
+        """Find all BMOF files"""
+        self.paths = sorted(MOF_PATH.rglob("*.bmf"))
+
+    def test_parse(self) -> None:
+        """Test if parsing with a session matches parsing without one"""
+        session = ParserSession()
+        for _ in range(2):
+            for path in self.paths:
+                with self.subTest(path=path):
+                    self.assertEqual(session.parse_file(path), BMOF.parse_file(path))
+
+    def test_arena(self) -> None:
+        """Test if the arena is reused once it fits the largest BMOF"""
+        session = ParserSession()
+        for path in self.paths:
+            session.parse_file(path)
+
+        size = session.arena_size
+        for path in reversed(self.paths):
+            session.parse_file(path)
+
+        self.assertEqual(session.arena_size, size)
+
+    def test_shared(self) -> None:
+        """Test if strings and types are shared between BMOFs"""
+        session = ParserSession()
+        first = session.parse_file(MOF_PATH / "wmi_class.bmf")
+        second = session.parse_file(MOF_PATH / "wmi_class_inheritance.bmf")
+
+        first_qualifier = first.root.objects[0].qualifiers[0]
+        second_qualifier = second.root.objects[0].qualifiers[0]
+        self.assertEqual(first_qualifier.name, "WMI")
+        self.assertIs(first_qualifier.name, second_qualifier.name)
+        self.assertIs(first_qualifier.data_type, second_qualifier.data_type)
+
+    def test_errors(self) -> None:
+        """Test if malformed data is rejected without breaking the session"""
+        session = ParserSession()
+        data = (MOF_PATH / "wmi_class.bmf").read_bytes()
+        for invalid in (data[:-1], data + b"\0", b"BMOF" + data[4:]):
+            with self.assertRaises(ConstructError):
+                session.parse(invalid)
+
+        paths = [MOF_PATH / "wmi_class.mof", MOF_PATH / "wmi_class.bmf"]
+        results = list(session.parse_files(paths))
+        self.assertIsInstance(results[0][1], Exception)
+        self.assertEqual(results[1][1], BMOF.parse(data))
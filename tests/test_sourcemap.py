@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+
+"""Tests for the byte ranges of decoded nodes"""
+
+from copy import copy
+from pathlib import Path
+from struct import unpack_from
+from typing import Final, Iterator
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.sourcemap import SourceMap, Span, parse_file_with_source_map
+from tarkin.wmi_object import BMOF_WMI_OBJECT, WmiObject
+from tarkin.wmi_property import WmiProperty
+from tarkin.wmi_qualifier import WmiQualifier
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+def iter_objects(objects: list[WmiObject]) -> Iterator[WmiObject]:
+    """Iterate over objects including embedded objects"""
+    for obj in objects:
+        yield obj
+        for prop in obj.properties or []:
+            values = prop.value if isinstance(prop.value, list) else [prop.value]
+            yield from iter_objects([v for v in values if isinstance(v, WmiObject)])
+
+
+def iter_qualifiers(obj: WmiObject) -> Iterator[WmiQualifier]:
+    """Iterate over the qualifiers of an object, its properties, methods and parameters"""
+    yield from obj.qualifiers or []
+    for prop in obj.properties or []:
+        yield from prop.qualifiers or []
+
+    for method in obj.methods or []:
+        yield from method.qualifiers or []
+        for param in method.parameters or []:
+            yield from param.qualifiers or []
+
+
+class SourceMapTest(TestCase):
+    """Tests for the byte ranges of decoded nodes"""
+
+    def setUp(self) -> None:
+        """Parse all BMOF files"""
+        self.parsed: list[tuple[Path, list[WmiObject], SourceMap]] = []
+        for path in sorted(MOF_PATH.rglob("*.bmf")):
+            bmof, source_map = parse_file_with_source_map(path)
+            self.assertEqual(bmof, BMOF.parse_file(path))
+            self.parsed.append((path, list(iter_objects(bmof.root.objects)), source_map))
+
+    def assertLength(self, source_map: SourceMap, node: object) -> Span:
+        """Assert that the byte range of a node matches its length field"""
+        # pylint: disable=invalid-name
+        span = source_map.span(node)
+        raw = source_map.raw(node)
+        assert span is not None and raw is not None
+        self.assertEqual(len(raw), len(span))
+        self.assertEqual(unpack_from("<I", raw)[0], len(span))
+
+        return span
+
+    def test_objects(self) -> None:
+        """Test if objects and properties are mapped to their structures"""
+        for path, objects, source_map in self.parsed:
+            with self.subTest(path=path):
+                for obj in objects:
+                    span = self.assertLength(source_map, obj)
+                    self.assertLessEqual(span.end, len(source_map.data))
+                    for prop in obj.properties or []:
+                        prop_span = self.assertLength(source_map, prop)
+                        self.assertGreaterEqual(prop_span.start, span.start)
+                        self.assertLessEqual(prop_span.end, span.end)
+
+                    # The raw bytes contain all heap references of the object
+                    extracted = BMOF_WMI_OBJECT.parse(source_map.raw(obj))
+                    self.assertEqual(extracted.name, obj.name)
+                    self.assertEqual([p.value for p in extracted.properties or []],
+                                     [p.value for p in obj.properties or []])
+
+    def test_values(self) -> None:
+        """Test if values are mapped to their substructures"""
+        for path, objects, source_map in self.parsed:
+            with self.subTest(path=path):
+                for obj in objects:
+                    for prop in obj.properties or []:
+                        span = source_map.span(prop)
+                        value_span = source_map.value_span(prop)
+                        assert span is not None
+                        if prop.value is None:
+                            self.assertIsNone(value_span)
+                            continue
+
+                        assert value_span is not None
+                        self.assertGreaterEqual(value_span.start, span.start)
+                        self.assertLessEqual(value_span.end, span.end)
+
+    def test_methods(self) -> None:
+        """Test if methods and parameters are mapped to the properties they were built from"""
+        _, objects, source_map = next(p for p in self.parsed if p[0].name == "methods.bmf")
+        methods = [m for o in objects for m in o.methods or []]
+        self.assertNotEqual(methods, [])
+        for method in methods:
+            self.assertLength(source_map, method)
+            for param in method.parameters or []:
+                self.assertLength(source_map, param)
+
+    def test_qualifiers(self) -> None:
+        """Test if qualifiers are mapped to their offsets and flavors"""
+        for path in sorted(MOF_PATH.rglob("*.bmf")):
+            with self.subTest(path=path):
+                bmof, source_map = parse_file_with_source_map(path)
+                flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+                for obj in iter_objects(bmof.root.objects):
+                    for qualifier in iter_qualifiers(obj):
+                        span = source_map.span(qualifier)
+                        assert span is not None
+                        self.assertEqual(span.start, qualifier.offset)
+                        self.assertIs(source_map.qualifier_at(qualifier.offset), qualifier)
+                        self.assertEqual(source_map.flavors(qualifier),
+                                         flavors.get(qualifier.offset))
+
+    def test_zero_copy(self) -> None:
+        """Test if the raw bytes are read-only views of the decompressed data"""
+        _, objects, source_map = self.parsed[0]
+        raw = source_map.raw(objects[0])
+        assert raw is not None
+        self.assertIs(raw.obj, source_map.data.obj)
+        self.assertTrue(raw.readonly)
+        self.assertEqual(hash(raw), hash(bytes(raw)))
+
+    def test_identity(self) -> None:
+        """Test if nodes not returned by the parsing process are not mapped"""
+        _, objects, source_map = self.parsed[0]
+        prop = copy(objects[0].properties[0])
+        self.assertIsInstance(prop, WmiProperty)
+        self.assertIsNone(source_map.span(prop))
+        self.assertIsNone(source_map.raw_value(prop))
+        self.assertIsNone(source_map.qualifier_at(len(source_map.data)))
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+"""Tests for the BMOF size accounting"""
+
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from construct import ConstructError
+from tarkin.bmof import BMOF, BMOF_HEADER
+from tarkin.ds import compress
+from tarkin.events import ARRAY_HEADER, OBJECT_HEADER, PROPERTY_HEADER, QUALIFIER_HEADER, \
+    decompress_bmof
+from tarkin.root import BMOF_ROOT_HEADER
+from tarkin.sourcemap import parse_file_with_source_map
+from tarkin.stats import blob_stats, blob_stats_file, format_stats
+from tarkin.wmi_object import WmiObjectType
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class StatsTest(TestCase):
+    """Tests for the BMOF size accounting"""
+
+    def test_totals(self) -> None:
+        """Test that the sizes of the objects add up to the size of the root"""
+        for path in sorted(MOF_PATH.glob("*.bmf")):
+            with self.subTest(path=path.name):
+                stats = blob_stats_file(path)
+                bmof = BMOF.parse_file(path)
+
+                self.assertEqual(len(stats.classes), len(bmof.root.objects))
+                self.assertEqual(sum(c.size for c in stats.classes) + 20, stats.root_size)
+                self.assertLessEqual(stats.root_size, stats.decompressed_size)
+                self.assertEqual(stats.compressed_size, path.stat().st_size)
+
+                for entry, obj in zip(stats.classes, bmof.root.objects):
+                    self.assertEqual(entry.name, obj.name)
+                    self.assertEqual(entry.object_type, obj.object_type)
+                    self.assertGreaterEqual(min(entry.properties, entry.methods, entry.strings), 0)
+
+                    # Every byte is attributed to a single category
+                    self.assertEqual(
+                        OBJECT_HEADER.size + entry.properties + entry.methods
+                        + entry.qualifier_arrays + entry.strings + entry.nested_objects
+                        + entry.unreferenced,
+                        entry.size
+                    )
+
+                self.assertIn("Unreferenced heap bytes", format_stats(stats))
+
+    def test_embedded_object(self) -> None:
+        """Test that embedded objects are attributed to the enclosing object"""
+        stats = blob_stats_file(MOF_PATH / "wmi_class_with_object.bmf")
+        instance = [c for c in stats.classes if c.object_type == WmiObjectType.INSTANCE][0]
+
+        self.assertGreater(instance.nested_objects, 0)
+        self.assertLess(instance.nested_objects, instance.size)
+        self.assertEqual(stats.qualifiers["CIMTYPE"].count, 4)
+
+    def test_unreferenced(self) -> None:
+        """Test that padding is reported as unreferenced heap bytes"""
+        path = MOF_PATH / "wmi_class_with_object.bmf"
+        padded = blob_stats_file(path)
+        self.assertTrue(padded.unreferenced)
+        self.assertLessEqual(sum(c.unreferenced for c in padded.classes),
+                             sum(u.size for u in padded.unreferenced))
+
+        # The unreferenced bytes do not overlap the headers of the substructures
+        bmof, source_map = parse_file_with_source_map(path)
+        headers = []
+        for obj in bmof.root.objects:
+            headers.append((source_map.span(obj), OBJECT_HEADER.size))
+            for prop in obj.properties or []:
+                headers.append((source_map.span(prop), PROPERTY_HEADER.size))
+                for qualifier in prop.qualifiers or []:
+                    headers.append((source_map.span(qualifier), QUALIFIER_HEADER.size))
+
+        for unreferenced in padded.unreferenced:
+            for span, size in headers:
+                assert span is not None
+                self.assertFalse(span.start < unreferenced.offset + unreferenced.size
+                                 and unreferenced.offset < span.start + size)
+
+        # Our own encoder does not pad
+        rebuilt = blob_stats(BMOF.build(BMOF.parse_file(path)))
+        self.assertEqual(rebuilt.unreferenced, [])
+
+    def test_corrupted_count(self) -> None:
+        """Test that a corrupted array count is rejected instead of being iterated"""
+        buffer = decompress_bmof((MOF_PATH / "wmi_qualifier_flavors.bmf").read_bytes())
+        offset = BMOF_ROOT_HEADER.sizeof()
+        qualifiers_offset = OBJECT_HEADER.unpack_from(buffer, offset)[1]
+        array = offset + OBJECT_HEADER.size + qualifiers_offset
+        length = ARRAY_HEADER.unpack_from(buffer, array)[0]
+        ARRAY_HEADER.pack_into(buffer, array, length, 0x7FFFFFFF)
+
+        compressed = compress(bytes(buffer))
+        data = BMOF_HEADER.build({
+            "compressed_length": len(compressed),
+            "final_length": len(buffer)
+        }) + compressed
+
+        with self.assertRaises(ConstructError):
+            BMOF.parse(data)
+
+        with self.assertRaises(ConstructError):
+            blob_stats(data)
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+"""Tests for the content-addressed object store"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.store import ClassStore
+from .helpers import collect_flavors
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class ClassStoreTest(TestCase):
+    """Tests for the content-addressed object store"""
+
+    def test_reconstruct(self) -> None:
+        """Test if imported BMOF data can be reconstructed"""
+        with TemporaryDirectory() as directory:
+            store = ClassStore(Path(directory))
+
+            for path in MOF_PATH.rglob("*.bmf"):
+                store.import_file(path)
+
+            for path in MOF_PATH.rglob("*.bmf"):
+                with self.subTest(path=path):
+                    bmof = BMOF.parse_file(path)
+                    result = store.reconstruct(str(path))
+
+                    self.assertEqual(result.root, BMOF.parse(BMOF.build(bmof)).root)
+                    self.assertEqual(result.flavors is None, bmof.flavors is None)
+                    self.assertEqual(
+                        collect_flavors(result.root.objects, result.flavors or []),
+                        collect_flavors(bmof.root.objects, bmof.flavors or [])
+                    )
+
+    def test_deduplication(self) -> None:
+        """Test if identical objects are only stored once"""
+        path = MOF_PATH / "wmi_class_inheritance.bmf"
+
+        with TemporaryDirectory() as directory:
+            store = ClassStore(Path(directory))
+            first = store.import_file(path, "first")
+            second = store.import_file(path, "second")
+
+            self.assertEqual(first, second)
+            self.assertEqual(sorted(store.names()), ["first", "second"])
+            self.assertEqual(store.refs("second"), second)
+            self.assertEqual(
+                len(list(Path(directory, "classes").rglob("*.bmf"))),
+                len(set(first))
+            )
+
+    def test_flavors_fingerprint(self) -> None:
+        """Test if objects differing only in their flavors are stored separately"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_qualifier_flavors.bmf")
+        assert bmof.flavors is not None
+
+        with TemporaryDirectory() as directory:
+            store = ClassStore(Path(directory))
+            flavors = {f.offset: f.flavors for f in bmof.flavors}
+            obj = bmof.root.objects[0]
+
+            self.assertNotEqual(store.add_object(obj, flavors), store.add_object(obj, {}))
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+
+"""Tests for the incremental BMOF parser"""
+
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.stream import BmofStreamParser
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class StreamParserTest(TestCase):
+    """Tests for the incremental BMOF parser"""
+
+    def test_objects(self) -> None:
+        """Test if the incremental parser returns the same objects as the regular parser"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+
+                with path.open("rb") as fd:
+                    parser = BmofStreamParser(fd, chunk_size=16)
+                    objects = list(parser.objects())
+
+                self.assertEqual(objects, bmof.root.objects)
+                self.assertEqual(parser.flavors, bmof.flavors)
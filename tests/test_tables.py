@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+"""Tests for the deduplicated JSON representation"""
+
+from json import dumps, loads
+from pathlib import Path
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF
+from tarkin.main import encode_bmof
+from tarkin.tables import SEPARATORS, encode_tables, expand_tables
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class TablesTest(TestCase):
+    """Tests for the deduplicated JSON representation"""
+
+    def test_expand(self) -> None:
+        """Test if expanding the tables results in the default JSON output"""
+        for path in MOF_PATH.rglob("*.bmf"):
+            with self.subTest(path=path):
+                bmof = BMOF.parse_file(path)
+                flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+                expected = loads(dumps(bmof.root.objects,
+                                       default=lambda o, f=flavors: encode_bmof(o, f)))
+                document = loads(dumps(encode_tables(bmof), separators=SEPARATORS))
+
+                self.assertEqual(expand_tables(document), expected)
+
+    def test_deduplication(self) -> None:
+        """Test if types, qualifiers and qualifier sets are stored once"""
+        bmof = BMOF.parse_file(MOF_PATH / "wmi_class_inheritance.bmf")
+        document = encode_tables(bmof)
+
+        types = [(t["basic_type"], t["is_array"]) for t in document["types"]]
+        self.assertEqual(len(types), len(set(types)))
+        self.assertEqual(len(document["qualifier_sets"]),
+                         len({tuple(s) for s in document["qualifier_sets"]}))
+
+        # Both classes share the [WMI, Dynamic, Provider("WmiProv"), ...] qualifiers
+        names = [q["name"] for q in document["qualifiers"]]
+        self.assertEqual(names.count("WMI"), 1)
+        self.assertEqual(names.count("read"), 1)
+
+        size = len(dumps(encode_tables(bmof), separators=SEPARATORS))
+        flavors = {f.offset: f.flavors for f in bmof.flavors or []}
+        default = len(dumps(bmof.root.objects, separators=SEPARATORS,
+                            default=lambda o: encode_bmof(o, flavors)))
+        self.assertLess(size, default)
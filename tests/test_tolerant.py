@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+"""Tests for the fault-isolating BMOF parser"""
+
+from pathlib import Path
+from struct import pack, unpack_from
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import BMOF, Bmof
+from tarkin.ds import compress
+from tarkin.events import decompress_bmof
+from tarkin.root import Root
+from tarkin.tolerant import parse_tolerant, parse_tolerant_file
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+def build_bmof(buffer: bytearray) -> bytes:
+    """Compress decompressed BMOF data"""
+    compressed = compress(bytes(buffer))
+
+    return b"FOMB" + pack("<III", 1, len(compressed), len(buffer)) + compressed
+
+
+class TolerantTest(TestCase):
+    """Tests for the fault-isolating BMOF parser"""
+
+    def setUp(self) -> None:
+        """Parse the test file"""
+        self.path = MOF_PATH / "wmi_class_with_object.bmf"
+        self.bmof = BMOF.parse_file(self.path)
+        self.buffer = decompress_bmof(self.path.read_bytes())
+        self.offsets = [20]
+        for _ in self.bmof.root.objects:
+            (length,) = unpack_from("<I", self.buffer, self.offsets[-1])
+            self.offsets.append(self.offsets[-1] + length)
+
+    def test_valid(self) -> None:
+        """Test that valid files are parsed without diagnostics"""
+        for path in sorted(MOF_PATH.glob("*.bmf")):
+            with self.subTest(path=path.name):
+                bmof, diagnostics = parse_tolerant_file(path)
+                self.assertEqual(bmof, BMOF.parse_file(path))
+                self.assertEqual(diagnostics, [])
+
+    def test_object(self) -> None:
+        """Test that a malformed object is skipped"""
+        self.buffer[self.offsets[1] + 16:self.offsets[1] + 20] = pack("<I", 7)
+
+        bmof, diagnostics = parse_tolerant(build_bmof(self.buffer))
+        objects = self.bmof.root.objects
+
+        self.assertEqual(bmof.root.objects, [objects[0], objects[2]])
+        self.assertEqual(bmof.flavors, self.bmof.flavors)
+        self.assertEqual([(d.offset, d.structure) for d in diagnostics],
+                         [(self.offsets[1], "object")])
+        self.assertIsInstance(diagnostics[0].error, ValueError)
+
+    def test_qualifier(self) -> None:
+        """Test that a malformed qualifier is skipped while keeping the enclosing object"""
+        obj = self.bmof.root.objects[0]
+        prop = [p for p in obj.properties or [] if p.qualifiers][0]
+        assert prop.qualifiers is not None
+        qualifier = prop.qualifiers[0]
+        self.buffer[qualifier.offset + 4:qualifier.offset + 8] = pack("<I", 0x7777)
+
+        bmof, diagnostics = parse_tolerant(build_bmof(self.buffer))
+        damaged = bmof.root.objects[0]
+
+        self.assertEqual(bmof.root.objects[1:], self.bmof.root.objects[1:])
+        self.assertEqual(damaged.qualifiers, obj.qualifiers)
+        self.assertEqual(damaged.methods, obj.methods)
+        self.assertEqual([(d.offset, d.structure) for d in diagnostics],
+                         [(qualifier.offset, "qualifier")])
+
+        properties = damaged.properties or []
+        index = (obj.properties or []).index(prop)
+        self.assertEqual(properties[index].qualifiers, prop.qualifiers[1:])
+        self.assertEqual(properties[:index], (obj.properties or [])[:index])
+
+    def test_length(self) -> None:
+        """Test that a malformed length skips the remaining objects"""
+        self.buffer[self.offsets[2]:self.offsets[2] + 4] = pack("<I", 0xFFFF)
+
+        bmof, diagnostics = parse_tolerant(build_bmof(self.buffer))
+
+        self.assertEqual(bmof.root, Root(objects=self.bmof.root.objects[:2]))
+        self.assertEqual([(d.offset, d.structure) for d in diagnostics],
+                         [(self.offsets[2], "object")])
+
+    def test_root(self) -> None:
+        """Test that a malformed root header results in no objects"""
+        self.buffer[0:4] = b"BMOF"
+
+        bmof, diagnostics = parse_tolerant(build_bmof(self.buffer))
+
+        self.assertEqual(bmof, Bmof(root=Root(objects=[]), flavors=None))
+        self.assertEqual([d.structure for d in diagnostics], ["root"])
+        self.assertIn("root at offset 0x0", str(diagnostics[0]))
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+"""Tests for the incremental directory processing"""
+
+from os import utime
+from pathlib import Path
+from shutil import copy
+from tempfile import TemporaryDirectory
+from typing import Final
+from unittest import TestCase
+from tarkin.bmof import Bmof
+from tarkin.watch import DirectoryWatcher, Manifest
+
+MOF_PATH: Final = Path("tests/mof")
+
+
+class DirectoryWatcherTest(TestCase):
+    """Tests for the incremental directory processing"""
+
+    def setUp(self) -> None:
+        """Create a directory containing BMOF files"""
+        self.tempdir = TemporaryDirectory()     # pylint: disable=consider-using-with
+        self.directory = Path(self.tempdir.name, "dumps")
+        self.directory.mkdir()
+        self.manifest_path = Path(self.tempdir.name, "manifest")
+        self.results: list[tuple[Path, Bmof | Exception]] = []
+
+        for name in ("wmi_class.bmf", "wmi_void_method.bmf"):
+            copy(MOF_PATH / name, self.directory / name)
+
+    def tearDown(self) -> None:
+        """Remove the directory"""
+        self.tempdir.cleanup()
+
+    def watcher(self) -> DirectoryWatcher:
+        """Create a watcher using a fresh manifest instance"""
+        def sink(path: Path, digest: str, result: Bmof | Exception) -> None:
+            self.assertEqual(len(digest), 64)
+            self.results.append((path, result))
+
+        return DirectoryWatcher(self.directory, Manifest(self.manifest_path), sink)
+
+    def test_resume(self) -> None:
+        """Test if already processed files are skipped after restarting"""
+        self.assertEqual(self.watcher().scan(), 2)
+        self.assertTrue(all(isinstance(r, Bmof) for _, r in self.results))
+
+        self.assertEqual(self.watcher().scan(), 0)
+
+        copy(MOF_PATH / "wmi_simple_class.bmf", self.directory / "new.bmf")
+        self.assertEqual(self.watcher().scan(), 1)
+        self.assertEqual(self.results[-1][0], self.directory / "new.bmf")
+
+    def test_modified(self) -> None:
+        """Test if only files with modified content are processed again"""
+        watcher = self.watcher()
+        watcher.scan()
+
+        utime(self.directory / "wmi_class.bmf", ns=(0, 0))
+        self.assertEqual(watcher.scan(), 0)
+
+        copy(MOF_PATH / "wmi_simple_class.bmf", self.directory / "wmi_class.bmf")
+        self.assertEqual(watcher.scan(), 1)
+
+    def test_error(self) -> None:
+        """Test if invalid files are reported to the sink"""
+        (self.directory / "invalid.bmf").write_bytes(b"invalid")
+
+        self.watcher().scan()
+
+        errors = [p for p, r in self.results if isinstance(r, Exception)]
+        self.assertEqual(errors, [self.directory / "invalid.bmf"])
+
+    def test_deleted(self) -> None:
+        """Test if deleted files are removed from the manifest"""
+        self.watcher().scan()
+        (self.directory / "wmi_class.bmf").unlink()
+        self.watcher().scan()
+
+        manifest = Manifest(self.manifest_path)
+        self.assertEqual(list(manifest.entries), [str(self.directory / "wmi_void_method.bmf")])
+
+        copy(MOF_PATH / "wmi_class.bmf", self.directory / "wmi_class.bmf")
+        self.assertEqual(self.watcher().scan(), 1)
+
+    def test_compact(self) -> None:
+        """Test if superseded manifest entries are dropped when loading the manifest"""
+        watcher = self.watcher()
+        watcher.scan()
+        for _ in range(3):
+            utime(self.directory / "wmi_class.bmf", ns=(0, 0))
+            utime(self.directory / "wmi_class.bmf")
+            watcher.scan()
+
+        self.assertEqual(len(self.manifest_path.read_text(encoding="utf-8").splitlines()), 5)
+
+        manifest = Manifest(self.manifest_path)
+        self.assertEqual(len(self.manifest_path.read_text(encoding="utf-8").splitlines()), 2)
+        self.assertEqual(Manifest(self.manifest_path).entries, manifest.entries)